@@ -0,0 +1,203 @@
+import os
+import sys
+import math
+import random
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from simulator import SPECIES, POLICIES, BattleConfig, SimulationStats
+from sim_jobs import encode_rng_state, parse_levels, run_shard_step
+
+# 目標の信頼区間の幅を指定できる指標 → 信頼区間を求めるメソッド
+METRICS = {
+    "win_rate": SimulationStats.win_rate_interval,
+    "mean_turns": SimulationStats.mean_turns_interval,
+}
+
+
+def interval_width(stats, metric, confidence=0.95):
+    low, high = METRICS[metric](stats, confidence)
+    return high - low
+
+
+def check_targets(targets):
+    if not targets:
+        raise ValueError("目標の信頼区間の幅を1つ以上指定してください")
+    for metric, width in targets.items():
+        if metric not in METRICS:
+            raise ValueError(f"未知の指標: {metric}")
+        if width <= 0:
+            raise ValueError("目標の幅は正の値で指定してください")
+
+
+def converged(stats, targets, confidence=0.95):
+    """すべての指標の信頼区間が目標の幅以下になったか"""
+    return all(interval_width(stats, metric, confidence) <= width for metric, width in targets.items())
+
+
+def next_batch_size(stats, targets, confidence, batch_size, max_battles):
+    """次に実行するバトル数
+
+    信頼区間の幅はバトル数の平方根に反比例するので、目標に届くまでに必要な数を見積もり、
+    大きく外れている条件ほど一度に多く割り当てる（見積もりを超えないよう最小の間隔で刻む）。
+    """
+    needed = 0
+    for metric, width in targets.items():
+        current = interval_width(stats, metric, confidence)
+        if math.isfinite(current) and stats.battles:
+            needed = max(needed, math.ceil(stats.battles * (current / width) ** 2) - stats.battles)
+        else:
+            needed = max(needed, batch_size)
+    return min(max(batch_size, needed), max_battles - stats.battles)
+
+
+class AdaptiveCell:
+    """1つの条件（スライムの種類・レベルの組）の進み具合
+
+    バッチは batch_size ずつのシャードに分け、シャードごとに開始番号から決まる乱数系列を使う。
+    収束の判定はバッチのシャードがすべて終わってからなので、結果は実行の順序や並列度によらない。
+    """
+
+    def __init__(self, config, seed=0):
+        self.config = config
+        self.seed = seed
+        self.stats = SimulationStats()
+        self.converged = False
+        self.shards = []  # 今のバッチのまだ投入していないシャード [(開始番号, バトル数)]
+        self.running = 0  # 今のバッチの実行中のシャード数
+
+    def plan_batch(self, battles, shard_size):
+        start = self.stats.battles
+        self.shards = [(offset, min(shard_size, start + battles - offset))
+                       for offset in range(start, start + battles, shard_size)]
+
+    def next_shard(self, max_turns, balance=None):
+        """次のシャードの run_shard_step の引数"""
+        start, count = self.shards.pop(0)
+        self.running += 1
+        rng = random.Random(f"{self.seed}:{self.config.canonical_json()}:{start}")
+        return self.config.to_dict(), encode_rng_state(rng.getstate()), count, max_turns, balance
+
+    def apply(self, stats_data):
+        self.running -= 1
+        self.stats.merge(SimulationStats.from_dict(stats_data))
+
+    @property
+    def batch_done(self):
+        return not self.shards and not self.running
+
+    def summary(self, confidence=0.95):
+        data = self.stats.summary()
+        data["win_rate_interval"] = list(self.stats.win_rate_interval(confidence))
+        data["mean_turns_interval"] = list(self.stats.mean_turns_interval(confidence))
+        data["converged"] = self.converged
+        return data
+
+
+def adaptive_sweep(configs, targets, confidence=0.95, seed=0, batch_size=1000, max_battles=1_000_000,
+                   max_turns=100, executor=None, on_batch=None, balance=None, workers=None):
+    """条件ごとに目標の信頼区間の幅に達するまでバトルを繰り返す
+
+    収束した条件はそこで止め、残りの計算は収束していない条件に回す。収束していない条件が
+    ワーカーより少なくなったら、1つの条件のシャードを ceil(workers / 残りの条件数) 件まで同時に実行する。
+    max_battles に達しても収束しない条件は converged=False のまま打ち切る。
+
+    Args:
+        targets: 指標 → 目標の信頼区間の幅（例: {"win_rate": 0.02, "mean_turns": 0.1}）
+        batch_size: 1回に実行する最小のバトル数（シャードの大きさ）
+        executor: ワーカープール（省略時はこのプロセスで順に実行）
+        on_batch: バッチが終わるたびに AdaptiveCell を受け取る関数
+        balance: バランス表のスナップショット（省略時は既定値）
+        workers: executor のワーカー数（既定: CPU数）
+    Returns:
+        {条件: AdaptiveCell}
+    """
+    check_targets(targets)
+    cells = {config: AdaptiveCell(config, seed) for config in configs}
+
+    def start_batch(cell):
+        cell.plan_batch(next_batch_size(cell.stats, targets, confidence, batch_size, max_battles), batch_size)
+
+    def finish_batch(cell):
+        cell.converged = converged(cell.stats, targets, confidence)
+        if on_batch:
+            on_batch(cell)
+        if cell.converged or cell.stats.battles >= max_battles:
+            return False
+        start_batch(cell)
+        return True
+
+    for cell in cells.values():
+        start_batch(cell)
+
+    if executor is None:
+        active = list(cells.values())
+        while active:
+            # 1周ごとに、まだ収束していない条件だけを進める
+            for cell in active:
+                while cell.shards:
+                    cell.apply(run_shard_step(*cell.next_shard(max_turns, balance))[1])
+            active = [cell for cell in active if finish_batch(cell)]
+        return cells
+
+    workers = workers or os.cpu_count() or 1
+    active = list(cells.values())
+    running = {}  # Future → AdaptiveCell
+    while active:
+        per_cell = -(-workers // len(active))
+        for cell in active:
+            while cell.shards and cell.running < per_cell:
+                running[executor.submit(run_shard_step, *cell.next_shard(max_turns, balance))] = cell
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            cell = running.pop(future)
+            cell.apply(future.result()[1])
+            if cell.batch_done and not finish_batch(cell):
+                active.remove(cell)
+    return cells
+
+
+def adaptive_summary(config_data, targets, confidence=0.95, seed=0, batch_size=1000, max_battles=1_000_000,
+                     max_turns=100, balance=None):
+    """1つの条件を目標の精度まで実行した集計（ワーカーで呼ばれる）"""
+    config = BattleConfig.from_dict(config_data)
+    cells = adaptive_sweep([config], targets, confidence, seed, batch_size, max_battles, max_turns,
+                           balance=balance)
+    return cells[config].summary(confidence)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="目標の精度に達するまで条件ごとにシミュレーションする")
+    parser.add_argument("--species", default=None, help="スライムの種類（カンマ区切り、既定: 全種）")
+    parser.add_argument("--levels", default="1", help="賢者のレベル（例: 1-20 や 1,5,10）")
+    parser.add_argument("--policy", default="attack", choices=sorted(POLICIES))
+    parser.add_argument("--win-rate", type=float, default=None, help="勝率の信頼区間の目標の幅")
+    parser.add_argument("--mean-turns", type=float, default=None, help="平均ターン数の信頼区間の目標の幅")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-battles", type=int, default=1_000_000, help="条件ごとのバトル数の上限")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    args = parser.parse_args(argv)
+
+    targets = {metric: width for metric, width in (("win_rate", args.win_rate), ("mean_turns", args.mean_turns))
+               if width is not None} or {"win_rate": 0.02}
+    configs = [BattleConfig(name, level, policy=args.policy)
+               for name in (args.species.split(",") if args.species else SPECIES)
+               for level in parse_levels(args.levels)]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        cells = adaptive_sweep(configs, targets, args.confidence, args.seed, args.batch_size,
+                               args.max_battles, executor=executor, workers=args.workers)
+    total = 0
+    for config, cell in cells.items():
+        stats = cell.stats
+        total += stats.battles
+        low, high = stats.win_rate_interval(args.confidence)
+        mark = "" if cell.converged else "  (未収束)"
+        print(f"{config.species:<16} Lv{config.level:<3} {stats.battles:>9,}バトル  "
+              f"勝率 {stats.win_rate:6.1%} [{low:.1%}, {high:.1%}]  平均 {stats.mean_turns:.2f}ターン{mark}")
+    print(f"合計 {total:,}バトル")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""バトルの局面ごとのメモリ割り当ての計測とメモリ予算（tracemalloc を使う、計測するときだけ有効）
+
+Battle の派生クラスにフックを差し込み、局面が切り替わるたびに tracemalloc の現在値とピークを読む:
+
+    encounter  Battle の生成と敵の出現・情報の表示
+    player     プレイヤーの行動（入力・攻撃・呪文・逃走）
+    enemy      敵の行動
+    status     状態異常の処理と状況の表示
+    result     勝利・敗北の処理（経験値・レベルアップ）
+    between    バトルとバトルの間（main() の記録やメニュー）
+
+局面ごとに、残ったメモリ（終了時の現在値 - 開始時の現在値）と一時的なピーク（ピーク - 開始時の現在値）を集計する。
+予算は次の2つ:
+
+    per_turn    1ターンの一時的なピーク（ターン開始時からの増分）
+    per_battle  バトルの開始時点で比べた、1バトルあたりに残ったメモリの増分（リークの検出用）
+
+さらに census_every バトルごとにゲームのクラスのインスタンス数を数え、増え続ける型を見つける。
+"""
+import gc
+import os
+import sys
+import random
+import argparse
+import tracemalloc
+from collections import Counter
+from slime_battle import Battle, main as play_game
+
+PHASES = ("encounter", "player", "enemy", "status", "result", "between")
+
+# インスタンス数を数えるクラスの定義されたモジュール
+CENSUS_MODULES = ("slime", "hero", "slime_battle", "elements", "messages", "balance")
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class MemoryBudgetExceeded(Exception):
+    """メモリ予算を超えた"""
+
+
+class PhaseStats:
+    """1つの局面の集計"""
+    __slots__ = ("calls", "retained", "peak_total", "peak_max")
+
+    def __init__(self):
+        self.calls = 0
+        self.retained = 0    # 残ったメモリの合計（解放が多ければ負になる）
+        self.peak_total = 0  # 一時的なピークの合計
+        self.peak_max = 0
+
+    def add(self, retained, peak):
+        self.calls += 1
+        self.retained += retained
+        self.peak_total += peak
+        self.peak_max = max(self.peak_max, peak)
+
+    def to_dict(self):
+        return {"calls": self.calls, "retained": self.retained, "peak_max": self.peak_max,
+                "peak_mean": self.peak_total / self.calls if self.calls else 0.0}
+
+
+def census():
+    """ゲームのクラスごとの生きているインスタンス数"""
+    counts = Counter()
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls.__module__ in CENSUS_MODULES:
+            counts[cls.__name__] += 1
+    return counts
+
+
+class AllocationProfiler:
+    """局面ごとの割り当てを集計し、メモリ予算を確かめる
+
+    Args:
+        per_turn: 1ターンの一時的なピークの予算（バイト、None なら確かめない）
+        per_battle: 1バトルあたりに残ったメモリの増分の予算（バイト、None なら確かめない）
+        warmup: 予算を確かめないはじめのバトル数（キャッシュや表の初期化の分）
+        strict: True なら予算を超えた時点で MemoryBudgetExceeded を送出する
+        census_every: このバトル数ごとにインスタンス数を数える（0 なら数えない）
+        frames: tracemalloc が記録するスタックの深さ
+    """
+
+    def __init__(self, per_turn=None, per_battle=None, warmup=2, strict=False, census_every=0, frames=1):
+        self.per_turn = per_turn
+        self.per_battle = per_battle
+        self.warmup = warmup
+        self.strict = strict
+        self.census_every = census_every
+        self.frames = frames
+        self.phases = {phase: PhaseStats() for phase in PHASES}
+        self.battles = 0
+        self.turns = 0
+        self.turn_peak_max = 0
+        self.growth_max = 0       # ウォームアップ後の1バトルあたりの残ったメモリの増分の最大と合計
+        self.growth_total = 0
+        self.violations = []
+        self.censuses = []        # (バトル数, インスタンス数)
+        self._phase = None
+        self._phase_start = 0
+        self._turn_start = None
+        self._turn_peak = 0
+        self._turn_id = None
+        self._battle_start = None
+        self._first_snapshot = None
+        self._last_snapshot = None
+        self._started_tracing = False
+
+    # ---- 計測の開始と終了 ----
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._phase = None
+        self.switch("between")
+        return self
+
+    def stop(self):
+        self._end_turn()
+        self.switch(None)
+        self._last_snapshot = tracemalloc.take_snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ---- 局面の切り替え ----
+
+    def switch(self, phase):
+        """現在の局面を閉じて phase を始める"""
+        current, peak = tracemalloc.get_traced_memory()
+        if self._phase is not None:
+            self.phases[self._phase].add(current - self._phase_start, max(0, peak - self._phase_start))
+        if self._turn_start is not None:
+            self._turn_peak = max(self._turn_peak, peak)
+        tracemalloc.reset_peak()
+        self._phase = phase
+        self._phase_start = current
+
+    def begin_battle(self):
+        self._end_turn()
+        self.switch("encounter")
+        current = self._phase_start
+        if self._battle_start is not None and self.battles > self.warmup:
+            growth = current - self._battle_start
+            self.growth_max = max(self.growth_max, growth)
+            self.growth_total += growth
+            self._check("battle", growth, self.per_battle)
+        self._battle_start = current
+        self.battles += 1
+        after_warmup = self.battles - self.warmup - 1
+        census_due = self.census_every and after_warmup >= 0 and after_warmup % self.census_every == 0
+        if after_warmup == 0:
+            self._first_snapshot = tracemalloc.take_snapshot()
+        if census_due:
+            self.censuses.append((self.battles, census()))
+        if after_warmup == 0 or census_due:
+            # 計測そのものに使ったメモリは局面にもバトルの増分にも含めない
+            self._battle_start += tracemalloc.get_traced_memory()[0] - current
+            self._phase = None
+            self.switch("encounter")
+
+    def begin_turn(self, battle):
+        turn_id = (self.battles, battle.turn_count)
+        if turn_id == self._turn_id:
+            return  # 呪文の一覧から戻ったときなど、同じターンの中の呼び直し
+        self._end_turn()
+        self.switch("player")
+        self._turn_id = turn_id
+        self._turn_start = self._phase_start
+        self._turn_peak = self._turn_start
+        self.turns += 1
+
+    def _end_turn(self):
+        if self._turn_start is None:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        turn_peak = max(self._turn_peak, peak) - self._turn_start
+        self._turn_start = None
+        self.turn_peak_max = max(self.turn_peak_max, turn_peak)
+        self._check("turn", turn_peak, self.per_turn)
+
+    def end_battle(self):
+        if self._phase != "between":
+            self._end_turn()
+            self.switch("between")
+
+    def _check(self, kind, used, budget):
+        if budget is None or self.battles <= self.warmup or used <= budget:
+            return
+        violation = {"kind": kind, "battle": self.battles, "bytes": used, "budget": budget}
+        self.violations.append(violation)
+        if self.strict:
+            raise MemoryBudgetExceeded(f"{kind} の予算 {budget:,}B を超えました: {used:,}B（バトル{self.battles}）")
+
+    # ---- 結果 ----
+
+    def battle_class(self, base=Battle):
+        """局面の切り替えを知らせるフックを差し込んだ Battle の派生クラス"""
+        profiler = self
+
+        class ProfiledBattle(base):
+            def __init__(self, *args, **kwargs):
+                profiler.begin_battle()
+                super().__init__(*args, **kwargs)
+
+            def start_battle(self, auto_action=None):
+                result = super().start_battle(auto_action)
+                if self.outcome is not None:
+                    profiler.end_battle()
+                return result
+
+            def player_turn(self):
+                profiler.begin_turn(self)
+                return super().player_turn()
+
+            def play_turn(self, action, spell_name=None):
+                profiler.begin_turn(self)
+                continues = super().play_turn(action, spell_name)
+                if not continues:
+                    profiler.end_battle()
+                return continues
+
+            def enemy_turn(self):
+                profiler.switch("enemy")
+                return super().enemy_turn()
+
+            def process_status_effects(self):
+                profiler.switch("status")
+                return super().process_status_effects()
+
+            def win_battle(self):
+                profiler.switch("result")
+                return super().win_battle()
+
+            def lose_battle(self):
+                profiler.switch("result")
+                return super().lose_battle()
+
+        return ProfiledBattle
+
+    def type_growth(self):
+        """最初と最後のインスタンス数の差（増えた型だけ）"""
+        if len(self.censuses) < 2:
+            return {}
+        first, last = self.censuses[0][1], self.censuses[-1][1]
+        return {name: last[name] - first[name] for name in last if last[name] > first[name]}
+
+    def top_sites(self, limit=10):
+        """ウォームアップ後から残っているメモリが増えた、このパッケージ内の割り当て箇所"""
+        if self._first_snapshot is None or self._last_snapshot is None:
+            return []
+        only_package = [tracemalloc.Filter(True, os.path.join(PACKAGE_DIR, "*")),
+                        tracemalloc.Filter(False, os.path.abspath(__file__))]
+        before = self._first_snapshot.filter_traces(only_package)
+        after = self._last_snapshot.filter_traces(only_package)
+        sites = []
+        for diff in after.compare_to(before, "lineno")[:limit]:
+            if diff.size_diff > 0:
+                frame = diff.traceback[0]
+                sites.append((f"{os.path.basename(frame.filename)}:{frame.lineno}", diff.size_diff, diff.count_diff))
+        return sites
+
+    def report(self):
+        return {
+            "battles": self.battles,
+            "turns": self.turns,
+            "phases": {phase: stats.to_dict() for phase, stats in self.phases.items()},
+            "turn_peak_max": self.turn_peak_max,
+            "battle_growth_max": self.growth_max,
+            "battle_growth_total": self.growth_total,
+            "type_growth": self.type_growth(),
+            "violations": list(self.violations),
+        }
+
+
+def _discard(*args, **kwargs):
+    """ゲームの出力を捨てる"""
+
+
+def grind(profiler, battles, seed=0, name="てるた", base=Battle):
+    """main() の対話の流れで battles 回のバトルを続ける（賢者が倒れたら新しいセッションを始める）"""
+    rng = random.Random(seed)
+    battle_class = profiler.battle_class(base)
+
+    def answer(prompt):
+        if prompt.id == "game.name_prompt":
+            return name
+        if prompt.id == "game.choice_prompt":
+            return "2" if profiler.battles >= battles else "1"
+        return "1"
+
+    while profiler.battles < battles:
+        play_game(store_path=None, input_func=answer, output=_discard, rng=rng, battle_class=battle_class)
+        profiler.end_battle()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="長いセッションのバトルの局面ごとのメモリ割り当てを計測する")
+    parser.add_argument("-n", "--battles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-turn", type=int, default=None, help="1ターンの一時的なピークの予算（バイト）")
+    parser.add_argument("--per-battle", type=int, default=None, help="1バトルあたりに残るメモリの増分の予算（バイト）")
+    parser.add_argument("--warmup", type=int, default=2, help="予算を確かめないはじめのバトル数")
+    parser.add_argument("--census-every", type=int, default=100, help="インスタンス数を数えるバトルの間隔")
+    args = parser.parse_args(argv)
+
+    profiler = AllocationProfiler(args.per_turn, args.per_battle, args.warmup, census_every=args.census_every)
+    with profiler:
+        grind(profiler, args.battles, args.seed)
+    result = profiler.report()
+    print(f"{result['battles']:,}バトル {result['turns']:,}ターン")
+    print(f"{'局面':<10}{'回数':>10}{'残った(B)':>12}{'平均ピーク(B)':>15}{'最大ピーク(B)':>15}")
+    for phase, stats in result["phases"].items():
+        print(f"{phase:<10}{stats['calls']:>10,}{stats['retained']:>12,}{stats['peak_mean']:>15,.0f}"
+              f"{stats['peak_max']:>15,}")
+    print(f"ターンの最大ピーク {result['turn_peak_max']:,}B  "
+          f"バトルあたりの増分 最大 {result['battle_growth_max']:,}B 合計 {result['battle_growth_total']:,}B")
+    for type_name, count in sorted(result["type_growth"].items(), key=lambda item: -item[1]):
+        print(f"  増え続けている型: {type_name} +{count:,}")
+    for site, size, count in profiler.top_sites():
+        print(f"  {site}: +{size:,}B（{count:+,}ブロック）")
+    for violation in result["violations"][:20]:
+        print(f"予算超過: {violation['kind']} バトル{violation['battle']} "
+              f"{violation['bytes']:,}B > {violation['budget']:,}B", file=sys.stderr)
+    return 1 if result["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""バランス表（スライムの能力値・呪文の消費MPと効果量・逃走確率）のホットリロード
+
+バランス表はデータファイル（JSON / TOML）で既定値からの差分だけを書く:
+
+    {
+        "species": {"KingSlime": {"hp": 40, "attack": 18}},
+        "spells": {"メラ": {"cost": 4, "damage": 35}, "ホイミ": {"heal": 40}},
+        "escape": {"player": 0.5, "MetalSlime": 0.6}
+    }
+
+BalanceTables は読み取り専用のスナップショットで、ファイルが変わるたびに新しいものを作って
+参照を差し替える（変わらなかった部分は前のスナップショットと共有する）。
+バトルは開始時のスナップショットを持ち続けるので、途中で表が変わっても1つのバトルの中では一貫し、
+次のバトルから新しい表が使われる。
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+from types import MappingProxyType
+from slime import BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
+from hero import SPELL_COSTS, SPELL_DAMAGE, SPELL_HEAL, SPELL_ELEMENTS, SPELL_LEARN_LEVELS
+
+try:
+    import tomllib  # Python 3.11以降
+except ImportError:
+    tomllib = None
+
+# バランス表で能力値を調整できるスライム（クラス名で指定する、並びは Battle の標準の出現順）
+SPECIES_CLASSES = {cls.__name__: cls
+                   for cls in (BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime)}
+SPECIES_STATS = ("hp", "attack", "defense", "exp", "gold")
+
+# 逃走確率の既定値（"player" はプレイヤーの逃走、それ以外はクラス名で、派生クラスにも適用される）
+DEFAULT_ESCAPE_CHANCES = {
+    "player": 0.5,
+    "MetalSlime": 0.7,
+    "StrayMetal": 0.8,
+    "MetalKingSlime": 0.9,
+}
+
+
+class BalanceError(ValueError):
+    """バランス表の内容が不正"""
+
+
+def _frozen(mapping):
+    return mapping if isinstance(mapping, MappingProxyType) else MappingProxyType(dict(mapping))
+
+
+class BalanceTables:
+    """ある時点のバランス表（読み取り専用のスナップショット）
+
+    version はこのプロセスで差し替えるたびに増える番号、digest は表の内容のハッシュ
+    （同じ内容なら別のプロセスでも同じ値になるので、結果のキャッシュのキーに使える）。
+    """
+    __slots__ = ("version", "digest", "species", "spell_costs", "spell_damage", "spell_heal", "escape")
+
+    def __init__(self, species, spell_costs, spell_damage, spell_heal, escape, version=0):
+        self.version = version
+        self.species = MappingProxyType({name: _frozen(stats) for name, stats in species.items()})
+        self.spell_costs = _frozen(spell_costs)
+        self.spell_damage = _frozen(spell_damage)
+        self.spell_heal = _frozen(spell_heal)
+        self.escape = _frozen(escape)
+        canonical = json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        self.digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def defaults(cls):
+        """コードに書かれている値からなる表"""
+        species = {}
+        for name, species_class in SPECIES_CLASSES.items():
+            enemy = species_class()
+            species[name] = {stat: getattr(enemy, stat) for stat in SPECIES_STATS}
+        return cls(species, SPELL_COSTS, SPELL_DAMAGE, SPELL_HEAL, DEFAULT_ESCAPE_CHANCES)
+
+    def to_dict(self):
+        return {
+            "species": {name: dict(stats) for name, stats in self.species.items()},
+            "spell_costs": dict(self.spell_costs),
+            "spell_damage": dict(self.spell_damage),
+            "spell_heal": dict(self.spell_heal),
+            "escape": dict(self.escape),
+        }
+
+    @classmethod
+    def from_dict(cls, data, version=0):
+        return cls(data["species"], data["spell_costs"], data["spell_damage"], data["spell_heal"],
+                   data["escape"], version)
+
+    def __reduce__(self):
+        # MappingProxyType はそのまま pickle できないので、ワーカーへは dict にして渡す
+        return (BalanceTables.from_dict, (self.to_dict(), self.version))
+
+    def with_overrides(self, overrides, version):
+        """差分を当てた新しいスナップショットを作る（自身は変更しない）
+
+        差分で触れていないスライムの能力値は、このスナップショットのものをそのまま共有する。
+        """
+        check_overrides(overrides)
+        species = dict(self.species)
+        for name, stats in overrides.get("species", {}).items():
+            species[name] = dict(species[name], **stats)
+        costs, damage, heal = dict(self.spell_costs), dict(self.spell_damage), dict(self.spell_heal)
+        for name, fields in overrides.get("spells", {}).items():
+            if "cost" in fields:
+                costs[name] = fields["cost"]
+            if "damage" in fields:
+                damage[name] = fields["damage"]
+            if "heal" in fields:
+                heal[name] = fields["heal"]
+        escape = dict(self.escape, **overrides.get("escape", {}))
+        return BalanceTables(species, costs, damage, heal, escape, version)
+
+    def overrides_from(self, base):
+        """base に当てるとこの表になる差分（値が同じ項目は含めない）"""
+        species = {}
+        for name, stats in self.species.items():
+            changed = {stat: value for stat, value in stats.items() if base.species[name].get(stat) != value}
+            if changed:
+                species[name] = changed
+        spells = {}
+        for field, mine, theirs in (("cost", self.spell_costs, base.spell_costs),
+                                    ("damage", self.spell_damage, base.spell_damage),
+                                    ("heal", self.spell_heal, base.spell_heal)):
+            for name, value in mine.items():
+                if theirs.get(name) != value:
+                    spells.setdefault(name, {})[field] = value
+        escape = {name: chance for name, chance in self.escape.items() if base.escape.get(name) != chance}
+        overrides = {"species": species, "spells": spells, "escape": escape}
+        return {key: value for key, value in overrides.items() if value}
+
+    @property
+    def player_escape_chance(self):
+        return self.escape["player"]
+
+    def escape_chance(self, enemy):
+        """敵の逃走確率（クラス名で引き、なければ基底クラスの値を使う）"""
+        for cls in type(enemy).__mro__:
+            chance = self.escape.get(cls.__name__)
+            if chance is not None:
+                return chance
+        return 0.0
+
+    def make_enemy(self, species):
+        """この表の能力値で敵を作る"""
+        enemy = SPECIES_CLASSES[species]()
+        for stat, value in self.species[species].items():
+            setattr(enemy, stat, value)
+        enemy.max_hp = enemy.hp
+        return enemy
+
+    def make_enemies(self):
+        """Battle の標準の出現候補（全種1体ずつ）"""
+        return [self.make_enemy(name) for name in SPECIES_CLASSES]
+
+
+DEFAULT_BALANCE = BalanceTables.defaults()
+
+
+def content_digest(balance=None):
+    """バランス表と、表に入っていないがバトルの結果を変えるコード側の表のハッシュ
+
+    コード側の表は呪文の属性・習得レベルとスライムの弱点・耐性で、呼ばれた時点の値を使う。
+    結果のキャッシュや作った表を使い回すかどうかの判定には、balance.digest ではなくこちらを使う。
+    """
+    balance = balance if balance is not None else DEFAULT_BALANCE
+    affinities = {}
+    for name, species_class in SPECIES_CLASSES.items():
+        enemy = species_class()
+        affinities[name] = [enemy.weakness, enemy.resistance]
+    data = {"balance": balance.digest, "spell_elements": SPELL_ELEMENTS,
+            "spell_learn_levels": {str(level): spells for level, spells in SPELL_LEARN_LEVELS.items()},
+            "affinities": affinities}
+    canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _check_number(value, where, minimum=0):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < minimum:
+        raise BalanceError(f"{where} は{minimum}以上の数で指定してください: {value!r}")
+
+
+def _check_table(value, where):
+    if not isinstance(value, dict):
+        raise BalanceError(f"{where} はオブジェクト（テーブル）で書いてください: {value!r}")
+    return value
+
+
+def check_overrides(overrides):
+    """差分の形式と値の範囲を確かめる（不正なら BalanceError）"""
+    _check_table(overrides, "バランス表")
+    unknown = set(overrides) - {"species", "spells", "escape"}
+    if unknown:
+        raise BalanceError(f"未知の項目: {', '.join(sorted(unknown))}")
+    for name, stats in _check_table(overrides.get("species", {}), "species").items():
+        if name not in SPECIES_CLASSES:
+            raise BalanceError(f"未知のスライム: {name}")
+        for stat, value in _check_table(stats, name).items():
+            if stat not in SPECIES_STATS:
+                raise BalanceError(f"{name} の未知の能力値: {stat}")
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise BalanceError(f"{name}.{stat} は整数で指定してください: {value!r}")
+            _check_number(value, f"{name}.{stat}", 1 if stat == "hp" else 0)
+    for name, fields in _check_table(overrides.get("spells", {}), "spells").items():
+        if name not in SPELL_COSTS:
+            raise BalanceError(f"未知の呪文: {name}")
+        for field, value in _check_table(fields, name).items():
+            # 呪文の種類（攻撃・回復）は変えられないので、効果量はもともと持っている呪文だけ
+            table = {"cost": SPELL_COSTS, "damage": SPELL_DAMAGE, "heal": SPELL_HEAL}.get(field)
+            if table is None or name not in table:
+                raise BalanceError(f"{name} には {field} を指定できません")
+            _check_number(value, f"{name}.{field}")
+    for name, chance in _check_table(overrides.get("escape", {}), "escape").items():
+        if name != "player" and name not in SPECIES_CLASSES:
+            raise BalanceError(f"未知の逃走確率: {name}")
+        _check_number(chance, f"escape.{name}")
+        if chance > 1:
+            raise BalanceError(f"escape.{name} は0〜1で指定してください: {chance!r}")
+
+
+def load_balance_file(path):
+    """JSON / TOML のバランス表を読み込む"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise BalanceError("TOMLの読み込みには Python 3.11 以降が必要です")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class BalanceStore:
+    """現在のバランス表を持ち、データファイルの変更を取り込む
+
+    読み込みと検証は watch() のスレッド（または reload() の呼び出し元）で済ませ、
+    出来上がったスナップショットへの参照を1回の代入で差し替える。
+    current() はロックを取らないので、読み込み中もバトルの開始や問い合わせは待たされない。
+    ファイルが壊れていた場合は前の表を使い続け、エラーを last_error に残す。
+    """
+
+    def __init__(self, path=None, base=DEFAULT_BALANCE):
+        self.path = path
+        self.base = base  # 差分は毎回この表に当てる（ファイルから消した項目は既定値に戻る）
+        self._current = base
+        self._stamp = None
+        self._lock = threading.Lock()  # 読み込み同士の順序付け用（読む側は取らない）
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+        if path:
+            self.reload()
+
+    def current(self):
+        """現在のスナップショット"""
+        return self._current
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        """データファイルを読み直して差し替える（不正なら例外を送出し、表は変えない）"""
+        with self._lock:
+            stamp = self._file_stamp()
+            tables = self.base.with_overrides(load_balance_file(self.path), self._current.version + 1)
+            self._stamp = stamp
+            self.last_error = None
+            if tables.digest != self._current.digest:
+                self._current = tables
+            return self._current
+
+    def check(self):
+        """ファイルが変わっていれば読み直す
+
+        Returns:
+            表を差し替えたら True
+        """
+        try:
+            stamp = self._file_stamp()
+        except OSError as error:
+            self.last_error = error
+            return False
+        if stamp == self._stamp:
+            return False
+        before = self._current
+        try:
+            self.reload()
+        except (OSError, ValueError) as error:
+            # 同じ壊れた内容を読み直し続けないよう、変更は見たことにする
+            self._stamp = stamp
+            self.last_error = error
+            return False
+        return self._current is not before
+
+    def watch(self, interval=1.0):
+        """interval 秒ごとにファイルの変更を確かめるスレッドを開始する"""
+        if self._thread is not None:
+            return self._thread
+        self._stop.clear()
+
+        def poll():
+            while not self._stop.wait(interval):
+                self.check()
+
+        self._thread = threading.Thread(target=poll, name="balance-watcher", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="バランス表を検証し、既定値との違いを表示する")
+    parser.add_argument("path", help="バランス表のデータファイル（JSON / TOML）")
+    args = parser.parse_args(argv)
+
+    try:
+        tables = BalanceStore(args.path).current()
+    except (OSError, ValueError) as error:
+        print(f"エラー: {error}", file=sys.stderr)
+        return 1
+    print(f"digest: {tables.digest}")
+    for name, stats in tables.species.items():
+        for stat, value in stats.items():
+            default = DEFAULT_BALANCE.species[name][stat]
+            if value != default:
+                print(f"{name}.{stat}: {default} → {value}")
+    for label, table, default_table in (("cost", tables.spell_costs, DEFAULT_BALANCE.spell_costs),
+                                        ("damage", tables.spell_damage, DEFAULT_BALANCE.spell_damage),
+                                        ("heal", tables.spell_heal, DEFAULT_BALANCE.spell_heal)):
+        for name, value in table.items():
+            if value != default_table[name]:
+                print(f"{name}.{label}: {default_table[name]} → {value}")
+    for name, chance in tables.escape.items():
+        default = DEFAULT_BALANCE.escape.get(name, 0.0)
+        if chance != default:
+            print(f"escape.{name}: {default} → {chance}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
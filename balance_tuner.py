@@ -0,0 +1,266 @@
+"""目標の指標に合うようにスライムの能力値を自動で調整する
+
+「キングスライムがレベル5の賢者に20%の確率で勝ち、バトルは6±2ターンで終わる」のような目標を
+指標の目標値と許容幅で与え、能力値（hp / attack / defense など）を Nelder-Mead 法で探す。
+能力値は整数に丸めてからバランス表の差分にするので、丸めると同じになる候補は1回しか実行しない。
+
+共通乱数: どの候補も同じシードの同じ番号のバトルで比べる（i 番目のバトルは "{seed}:{i}" の乱数）。
+候補の差が乱数のばらつきに埋もれにくくなり、少ないバトル数で収束する。
+
+並列評価: 1回の反復で必要になりうる候補（鏡映・拡大・外側と内側の縮小）をまとめて先に投入し、
+各候補のバトルも chunk_size ごとに分けてワーカーで実行する。
+
+目標の書き方（--target）:
+    KingSlime:5:lose_rate=0.2±0.05      種類:レベル:指標=目標値±許容幅（± の代わりに +- も可）
+"""
+import sys
+import json
+import math
+import random
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from simulator import BattleConfig, SimulationStats, run_battle
+from balance import DEFAULT_BALANCE, SPECIES_CLASSES
+
+# 目標にできる指標（集計からの求め方）
+METRICS = {
+    "win_rate": lambda stats: stats.win / stats.battles,
+    "lose_rate": lambda stats: stats.lose / stats.battles,  # スライムが賢者に勝つ割合
+    "escape_rate": lambda stats: stats.enemy_escape / stats.battles,
+    "mean_turns": lambda stats: stats.turns / stats.battles,
+}
+DEFAULT_PARAMETERS = ("hp", "attack", "defense")
+
+TuneResult = namedtuple("TuneResult", "overrides loss measured converged evaluations battles")
+
+
+class Target:
+    """1つの指標の目標（賢者のレベル・装備・行動方針と敵の種類で決まるバトルについて）"""
+
+    def __init__(self, species, level, metric, value, tolerance, equipment=(), policy="attack"):
+        if metric not in METRICS:
+            raise ValueError(f"未知の指標: {metric}")
+        if tolerance <= 0:
+            raise ValueError("許容幅は正の値です")
+        self.config = BattleConfig(species, level, equipment, policy)
+        self.metric = metric
+        self.value = value
+        self.tolerance = tolerance
+
+    @classmethod
+    def parse(cls, text):
+        """"KingSlime:5:lose_rate=0.2±0.05" の形式を読む"""
+        try:
+            species, level, goal = text.split(":", 2)
+            metric, _, value = goal.partition("=")
+            value, _, tolerance = value.replace("+-", "±").partition("±")
+            return cls(species, int(level), metric, float(value), float(tolerance))
+        except ValueError as error:
+            raise ValueError(f"目標の形式が不正です（例: KingSlime:5:lose_rate=0.2±0.05）: {text}") from error
+
+    def error(self, stats):
+        """目標値からのずれ（許容幅を1とする）"""
+        return (METRICS[self.metric](stats) - self.value) / self.tolerance
+
+    def __repr__(self):
+        return f"{self.config.species}:{self.config.level}:{self.metric}={self.value}±{self.tolerance}"
+
+
+def run_chunk(config_data, overrides, seed, start, count, max_turns, base=DEFAULT_BALANCE):
+    """start 番目から count 回のバトルを実行する（ワーカーで呼ばれる）
+
+    i 番目のバトルはどの候補でも同じ "{seed}:{i}" の乱数を使う（共通乱数）。
+    overrides は base に当てる。
+    """
+    config = BattleConfig.from_dict(config_data)
+    balance = base.with_overrides(overrides, version=0)
+    stats = SimulationStats()
+    for number in range(start, start + count):
+        stats.add(*run_battle(config, random.Random(f"{seed}:{number}"), max_turns, balance=balance))
+    return stats.to_dict()
+
+
+class BalanceTuner:
+    """目標に合う能力値を Nelder-Mead 法で探す
+
+    Args:
+        targets: Target のリスト
+        parameters: 調整する (種類名, 能力値) のリスト（省略時は目標の種類の hp・attack・defense）
+        base: 調整を始める表（省略時は既定値）
+        battles: 1つの候補・条件あたりのバトル数
+        executor: バトルを実行するワーカープール（省略時はこのプロセスで順に実行する）
+        chunk_size: ワーカーに1度に渡すバトル数
+    """
+
+    def __init__(self, targets, parameters=None, base=DEFAULT_BALANCE, battles=2000, seed=0, max_turns=100,
+                 executor=None, chunk_size=500):
+        if not targets:
+            raise ValueError("目標がありません")
+        if parameters is None:
+            species = dict.fromkeys(target.config.species for target in targets)
+            parameters = [(name, stat) for name in species for stat in DEFAULT_PARAMETERS]
+        for name, stat in parameters:
+            if name not in SPECIES_CLASSES or stat not in base.species[name]:
+                raise ValueError(f"調整できない能力値: {name}.{stat}")
+        self.targets = list(targets)
+        self.parameters = list(parameters)
+        self.base = base
+        self.battles = battles
+        self.seed = seed
+        self.max_turns = max_turns
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.configs = list(dict.fromkeys(target.config for target in self.targets))
+        self._results = {}  # 丸めた能力値 → (損失, {条件: 集計})
+        self.battles_run = 0
+
+    def start(self):
+        """調整を始める点（base の能力値）"""
+        return [float(self.base.species[name][stat]) for name, stat in self.parameters]
+
+    def round(self, point):
+        """候補の点を表に書ける整数にする（hp は1以上、ほかは0以上）"""
+        return tuple(max(1 if stat == "hp" else 0, int(round(value)))
+                     for (_, stat), value in zip(self.parameters, point))
+
+    def overrides(self, point):
+        """候補の点をバランス表の差分にする（既定値に対する差分で、base で調整しない値の変更も含む）"""
+        overrides = self.base.overrides_from(DEFAULT_BALANCE)
+        species = overrides.setdefault("species", {})
+        for (name, stat), value in zip(self.parameters, self.round(point)):
+            species.setdefault(name, {})[stat] = value
+        return overrides
+
+    def loss(self, measured):
+        """目標からのずれの2乗和（すべての目標が許容幅に収まれば各項は1以下）"""
+        return sum(target.error(measured[target.config]) ** 2 for target in self.targets)
+
+    def within_tolerance(self, measured):
+        return all(abs(target.error(measured[target.config])) <= 1 for target in self.targets)
+
+    def evaluate(self, points):
+        """候補の点の損失のリスト（まだ実行していない候補のバトルはまとめて並列に実行する）"""
+        keys = [self.round(point) for point in points]
+        pending = [key for key in dict.fromkeys(keys) if key not in self._results]
+        jobs = []
+        for key in pending:
+            overrides = self.overrides(key)
+            for config in self.configs:
+                for start in range(0, self.battles, self.chunk_size):
+                    args = (config.to_dict(), overrides, self.seed, start,
+                            min(self.chunk_size, self.battles - start), self.max_turns, self.base)
+                    work = run_chunk(*args) if self.executor is None else self.executor.submit(run_chunk, *args)
+                    jobs.append((key, config, work))
+        measured = {key: {config: SimulationStats() for config in self.configs} for key in pending}
+        for key, config, work in jobs:
+            measured[key][config].merge(SimulationStats.from_dict(work if self.executor is None else work.result()))
+        for key in pending:
+            self._results[key] = (self.loss(measured[key]), measured[key])
+            self.battles_run += self.battles * len(self.configs)
+        return [self._results[key][0] for key in keys]
+
+    def tune(self, max_evaluations=100, initial_step=1.0):
+        """Nelder-Mead 法で損失が最小の能力値を探す
+
+        すべての目標が許容幅に収まるか、実行した候補が max_evaluations 個に達したら止める。
+        単体の頂点が丸めると全部同じになったら、または全頂点の損失が同じ（指標が変わらない平らな所）なら、
+        最良の点から単体を作り直して続ける。良くならなかったときは作り直すたびに辺の向きを反転し、
+        2回ごとに長さを倍にする（良くなったら initial_step に戻す）。
+
+        Args:
+            initial_step: 単体の辺の長さ（能力値に対する割合、2未満なら2）
+        """
+        point = self.start()
+        step = initial_step
+        best = math.inf
+        while True:
+            point, measured = self._search(point, step, max_evaluations)
+            if self.within_tolerance(measured) or len(self._results) >= max_evaluations:
+                break
+            loss = self._results[self.round(point)][0]
+            if loss < best:
+                best, step = loss, initial_step
+            else:
+                step = -step if step > 0 else -step * 2
+        loss, measured = self._results[self.round(point)]
+        return TuneResult(self.overrides(point), loss, measured, self.within_tolerance(measured),
+                          len(self._results), self.battles_run)
+
+    def _search(self, start, initial_step, max_evaluations):
+        """start から単体を作って Nelder-Mead 法を1回行い、(最良の点, その集計) を返す
+
+        initial_step が負なら単体の辺を能力値が減る向きに取る。
+        """
+        simplex = [start]
+        for index, value in enumerate(start):
+            vertex = list(start)
+            vertex[index] = value + math.copysign(max(2.0, value * abs(initial_step)), initial_step)
+            simplex.append(vertex)
+        losses = self.evaluate(simplex)
+        while True:
+            order = sorted(range(len(simplex)), key=losses.__getitem__)
+            simplex = [simplex[i] for i in order]
+            losses = [losses[i] for i in order]
+            best = self._results[self.round(simplex[0])][1]
+            if (self.within_tolerance(best) or len(self._results) >= max_evaluations
+                    or len({self.round(vertex) for vertex in simplex}) == 1):
+                return simplex[0], best
+            if losses[0] == losses[-1]:
+                return simplex[0], best  # 平らな所では縮めても変わらないので、大きな単体で作り直す
+            worst = simplex[-1]
+            centroid = [sum(values) / (len(simplex) - 1) for values in zip(*simplex[:-1])]
+
+            def toward(coefficient):
+                return [c + coefficient * (c - w) for c, w in zip(centroid, worst)]
+
+            # 鏡映・拡大・外側の縮小・内側の縮小をまとめて評価する（使わない候補も並列に済ませる）
+            reflected, expanded, outside, inside = (toward(1.0), toward(2.0), toward(0.5), toward(-0.5))
+            r, e, oc, ic = self.evaluate([reflected, expanded, outside, inside])
+            if r < losses[0]:
+                simplex[-1], losses[-1] = (expanded, e) if e < r else (reflected, r)
+            elif r < losses[-2]:
+                simplex[-1], losses[-1] = reflected, r
+            elif r < losses[-1] and oc <= r:
+                simplex[-1], losses[-1] = outside, oc
+            elif r >= losses[-1] and ic < losses[-1]:
+                simplex[-1], losses[-1] = inside, ic
+            else:
+                # 縮小: 最良の頂点に向けて全体を半分にする
+                simplex = [simplex[0]] + [[b + 0.5 * (v - b) for b, v in zip(simplex[0], vertex)]
+                                          for vertex in simplex[1:]]
+                losses = [losses[0]] + self.evaluate(simplex[1:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="目標の指標に合うようにスライムの能力値を調整する")
+    parser.add_argument("--target", action="append", required=True, metavar="種類:レベル:指標=値±幅",
+                        help=f"目標（複数指定可）。指標: {', '.join(METRICS)}")
+    parser.add_argument("--param", action="append", default=None, metavar="種類.能力値",
+                        help="調整する能力値（省略時は目標の種類の hp・attack・defense）")
+    parser.add_argument("-n", "--battles", type=int, default=2000, help="候補ごとのバトル数")
+    parser.add_argument("--max-evaluations", type=int, default=100, help="実行する候補の数の上限")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    parser.add_argument("-o", "--output", default=None, help="結果をバランス表のデータファイル（JSON）に書き出す")
+    args = parser.parse_args(argv)
+
+    targets = [Target.parse(text) for text in args.target]
+    parameters = [tuple(text.split(".", 1)) for text in args.param] if args.param else None
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        tuner = BalanceTuner(targets, parameters, battles=args.battles, seed=args.seed, executor=executor)
+        result = tuner.tune(args.max_evaluations)
+    for target in targets:
+        value = METRICS[target.metric](result.measured[target.config])
+        mark = "" if abs(target.error(result.measured[target.config])) <= 1 else "  (目標外)"
+        print(f"{target!r:<40} 実測 {value:.3f}{mark}")
+    print(json.dumps(result.overrides, ensure_ascii=False))
+    print(f"候補 {result.evaluations}個  {result.battles:,}バトル  {'収束' if result.converged else '未収束'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result.overrides, f, ensure_ascii=False, indent=2)
+    return 0 if result.converged else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""リモートのバトルクライアント向けの状態同期
+
+get_status() のように毎ターン整形済みの dict 全体を作って送る代わりに、
+バトルの状態を版番号付きで持ち、クライアントが確認（ack）した版から変わった項目だけを
+小さなバイナリの差分にして送る。クライアントごとに一定数のフレームごとにキーフレーム（全項目）を挟み、
+取りこぼしや途中参加から復帰できるようにする。
+
+項目ごとに「最後に変わった版」を持つので、どの版からの差分もクライアントごとの状態なしに作れる。
+同じ版からの差分は1回だけ符号化し、同じ位置にいるクライアントで使い回す。
+
+フレームの形式（数はすべて可変長整数）:
+    ヘッダ  種別(1バイト: 0=キーフレーム, 1=差分), 版, 版 - 基準の版, 項目のマスク, None の項目のマスク
+    値      マスクの立っている項目（None を除く）を番号順に並べる
+            整数は zigzag の可変長整数、文字列は長さ + UTF-8、文字列の並びは個数 + 文字列
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from collections import namedtuple
+
+INT, STR, STRS = "int", "str", "strs"
+
+# 同期する項目（番号がマスクのビットになるので、追加は末尾に行う）
+FIELDS = (
+    ("turn", INT),
+    ("outcome", STR),
+    ("player_name", STR),
+    ("player_level", INT),
+    ("player_hp", INT),
+    ("player_max_hp", INT),
+    ("player_mp", INT),
+    ("player_max_mp", INT),
+    ("player_attack", INT),
+    ("player_defense", INT),
+    ("player_exp", INT),
+    ("player_status", STRS),
+    ("player_spells", STRS),
+    ("enemy_name", STR),
+    ("enemy_type", STR),
+    ("enemy_color", STR),
+    ("enemy_hp", INT),
+    ("enemy_max_hp", INT),
+    ("enemy_attack", INT),
+    ("enemy_defense", INT),
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+ALL_FIELDS = (1 << len(FIELDS)) - 1
+
+PLAYER_ATTRS = ("name", "level", "hp", "max_hp", "mp", "max_mp", "attack", "defense", "exp")
+ENEMY_ATTRS = ("name", "type", "color", "hp", "max_hp", "attack", "defense")
+
+KEYFRAME, DELTA = 0, 1
+
+Frame = namedtuple("Frame", "keyframe version base fields")
+
+
+class SyncError(Exception):
+    """フレームが壊れている、または手元の状態に当てられない"""
+
+
+def read_battle(battle):
+    """バトルから同期する項目の値を FIELDS の順に読み出す"""
+    player, enemy = battle.player, battle.current_enemy
+    values = [battle.turn_count, battle.outcome]
+    values.extend(getattr(player, attr) for attr in PLAYER_ATTRS)
+    values.append(tuple(player.status_effects))
+    values.append(tuple(player.spells))
+    if enemy is None:
+        values.extend([None] * len(ENEMY_ATTRS))
+    else:
+        values.extend(getattr(enemy, attr, None) for attr in ENEMY_ATTRS)
+    return values
+
+
+# ---- 値の符号化 ----
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise SyncError("フレームが途中で切れています")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _write_str(out, value):
+    encoded = value.encode("utf-8")
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_str(data, pos):
+    length, pos = _read_varint(data, pos)
+    if pos + length > len(data):
+        raise SyncError("フレームが途中で切れています")
+    return bytes(data[pos:pos + length]).decode("utf-8"), pos + length
+
+
+def _write_value(out, kind, value):
+    if kind == INT:
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif kind == STR:
+        _write_str(out, value)
+    else:
+        _write_varint(out, len(value))
+        for item in value:
+            _write_str(out, item)
+
+
+def _read_value(data, pos, kind):
+    if kind == INT:
+        value, pos = _read_varint(data, pos)
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+    if kind == STR:
+        return _read_str(data, pos)
+    count, pos = _read_varint(data, pos)
+    items = []
+    for _ in range(count):
+        item, pos = _read_str(data, pos)
+        items.append(item)
+    return tuple(items), pos
+
+
+def encode_frame(keyframe, version, base, mask, values):
+    """マスクの項目の値を1つのフレームにする"""
+    none_mask = 0
+    body = bytearray()
+    for index, (_, kind) in enumerate(FIELDS):
+        if mask >> index & 1:
+            value = values[index]
+            if value is None:
+                none_mask |= 1 << index
+            else:
+                _write_value(body, kind, value)
+    header = bytearray((KEYFRAME if keyframe else DELTA,))
+    for number in (version, version - base, mask, none_mask):
+        _write_varint(header, number)
+    return bytes(header + body)
+
+
+def decode_frame(data):
+    """フレームを Frame(keyframe, version, base, {項目名: 値}) に戻す"""
+    if not data:
+        raise SyncError("フレームが空です")
+    kind = data[0]
+    version, pos = _read_varint(data, 1)
+    distance, pos = _read_varint(data, pos)
+    mask, pos = _read_varint(data, pos)
+    none_mask, pos = _read_varint(data, pos)
+    if kind not in (KEYFRAME, DELTA) or mask & ~ALL_FIELDS or none_mask & ~mask or distance > version:
+        raise SyncError("未知のフレームです")
+    fields = {}
+    for index, (name, kind_of_value) in enumerate(FIELDS):
+        if mask >> index & 1:
+            if none_mask >> index & 1:
+                fields[name] = None
+            else:
+                fields[name], pos = _read_value(data, pos, kind_of_value)
+    if pos != len(data):
+        raise SyncError("フレームの末尾に余分なデータがあります")
+    return Frame(kind == KEYFRAME, version, version - distance, fields)
+
+
+# ---- サーバー側の状態 ----
+
+class BattleState:
+    """版番号付きのバトルの状態
+
+    capture() で値を読み込み、1つでも変わっていれば版を1つ進める。
+    項目ごとに最後に変わった版を持ち、delta(since) は since より後に変わった項目だけを符号化する。
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.values = [None] * len(FIELDS)
+        self.changed_at = [0] * len(FIELDS)
+        self._frames = {}  # 基準の版（キーフレームは None）→ 現在の版のフレーム
+
+    def update(self, values):
+        """値を取り込む
+
+        Returns:
+            変わった項目のマスク（0 なら版は進まない）
+        """
+        current = self.values
+        if values == current:
+            return 0
+        mask = 0
+        for index, value in enumerate(values):
+            if current[index] != value:
+                mask |= 1 << index
+        if mask:
+            self.version += 1
+            self._frames.clear()
+            for index, value in enumerate(values):
+                if mask >> index & 1:
+                    current[index] = value
+                    self.changed_at[index] = self.version
+        return mask
+
+    def capture(self, battle):
+        """バトルの現在の状態を取り込む"""
+        return self.update(read_battle(battle))
+
+    def dirty_since(self, version):
+        """version より後に変わった項目のマスク"""
+        mask = 0
+        for index, changed in enumerate(self.changed_at):
+            if changed > version:
+                mask |= 1 << index
+        return mask
+
+    def keyframe(self):
+        """全項目のフレーム"""
+        frame = self._frames.get(None)
+        if frame is None:
+            frame = self._frames[None] = encode_frame(True, self.version, 0, ALL_FIELDS, self.values)
+        return frame
+
+    def delta(self, since):
+        """since の版からの差分のフレーム"""
+        frame = self._frames.get(since)
+        if frame is None:
+            frame = self._frames[since] = encode_frame(False, self.version, since, self.dirty_since(since),
+                                                       self.values)
+        return frame
+
+    def snapshot(self):
+        return dict(zip(FIELD_NAMES, self.values))
+
+
+class ClientSession:
+    """1つのクライアントへ送るフレームを決める
+
+    確認済みの版からの差分を送り、keyframe_interval 回ごと（と確認済みの版がないとき）はキーフレームを送る。
+    確認が届くまでは同じ版からの差分を送り直すので、途中のフレームを落としても追いつける。
+    """
+
+    def __init__(self, state, keyframe_interval=30):
+        self.state = state
+        self.keyframe_interval = keyframe_interval
+        self.acked = None
+        self.sent_since_keyframe = 0
+
+    def next_frame(self):
+        """次に送るフレーム（確認済みの版が最新なら None）"""
+        state = self.state
+        if self.acked == state.version:
+            return None
+        if self.acked is None or self.acked > state.version or self.sent_since_keyframe >= self.keyframe_interval:
+            self.sent_since_keyframe = 0
+            return state.keyframe()
+        self.sent_since_keyframe += 1
+        return state.delta(self.acked)
+
+    def ack(self, version):
+        """クライアントが version までの状態を持っていることを記録する"""
+        if self.acked is None or version > self.acked:
+            self.acked = version
+
+
+# ---- クライアント側の状態 ----
+
+class ClientState:
+    """受け取ったフレームを当てて組み立てるクライアント側の状態"""
+
+    def __init__(self):
+        self.version = None
+        self.fields = {}
+
+    def apply(self, data):
+        """フレームを当てる（確認として返す版は self.version）
+
+        差分の基準の版が手元の版より新しい場合は当てられないので SyncError を送出する
+        （キーフレームを待つ）。手元より古い版のフレームは無視する。
+        """
+        frame = decode_frame(data)
+        if frame.keyframe:
+            if self.version is not None and frame.version < self.version:
+                return frame
+            self.fields = dict(frame.fields)
+        else:
+            if self.version is None or frame.base > self.version:
+                raise SyncError(f"版 {frame.base} からの差分は当てられません（手元の版: {self.version}）")
+            if frame.version <= self.version:
+                return frame
+            self.fields.update(frame.fields)
+        self.version = frame.version
+        return frame
+
+
+# ---- 計測 ----
+
+def _discard(*args, **kwargs):
+    """バトルメッセージを捨てる"""
+
+
+def status_payload(battle):
+    """これまでの送り方（get_status() の dict 全体を毎ターン JSON で送る）"""
+    data = {"turn": battle.turn_count, "player": battle.player.get_status(),
+            "enemy": battle.current_enemy.get_status()}
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def measure(battles=1000, seed=0, level=10):
+    """ターンごとに送るバイト数と作る時間を、get_status() の JSON と差分フレームで比べる"""
+    from simulator import SPECIES, make_sage
+    from slime_battle import Battle
+
+    rng = random.Random(seed)
+    totals = {"turns": 0, "status_bytes": 0, "delta_bytes": 0, "status_seconds": 0.0, "delta_seconds": 0.0}
+    for _ in range(battles):
+        enemy = SPECIES[rng.choice(list(SPECIES))]()
+        battle = Battle(make_sage(level), test_mode=True, rng=rng, output=_discard, enemies=[enemy])
+        battle.current_enemy = enemy
+        state = BattleState()
+        session = ClientSession(state)
+        state.capture(battle)
+        session.ack(state.version)
+        while battle.play_turn(1 if rng.random() < 0.8 else 2, "メラ"):
+            totals["turns"] += 1
+            started = time.perf_counter()
+            payload = status_payload(battle)
+            totals["status_seconds"] += time.perf_counter() - started
+            totals["status_bytes"] += len(payload)
+            started = time.perf_counter()
+            state.capture(battle)
+            frame = session.next_frame()
+            totals["delta_seconds"] += time.perf_counter() - started
+            if frame is not None:
+                totals["delta_bytes"] += len(frame)
+                session.ack(state.version)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="状態同期のターンあたりの送信量を get_status() と比べる")
+    parser.add_argument("-n", "--battles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    totals = measure(args.battles, args.seed)
+    turns = max(totals["turns"], 1)
+    for label, prefix in (("get_status() の JSON", "status"), ("差分フレーム", "delta")):
+        print(f"{label:<20} {totals[prefix + '_bytes'] / turns:8.1f} バイト/ターン  "
+              f"{totals[prefix + '_seconds'] / turns * 1e6:8.2f} µs/ターン")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
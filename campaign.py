@@ -0,0 +1,399 @@
+"""長いプレイセッション（数百回の連続したバトル）での賢者の成長をシミュレーションする
+
+main() と同じく、HP・MP・毒・経験値・ゴールドを持ち越しながらバトルを続け、賢者が倒れたら終わる。
+セッションごとにバトルを1ターンずつ再生する代わりに、バトル1回分の結果を表から引いて状態を進める:
+
+    (レベル, 敵の種類, HPの区間, MPの区間, 毒) → そのバトルの結果の標本（結果, ターン数, 経験値,
+                                                ゴールド, 減ったHP, 使ったMP, 終了時の毒）
+
+HP・MPの区間は等比（ratio 倍ごと）に切り、満タンは別の区間にする。MPは回復しないので残りわずかの
+ところ（呪文を唱えられるかどうか）が効き、HPも残りが少ないほど倒れるかどうかに効くため、
+少ないほど細かく分ける。表は区間の中から一様に選んだ HP・MP で始めたバトルを samples 回（回復呪文を
+唱えるほど HP の少ない区間は LOW_HP_SAMPLES 倍）実行して作り、最初に引かれたとき
+（または precompute() でまとめて）作ってからは全セッションで使い回す。
+倒れる・毒を受けるといったまれな結果は表の標本の数で決まってしまうので、samples は多めにしておく。
+区間の分け方の分だけ近似になるので、replay_session() で実際にバトルを再生した結果と比べられる。
+
+表を作るのにかかるバトル数は、1回の実行ではバトルを再生するのと同じくらいになる
+（-n 3000 -e 300 の spell で、表は約2,100行・約81万バトルで約30秒、--exact は約13秒）。
+速くなるのは表を使い回すときで、保存した表を読み込むとセッションは約3.5秒（読み込みを含めて約6秒）で終わる。
+1回だけの実行なら --exact のほうが速い。
+
+レベルアップはバトルの結果を当てたあとに行う（勝ったときだけ判定するのは Battle.win_battle と同じ）。
+"""
+import sys
+import math
+import json
+import time
+import random
+import argparse
+from collections import Counter, namedtuple
+from statistics import mean, quantiles
+from concurrent.futures import ProcessPoolExecutor
+from hero import Sage
+from balance import DEFAULT_BALANCE, SPECIES_CLASSES, content_digest
+from simulator import BattleConfig, POLICIES, SHARED_EQUIPMENT, make_sage, run_battle
+
+Sample = namedtuple("Sample", "outcome turns exp gold hp_loss mp_spent poisoned")
+Session = namedtuple("Session", "levels death death_level gold final_level encounters turns")
+
+
+class _TableSage(Sage):
+    """表を作るための賢者（バトル中にレベルアップしない。レベルアップはセッションの側で行う）"""
+    __slots__ = ()
+
+    def get_next_level_exp(self):
+        return math.inf
+
+
+FULL = -1  # 満タンの区間の番号
+LOW_HP_FRACTION = 0.3  # 最大HPのこの割合より下の（回復呪文を唱える）区間は
+LOW_HP_SAMPLES = 4  # samples のこの倍数のバトルで行を作る（倒れるかどうかが決まる行なので）
+
+
+def _bucket(value, maximum, ratio):
+    """value（0〜maximum）が入る区間の番号（0 は0以下、以降は ratio 倍ごと）"""
+    if value >= maximum:
+        return FULL
+    if value <= 0:
+        return 0
+    return 1 + int(math.log(value) / math.log(ratio) + 1e-9)
+
+
+def _bucket_values(bucket, maximum, ratio, minimum):
+    """区間に入る値（minimum〜maximum）の (最小, 最大)"""
+    values = [value for value in range(minimum, maximum + 1) if _bucket(value, maximum, ratio) == bucket]
+    return values[0], values[-1]
+
+
+def build_outcomes(key, samples, seed, policy, equipment, max_turns, ratio, balance):
+    """表の1つの行（バトルの結果の標本）を作る（ワーカーで呼ばれる）
+
+    開始時の HP・MP はバトルごとに区間の中から一様に選ぶ。
+    """
+    level, species, hp_bucket, mp_bucket, poisoned = key
+    rng = random.Random(f"{seed}:{level}:{species}:{hp_bucket}:{mp_bucket}:{int(poisoned)}")
+    config = BattleConfig(species, level, equipment, policy)
+    outcomes = []
+    hp_range = mp_range = None
+    for _ in range(samples):
+        sage = _TableSage("シミュレーション")
+        for _ in range(level - 1):
+            sage.level_up()
+        for item in config.equipment:
+            sage.equip(SHARED_EQUIPMENT[item])
+        if hp_range is None:
+            hp_range = _bucket_values(hp_bucket, sage.max_hp, ratio, 1)
+            mp_range = _bucket_values(mp_bucket, sage.max_mp, ratio, 0)
+        sage.hp = hp = rng.randint(*hp_range)
+        sage.mp = mp = rng.randint(*mp_range)
+        if poisoned:
+            sage.status_effects.append("毒")
+        outcome, turns, exp, gold = run_battle(config, rng, max_turns, player=sage, balance=balance)
+        outcomes.append(Sample(outcome, turns, exp, gold, hp - sage.hp, mp - sage.mp, "毒" in sage.status_effects))
+    return tuple(outcomes)
+
+
+class EncounterTables:
+    """(レベル, 敵の種類, HPの区間, MPの区間, 毒) ごとのバトルの結果の表
+
+    Args:
+        policy: 賢者の行動方針（simulator.POLICIES の名前）
+        equipment: 装備（simulator.EQUIPMENT の名前）
+        samples: 1行あたりのバトル数（HPの少ない区間はその LOW_HP_SAMPLES 倍）
+        ratio: HP・MPの区間の幅（下端の何倍までを1つの区間にするか）
+    """
+
+    def __init__(self, policy="attack", equipment=(), balance=None, samples=256, ratio=1.25, seed=0,
+                 max_turns=100):
+        if policy not in POLICIES:
+            raise ValueError(f"未知の行動方針: {policy}")
+        self.policy = policy
+        self.equipment = tuple(sorted(set(equipment)))
+        self.balance = balance if balance is not None else DEFAULT_BALANCE
+        self.samples = samples
+        self.ratio = ratio
+        self.seed = seed
+        self.max_turns = max_turns
+        self._rows = {}
+        self._levels = {}
+        self.battles_run = 0
+
+    def level(self, level):
+        """レベルごとの (最大HP, 最大MP, 次のレベルに必要な経験値)"""
+        stats = self._levels.get(level)
+        if stats is None:
+            sage = make_sage(level, self.equipment)
+            stats = self._levels[level] = (sage.max_hp, sage.max_mp, sage.get_next_level_exp())
+        return stats
+
+    def key(self, level, species, hp, mp, poisoned):
+        max_hp, max_mp, _ = self.level(level)
+        return (level, species, _bucket(hp, max_hp, self.ratio), _bucket(mp, max_mp, self.ratio), bool(poisoned))
+
+    def row_samples(self, key):
+        """行を作るバトル数（HPの少ない区間は多くする）"""
+        level, _, hp_bucket, _, _ = key
+        max_hp = self.level(level)[0]
+        if hp_bucket != FULL and _bucket_values(hp_bucket, max_hp, self.ratio, 1)[1] < max_hp * LOW_HP_FRACTION:
+            return self.samples * LOW_HP_SAMPLES
+        return self.samples
+
+    def _build_args(self, key):
+        return (key, self.row_samples(key), self.seed, self.policy, self.equipment, self.max_turns, self.ratio,
+                self.balance)
+
+    def outcomes(self, key):
+        """表の行（無ければここで作る）"""
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = build_outcomes(*self._build_args(key))
+            self.battles_run += len(row)
+        return row
+
+    def precompute(self, levels, species=None, executor=None):
+        """レベルごとの全区間の行をまとめて作る（executor があればワーカーで並列に）"""
+        keys = []
+        for level in levels:
+            max_hp, max_mp, _ = self.level(level)
+            # 整数の値が1つも入らない区間（小さい値の細かい区間）は引かれないので作らない
+            hp_buckets = dict.fromkeys(_bucket(value, max_hp, self.ratio) for value in range(1, max_hp + 1))
+            mp_buckets = dict.fromkeys(_bucket(value, max_mp, self.ratio) for value in range(max_mp + 1))
+            keys.extend((level, name, hp_bucket, mp_bucket, poisoned)
+                        for name in (species or SPECIES_CLASSES) for hp_bucket in hp_buckets
+                        for mp_bucket in mp_buckets for poisoned in (False, True))
+        keys = [key for key in keys if key not in self._rows]
+        if executor is None:
+            rows = [build_outcomes(*self._build_args(key)) for key in keys]
+        else:
+            rows = list(executor.map(build_outcomes, *zip(*map(self._build_args, keys)))) if keys else []
+        self._rows.update(zip(keys, rows))
+        self.battles_run += sum(map(len, rows))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def save(self, path):
+        """表を JSON に書き出す（バランス表の内容のハッシュと作り方も一緒に保存する）"""
+        data = {"params": self._params(), "rows": [[list(key), [list(sample) for sample in row]]
+                                                   for key, row in self._rows.items()]}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def load(self, path):
+        """save() した表を読み込む（作り方やバランス表が違えば読まずに False を返す）"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("params") != self._params():
+            return False
+        for key, row in data["rows"]:
+            level, species, hp_bucket, mp_bucket, poisoned = key
+            self._rows[(level, species, hp_bucket, mp_bucket, poisoned)] = tuple(Sample(*sample) for sample in row)
+        return True
+
+    def _params(self):
+        return {"policy": self.policy, "equipment": list(self.equipment), "content": content_digest(self.balance),
+                "samples": self.samples, "ratio": self.ratio, "seed": self.seed, "max_turns": self.max_turns}
+
+
+def _checkpoint(number, every):
+    return number % every == 0
+
+
+def run_session(tables, encounters, rng, encounter_table=None, checkpoint_every=10):
+    """表を引いて1セッションを進める
+
+    Args:
+        encounters: 最大の遭遇回数（それまでに倒れたら終わる）
+        encounter_table: {種類名: 重み}（省略時は Battle と同じく全種類を同じ確率で）
+        checkpoint_every: この遭遇回数ごとにレベルを記録する
+    """
+    species, weights = _encounter_lists(encounter_table)
+    level, exp, gold, turns = 1, 0, 0, 0
+    max_hp, max_mp, next_exp = tables.level(level)
+    hp, mp, poisoned = max_hp, max_mp, False
+    levels = []
+    death = None
+    for number in range(1, encounters + 1):
+        name = rng.choices(species, weights)[0] if weights else rng.choice(species)
+        sample = rng.choice(tables.outcomes(tables.key(level, name, hp, mp, poisoned)))
+        turns += sample.turns
+        if sample.outcome == "lose":
+            death = number
+            levels.extend([level] * (encounters // checkpoint_every - len(levels)))
+            break
+        hp = min(max_hp, max(1, hp - sample.hp_loss))
+        mp = min(max_mp, max(0, mp - sample.mp_spent))
+        poisoned = sample.poisoned
+        exp += sample.exp
+        gold += sample.gold
+        if sample.outcome == "win":
+            while exp >= next_exp:
+                level += 1
+                max_hp, max_mp, next_exp = tables.level(level)
+                hp, mp = max_hp, max_mp
+        if _checkpoint(number, checkpoint_every):
+            levels.append(level)
+    return Session(levels, death, level if death else None, gold, level, death or encounters, turns)
+
+
+def replay_session(encounters, rng, policy="attack", equipment=(), encounter_table=None, balance=None,
+                   checkpoint_every=10, max_turns=100):
+    """表を使わず、main() と同じく1人の賢者でバトルを実際に続けて1セッションを進める（比較用）"""
+    species, weights = _encounter_lists(encounter_table)
+    player = make_sage(1, equipment)
+    levels = []
+    death = None
+    gold = turns = 0
+    for number in range(1, encounters + 1):
+        name = rng.choices(species, weights)[0] if weights else rng.choice(species)
+        config = BattleConfig(name, player.level, equipment, policy)
+        outcome, spent, _, gained = run_battle(config, rng, max_turns, player=player, balance=balance)
+        turns += spent
+        gold += gained
+        if outcome == "lose" or player.hp <= 0:
+            death = number
+            levels.extend([player.level] * (encounters // checkpoint_every - len(levels)))
+            break
+        if _checkpoint(number, checkpoint_every):
+            levels.append(player.level)
+    level = player.level
+    return Session(levels, death, level if death else None, gold, level, death or encounters, turns)
+
+
+def _encounter_lists(encounter_table):
+    if encounter_table is None:
+        return list(SPECIES_CLASSES), None
+    for name in encounter_table:
+        if name not in SPECIES_CLASSES:
+            raise ValueError(f"未知のスライム: {name}")
+    return list(encounter_table), list(encounter_table.values())
+
+
+class CampaignResult:
+    """セッションの結果の集計"""
+
+    def __init__(self, encounters, checkpoint_every):
+        self.encounters = encounters
+        self.checkpoint_every = checkpoint_every
+        self.sessions = []
+
+    def add(self, session):
+        self.sessions.append(session)
+
+    def level_curve(self):
+        """遭遇回数ごとの [(遭遇回数, 生存率, 平均レベル, 10/50/90パーセンタイル)]（倒れたセッションは倒れた時のレベル）"""
+        curve = []
+        for index in range(self.encounters // self.checkpoint_every):
+            number = (index + 1) * self.checkpoint_every
+            levels = [session.levels[index] for session in self.sessions]
+            alive = sum(session.death is None or session.death > number for session in self.sessions)
+            curve.append((number, alive / len(self.sessions), mean(levels)) + _percentiles(levels))
+        return curve
+
+    def death_points(self, width=None):
+        """倒れた遭遇回数の分布 {区間の始まり: セッション数}"""
+        width = width or self.checkpoint_every
+        return dict(sorted(Counter((session.death - 1) // width * width + 1
+                                   for session in self.sessions if session.death).items()))
+
+    def death_levels(self):
+        return dict(sorted(Counter(session.death_level for session in self.sessions if session.death).items()))
+
+    def gold_distribution(self):
+        """セッションごとの獲得ゴールドと遭遇あたりのゴールドの (平均, 10/50/90パーセンタイル)"""
+        totals = [session.gold for session in self.sessions]
+        rates = [session.gold / session.encounters for session in self.sessions]
+        return {"total": (mean(totals),) + _percentiles(totals), "per_encounter": (mean(rates),) + _percentiles(rates)}
+
+    def summary(self):
+        deaths = [session.death for session in self.sessions if session.death]
+        return {"sessions": len(self.sessions), "deaths": len(deaths),
+                "mean_final_level": mean(session.final_level for session in self.sessions),
+                "mean_death_encounter": mean(deaths) if deaths else None,
+                "gold": self.gold_distribution()}
+
+
+def _percentiles(values):
+    if len(values) < 2:
+        return (values[0],) * 3 if values else (0, 0, 0)
+    cuts = quantiles(values, n=10, method="inclusive")
+    return cuts[0], cuts[4], cuts[8]
+
+
+def run_campaign(sessions, encounters, tables=None, seed=0, encounter_table=None, checkpoint_every=10,
+                 exact=False, **table_options):
+    """sessions 回のセッションを進めて集計する
+
+    Args:
+        tables: 使い回す EncounterTables（省略時は table_options から作る）
+        exact: True なら表を使わず replay_session() でバトルを再生する
+    Returns:
+        (CampaignResult, EncounterTables)
+    """
+    if tables is None:
+        tables = EncounterTables(seed=seed, **table_options)
+    result = CampaignResult(encounters, checkpoint_every)
+    for number in range(sessions):
+        rng = random.Random(f"{seed}:session:{number}")
+        if exact:
+            result.add(replay_session(encounters, rng, tables.policy, tables.equipment, encounter_table,
+                                      tables.balance, checkpoint_every, tables.max_turns))
+        else:
+            result.add(run_session(tables, encounters, rng, encounter_table, checkpoint_every))
+    return result, tables
+
+
+def print_report(result):
+    print("遭遇回数  生存率  平均Lv   Lv(10%/50%/90%)")
+    for number, alive, average, p10, p50, p90 in result.level_curve():
+        print(f"{number:>8}  {alive:6.1%}  {average:6.2f}   {p10:.0f} / {p50:.0f} / {p90:.0f}")
+    deaths = result.death_points()
+    if deaths:
+        print("倒れた遭遇回数: " + "  ".join(f"{start}〜:{count}" for start, count in deaths.items()))
+        print("倒れたレベル:   " + "  ".join(f"Lv{level}:{count}" for level, count in result.death_levels().items()))
+    gold = result.gold_distribution()
+    for label, key in (("獲得ゴールド", "total"), ("遭遇あたり", "per_encounter")):
+        average, p10, p50, p90 = gold[key]
+        print(f"{label:<10} 平均 {average:9.1f}  (10%/50%/90%: {p10:.1f} / {p50:.1f} / {p90:.1f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="連続したバトルでの賢者の成長をシミュレーションする")
+    parser.add_argument("-n", "--sessions", type=int, default=1000)
+    parser.add_argument("-e", "--encounters", type=int, default=300, help="1セッションの最大の遭遇回数")
+    parser.add_argument("--policy", default="spell", choices=sorted(POLICIES))
+    parser.add_argument("--samples", type=int, default=256, help="表の1行あたりのバトル数")
+    parser.add_argument("--ratio", type=float, default=1.25, help="HP・MPの区間の幅（下端の何倍まで）")
+    parser.add_argument("--checkpoint", type=int, default=25, help="レベルを記録する遭遇回数の間隔")
+    parser.add_argument("--tables", default=None, help="表の保存先（あれば読み込んで使い回す）")
+    parser.add_argument("--precompute", type=int, default=0, metavar="LEVEL",
+                        help="レベル1〜LEVEL の表を先にまとめて作る（ワーカーで並列に）")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--exact", action="store_true", help="表を使わずにバトルを再生する（比較用）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    tables = EncounterTables(args.policy, samples=args.samples, ratio=args.ratio, seed=args.seed)
+    if args.tables:
+        try:
+            if not tables.load(args.tables):
+                print("保存された表は作り方が違うので作り直します")
+        except FileNotFoundError:
+            pass
+    if args.precompute:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            tables.precompute(range(1, args.precompute + 1), executor=executor)
+    started = time.perf_counter()
+    result, tables = run_campaign(args.sessions, args.encounters, tables, args.seed,
+                                  checkpoint_every=args.checkpoint, exact=args.exact)
+    seconds = time.perf_counter() - started
+    print_report(result)
+    print(f"{args.sessions:,}セッション {seconds:.2f}秒  表 {len(tables):,}行（{tables.battles_run:,}バトル）")
+    if args.tables and tables.battles_run:
+        tables.save(args.tables)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
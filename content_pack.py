@@ -0,0 +1,369 @@
+"""コンテンツパック（スライム・呪文・装備・アート）
+
+JSON / TOML で書いたコンテンツを、索引付きのバイナリバンドルにコンパイルする。
+バンドルは mmap で開き、起動時には小さなディレクトリだけを読む。
+レコード本体は参照されたときに初めてデコードし、名前・タイプ・弱点・耐性などでの検索は
+コンパイル時に作ったソート済み索引を二分探索する。
+
+バンドルの構成:
+    ヘッダ       MAGIC, 形式バージョン, ディレクトリの位置と長さ
+    レコード本体  レコードごとのUTF-8 JSON
+    レコード表    レコード番号 → (本体の位置, 長さ)
+    索引         キーのバイト列でソートした (キーの位置, キー長, 番号リストの位置, 件数)
+    ディレクトリ  種類ごとのレコード表・索引の位置（JSON、種類と索引の数に比例する大きさ）
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from slime import EnemyCharacter, BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
+from hero import (Equipment, UltimateWeapon, UltimateArmor, UltimateAccessory,
+                  SPELL_COSTS, SPELL_DAMAGE, SPELL_HEAL, SPELL_ELEMENTS, SPELL_LEARN_LEVELS)
+from elements import ElementTable
+
+try:
+    import tomllib  # Python 3.11以降
+except ImportError:
+    tomllib = None
+
+MAGIC = b"SLPK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIQI")         # MAGIC, 形式バージョン, ディレクトリ位置, ディレクトリ長
+RECORD_ENTRY = struct.Struct("<QI")      # 本体の位置, 長さ
+INDEX_ENTRY = struct.Struct("<QIQI")     # キーの位置, キー長, 番号リストの位置, 件数
+POSTING = struct.Struct("<I")            # レコード番号
+
+# 種類ごとの検索可能なフィールド
+INDEXED_FIELDS = {
+    "species": ["name", "type", "weakness", "resistance", "base"],
+    "spells": ["name", "element"],
+    "equipment": ["name", "slot"],
+    "art": ["name"],
+}
+
+# パックの "base" で指定できる既存のスライム（行動や逃走確率はこのクラスに従う）
+BASE_CLASSES = {
+    cls.__name__: cls
+    for cls in (EnemyCharacter, BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime)
+}
+
+SPECIES_STATS = ["hp", "attack", "defense", "exp", "gold"]
+SPECIES_FIELDS = SPECIES_STATS + ["name", "type", "color", "special_ability", "weakness", "resistance"]
+
+
+class ContentPackError(Exception):
+    """コンテンツパックの内容・形式が不正"""
+
+
+# ---- ソースの読み込み ----
+
+def load_source(path):
+    """JSON / TOML のソースファイルを読み込む"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ContentPackError("TOMLの読み込みには Python 3.11 以降が必要です")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge_sources(sources):
+    """複数のソースをまとめる（同名のエントリは後のソースが上書きする）"""
+    merged = {kind: {} for kind in INDEXED_FIELDS}
+    for source in sources:
+        for kind in INDEXED_FIELDS:
+            for entry in source.get(kind, []):
+                if "name" not in entry:
+                    raise ContentPackError(f"{kind} のエントリに name がありません: {entry}")
+                merged[kind][entry["name"]] = entry
+    return {kind: list(entries.values()) for kind, entries in merged.items()}
+
+
+def validate(catalog):
+    """コンパイル前の整合性チェック"""
+    art_names = {art["name"] for art in catalog["art"]}
+    for species in catalog["species"]:
+        for stat in SPECIES_STATS:
+            if not isinstance(species.get(stat), int) or species[stat] < 0:
+                raise ContentPackError(f"{species['name']}: {stat} は0以上の整数が必要です")
+        if species.get("base", "BaseSlime") not in BASE_CLASSES:
+            raise ContentPackError(f"{species['name']}: 未知の base {species['base']}")
+        if species.get("art") and species["art"] not in art_names:
+            raise ContentPackError(f"{species['name']}: 未定義のアート {species['art']}")
+    for spell in catalog["spells"]:
+        if not isinstance(spell.get("mp_cost", 0), int) or spell.get("mp_cost", 0) < 0:
+            raise ContentPackError(f"{spell['name']}: mp_cost は0以上の整数が必要です")
+    for item in catalog["equipment"]:
+        if item.get("slot") not in ("武器", "防具", "装飾品"):
+            raise ContentPackError(f"{item['name']}: slot は 武器/防具/装飾品 のいずれかです")
+
+
+# ---- コンパイル ----
+
+def compile_catalog(catalog, output_path, pack_name="pack", pack_version=1):
+    """カタログ（種類 → エントリのリスト）をバイナリバンドルに書き出す"""
+    validate(catalog)
+    body = bytearray(HEADER.size)
+    directory = {"name": pack_name, "version": pack_version, "kinds": {}}
+
+    for kind, fields in INDEXED_FIELDS.items():
+        entries = sorted(catalog.get(kind, []), key=lambda e: e["name"])
+        # レコード本体
+        spans = []
+        for entry in entries:
+            blob = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            spans.append((len(body), len(blob)))
+            body += blob
+        records_offset = len(body)
+        for offset, length in spans:
+            body += RECORD_ENTRY.pack(offset, length)
+
+        # 索引（キー → レコード番号のリスト）
+        indexes = {}
+        for field in fields:
+            postings = {}
+            for number, entry in enumerate(entries):
+                value = entry.get(field)
+                if value is None or value == "":
+                    continue
+                postings.setdefault(str(value).encode("utf-8"), []).append(number)
+            placed = []
+            for key in sorted(postings):
+                key_offset = len(body)
+                body += key
+                postings_offset = len(body)
+                for number in postings[key]:
+                    body += POSTING.pack(number)
+                placed.append((key_offset, len(key), postings_offset, len(postings[key])))
+            index_offset = len(body)
+            for item in placed:
+                body += INDEX_ENTRY.pack(*item)
+            indexes[field] = [index_offset, len(placed)]
+        directory["kinds"][kind] = {"records": [records_offset, len(entries)], "indexes": indexes}
+
+    directory_blob = json.dumps(directory, ensure_ascii=False).encode("utf-8")
+    directory_offset = len(body)
+    body += directory_blob
+    HEADER.pack_into(body, 0, MAGIC, FORMAT_VERSION, directory_offset, len(directory_blob))
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def compile_pack(source_paths, output_path):
+    """ソースファイル（JSON / TOML）をまとめてコンパイルする"""
+    sources = [load_source(path) for path in source_paths]
+    meta = sources[-1] if sources else {}
+    return compile_catalog(merge_sources(sources), output_path,
+                           pack_name=meta.get("pack", "pack"), pack_version=meta.get("version", 1))
+
+
+# ---- 読み込み ----
+
+class ContentPack:
+    """コンパイル済みバンドルを mmap で開き、必要なレコードだけをデコードする"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ContentPackError(f"{path}: 空のファイルです")
+        magic, version, directory_offset, directory_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ContentPackError(f"{path}: コンテンツパックではありません")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ContentPackError(f"{path}: 未対応の形式バージョン {version}")
+        directory = json.loads(self._map[directory_offset:directory_offset + directory_length])
+        self.name = directory["name"]
+        self.version = directory["version"]
+        self._kinds = directory["kinds"]
+        self._decoded = {}
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def count(self, kind):
+        """その種類のエントリ数"""
+        return self._kinds[kind]["records"][1]
+
+    def record(self, kind, number):
+        """レコード番号からエントリを取り出す（初回アクセス時にデコード）"""
+        cache_key = (kind, number)
+        entry = self._decoded.get(cache_key)
+        if entry is None:
+            records_offset, count = self._kinds[kind]["records"]
+            if not 0 <= number < count:
+                raise IndexError(number)
+            offset, length = RECORD_ENTRY.unpack_from(self._map, records_offset + number * RECORD_ENTRY.size)
+            entry = json.loads(self._map[offset:offset + length])
+            self._decoded[cache_key] = entry
+        return entry
+
+    def _postings(self, kind, field, value):
+        """索引を二分探索して、値が一致するレコード番号のリストを返す"""
+        indexes = self._kinds[kind]["indexes"]
+        if field not in indexes:
+            raise ContentPackError(f"{kind} は {field} で検索できません")
+        index_offset, count = indexes[field]
+        target = str(value).encode("utf-8")
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, postings_offset, postings_count = INDEX_ENTRY.unpack_from(
+                self._map, index_offset + middle * INDEX_ENTRY.size)
+            key = self._map[key_offset:key_offset + key_length]
+            if key < target:
+                low = middle + 1
+            elif key > target:
+                high = middle
+            else:
+                return [POSTING.unpack_from(self._map, postings_offset + i * POSTING.size)[0]
+                        for i in range(postings_count)]
+        return []
+
+    def find(self, kind, field, value):
+        """フィールドの値が一致するエントリのリスト"""
+        return [self.record(kind, number) for number in self._postings(kind, field, value)]
+
+    def get(self, kind, name):
+        """名前でエントリを1件取り出す（無ければ None）"""
+        numbers = self._postings(kind, "name", name)
+        return self.record(kind, numbers[0]) if numbers else None
+
+    def keys(self, kind, field="name"):
+        """索引に登録されている値の一覧（ソート順）"""
+        index_offset, count = self._kinds[kind]["indexes"][field]
+        keys = []
+        for i in range(count):
+            key_offset, key_length, _, _ = INDEX_ENTRY.unpack_from(self._map, index_offset + i * INDEX_ENTRY.size)
+            keys.append(self._map[key_offset:key_offset + key_length].decode("utf-8"))
+        return keys
+
+    # ---- ゲームオブジェクトの生成 ----
+
+    def make_enemy(self, name):
+        """スライムの種類名から敵キャラクターを生成する"""
+        species = self.get("species", name)
+        if species is None:
+            raise KeyError(name)
+        enemy = BASE_CLASSES[species.get("base", "BaseSlime")]()
+        for field in SPECIES_FIELDS:
+            if field in species:
+                setattr(enemy, field, species[field])
+        enemy.max_hp = enemy.hp
+        if species.get("art"):
+            enemy.art = self.get("art", species["art"])["text"]
+        return enemy
+
+    def make_equipment(self, name):
+        """装備品の名前から装備を生成する"""
+        item = self.get("equipment", name)
+        if item is None:
+            raise KeyError(name)
+        return Equipment(item["name"], item["slot"], dict(item.get("stats", {})))
+
+    def element_table(self):
+        """パックの属性をあらかじめ登録した属性倍率表を作る
+
+        属性は索引のキーだけから集めるのでレコードはデコードしない。
+        弱点・耐性の組は最初に使われたときに倍率表へ追加される。
+        """
+        elements = set(self.keys("spells", "element"))
+        elements.update(self.keys("species", "weakness"))
+        elements.update(self.keys("species", "resistance"))
+        return ElementTable(elements=sorted(elements))
+
+    def species_by_type(self, species_type):
+        return self.find("species", "type", species_type)
+
+    def species_by_weakness(self, element):
+        return self.find("species", "weakness", element)
+
+    def species_by_resistance(self, element):
+        return self.find("species", "resistance", element)
+
+
+# ---- 標準コンテンツの書き出し ----
+
+def builtin_source():
+    """slime.py・hero.py・slime_battle.py の標準コンテンツをパックのソース形式で返す"""
+    from slime_battle import SLIME_ARTS, SlimeArt
+
+    species = []
+    for cls in (BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime):
+        slime = cls()
+        entry = {field: getattr(slime, field) for field in SPECIES_FIELDS}
+        entry["base"] = cls.__name__
+        entry["art"] = SlimeArt.get_art_id(slime)
+        species.append(entry)
+
+    learn_level = {spell: level for level, spells in SPELL_LEARN_LEVELS.items() for spell in spells}
+    spells = []
+    for name, cost in SPELL_COSTS.items():
+        entry = {"name": name, "mp_cost": cost, "learn_level": learn_level.get(name, 1)}
+        if name in SPELL_DAMAGE:
+            entry["damage"] = SPELL_DAMAGE[name]
+            entry["element"] = SPELL_ELEMENTS[name]
+        if name in SPELL_HEAL:
+            entry["heal"] = SPELL_HEAL[name]
+        spells.append(entry)
+
+    equipment = []
+    for cls in (UltimateWeapon, UltimateArmor, UltimateAccessory):
+        item = cls()
+        equipment.append({"name": item.name, "slot": item.equipment_type, "stats": dict(item.stats)})
+
+    art = [{"name": name, "text": text} for name, text in SLIME_ARTS.items()]
+    return {"pack": "builtin", "version": 1, "species": species, "spells": spells,
+            "equipment": equipment, "art": art}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="コンテンツパックのコンパイル・確認")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_command = commands.add_parser("compile", help="JSON/TOMLをバンドルにコンパイルする")
+    compile_command.add_argument("sources", nargs="+")
+    compile_command.add_argument("-o", "--output", required=True)
+    export_command = commands.add_parser("export-builtin", help="標準コンテンツをJSONソースとして書き出す")
+    export_command.add_argument("-o", "--output", required=True)
+    info_command = commands.add_parser("info", help="バンドルの内容を表示する")
+    info_command.add_argument("bundle")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        compile_pack(args.sources, args.output)
+        print(f"{args.output} を作成しました")
+    elif args.command == "export-builtin":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(builtin_source(), f, ensure_ascii=False, indent=2)
+        print(f"{args.output} を作成しました")
+    elif args.command == "info":
+        with ContentPack(args.bundle) as pack:
+            print(f"{pack.name} (version {pack.version})")
+            for kind in INDEXED_FIELDS:
+                print(f"- {kind}: {pack.count(kind)}件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
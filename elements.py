@@ -0,0 +1,127 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:  # 一括計算は numpy があれば使う
+    numpy = None
+
+NEUTRAL = "無"  # 属性なし（通常攻撃・特殊攻撃）
+
+WEAK_MULTIPLIER = 2.0
+RESIST_MULTIPLIER = 0.5
+
+
+def affinity_multiplier(element, weakness, resistance):
+    """属性と、相手の弱点・耐性の組から倍率を求める"""
+    multiplier = 1.0
+    if element != NEUTRAL and element == weakness:
+        multiplier *= WEAK_MULTIPLIER
+    if element != NEUTRAL and element == resistance:
+        multiplier *= RESIST_MULTIPLIER
+    return multiplier
+
+
+class ElementTable:
+    """属性 × 相性（弱点・耐性の組）のダメージ倍率表
+
+    属性と相性はそれぞれ小さな整数に置き換え（インターン）、倍率は登録時に計算しておく。
+    ダメージ計算では matrix[属性番号][相性番号] を引くだけで済む。
+    frozen=True の表（プロセス全体で共有する表）は作った後に行・列を増やさない。
+    未登録の名前の番号は KeyError になり、multiplier_for() は表を引かずに倍率を計算する。
+    増やしたいときは copy() した表に登録する。
+    """
+    def __init__(self, elements=(), affinities=(), frozen=False):
+        self.element_ids = {}
+        self.element_names = []
+        self.affinity_ids = {}
+        self.affinities = []
+        self.matrix = []  # matrix[属性番号][相性番号]
+        self.frozen = False
+        self.element_id(NEUTRAL)
+        self.affinity_id(None, None)
+        for element in elements:
+            self.element_id(element)
+        for weakness, resistance in affinities:
+            self.affinity_id(weakness, resistance)
+        self.frozen = frozen
+
+    @classmethod
+    def from_species(cls, species, spell_elements=()):
+        """敵（またはパックのエントリ）と呪文の属性から倍率表を作る"""
+        table = cls(elements=spell_elements)
+        for entry in species:
+            if isinstance(entry, dict):
+                table.affinity_id(entry.get("weakness"), entry.get("resistance"))
+            else:
+                table.affinity_id(entry.weakness, entry.resistance)
+        return table
+
+    def copy(self):
+        """同じ登録内容で、後から行・列を増やせる表"""
+        return ElementTable(self.element_names, self.affinities)
+
+    def element_id(self, element):
+        """属性を番号に変換する（未登録なら行を追加、frozen なら KeyError）"""
+        if element is None:
+            element = NEUTRAL
+        number = self.element_ids.get(element)
+        if number is None:
+            if self.frozen:
+                raise KeyError(f"未登録の属性: {element}")
+            number = len(self.element_names)
+            self.element_ids[element] = number
+            self.element_names.append(element)
+            self.matrix.append([affinity_multiplier(element, weakness, resistance)
+                                for weakness, resistance in self.affinities])
+        return number
+
+    def affinity_id(self, weakness, resistance):
+        """弱点・耐性の組を番号に変換する（未登録なら列を追加、frozen なら KeyError）"""
+        key = (weakness, resistance)
+        number = self.affinity_ids.get(key)
+        if number is None:
+            if self.frozen:
+                raise KeyError(f"未登録の相性: {key}")
+            number = len(self.affinities)
+            self.affinity_ids[key] = number
+            self.affinities.append(key)
+            for element, row in zip(self.element_names, self.matrix):
+                row.append(affinity_multiplier(element, weakness, resistance))
+        return number
+
+    def affinity_of(self, target):
+        """キャラクターの相性番号（弱点・耐性を持たないキャラクターは相性なし）"""
+        return self.affinity_id(getattr(target, "weakness", None), getattr(target, "resistance", None))
+
+    def multiplier(self, element_id, affinity_id):
+        return self.matrix[element_id][affinity_id]
+
+    def multiplier_for(self, element, target):
+        """属性名とキャラクターから倍率を求める（frozen の表に無い組は表を変えずに計算する）"""
+        weakness, resistance = getattr(target, "weakness", None), getattr(target, "resistance", None)
+        if self.frozen:
+            row = self.element_ids.get(NEUTRAL if element is None else element)
+            column = self.affinity_ids.get((weakness, resistance))
+            if row is None or column is None:
+                return affinity_multiplier(NEUTRAL if element is None else element, weakness, resistance)
+            return self.matrix[row][column]
+        return self.matrix[self.element_id(element)][self.affinity_id(weakness, resistance)]
+
+    def damage(self, base_damage, element, target):
+        """属性倍率を掛けたダメージ（1未満にはならない）"""
+        return max(1, int(base_damage * self.multiplier_for(element, target)))
+
+    def batch_damage(self, base_damages, element_ids, affinity_ids):
+        """ダメージを一括で計算する（バッチシミュレーション用）
+
+        numpy があれば配列演算で、無ければ平坦化した倍率表を引いて計算する。
+        """
+        width = len(self.affinities)
+        if numpy is not None:
+            matrix = numpy.asarray(self.matrix, dtype=numpy.float64)
+            multipliers = matrix[numpy.asarray(element_ids), numpy.asarray(affinity_ids)]
+            damages = (numpy.asarray(base_damages) * multipliers).astype(numpy.int64)
+            return numpy.maximum(damages, 1).tolist()
+        flat = array("d", (value for row in self.matrix for value in row))
+        return [max(1, int(base * flat[element * width + affinity]))
+                for base, element, affinity in zip(base_damages, element_ids, affinity_ids)]
@@ -0,0 +1,251 @@
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from hero import Sage, UltimateWeapon, UltimateArmor, UltimateAccessory
+from slime_battle import Battle
+
+ATTACK, SPELL, ESCAPE = 1, 2, 3  # Battle.play_turn の行動番号
+EQUIPMENT_TYPES = [UltimateWeapon, UltimateArmor, UltimateAccessory]
+EQUIPMENT_STATS = ["hp", "max_hp", "mp", "max_mp", "attack", "defense", "magic_attack", "magic_defense"]
+
+
+def _discard(*args, **kwargs):
+    """バトルメッセージを捨てる（ヘッドレス実行用）"""
+
+
+class InvariantViolation(Exception):
+    """ゲームの不変条件が破られた"""
+    def __init__(self, invariant, detail, turn):
+        super().__init__(f"[{invariant}] ターン{turn}: {detail}")
+        self.invariant = invariant
+        self.detail = detail
+        self.turn = turn
+
+
+def _equipment_stats(character):
+    return {stat: getattr(character, stat) for stat in EQUIPMENT_STATS}
+
+
+def check_invariants(battle, turn):
+    """ターン終了時点の不変条件を確認する"""
+    player, enemy = battle.player, battle.current_enemy
+    for who, character in (("賢者", player), ("敵", enemy)):
+        if character.hp > character.max_hp:
+            raise InvariantViolation("hp<=max_hp", f"{who}のHP {character.hp}/{character.max_hp}", turn)
+        if character.hp < 0:
+            raise InvariantViolation("hp>=0", f"{who}のHP {character.hp}", turn)
+    if player.mp < 0:
+        raise InvariantViolation("mp>=0", f"MP {player.mp}", turn)
+    if player.mp > player.max_mp:
+        raise InvariantViolation("mp<=max_mp", f"MP {player.mp}/{player.max_mp}", turn)
+
+    # take_damage の戻り値とHPの整合性（複製に対して確認し、本体の状態は変えない）
+    for who, character in (("賢者", player), ("敵", enemy)):
+        probe = copy.copy(character)
+        damage = character.hp // 2 + 1
+        defeated = probe.take_damage(damage)
+        if probe.hp != max(0, character.hp - damage) or defeated != (probe.hp <= 0):
+            raise InvariantViolation("take_damage", f"{who}: HP{character.hp}に{damage}ダメージ → "
+                                                    f"HP{probe.hp}, 戻り値{defeated}", turn)
+
+
+def check_reequip(sage):
+    """装備の付け替えでステータスが正味変化しないことを確認する（sage の装備は付け替えたままになる）"""
+    baseline = _equipment_stats(sage)
+    for equipment_type in EQUIPMENT_TYPES:
+        item = equipment_type()
+        current = sage.equipment[item.equipment_type]
+        sage.equip(item)
+        if current is not None:
+            # 同じ装備を付け直しても変化しない
+            if _equipment_stats(sage) != baseline:
+                raise InvariantViolation("re-equip", f"{item.name}の付け直しで {baseline} → "
+                                                     f"{_equipment_stats(sage)}", 0)
+        baseline = _equipment_stats(sage)
+
+
+def build_encounter(seed):
+    """シードから賢者（レベル・装備）とバトルを組み立てる"""
+    setup_rng = random.Random(f"{seed}:setup")
+    sage = Sage("ファズ")
+    for _ in range(setup_rng.randint(0, 19)):
+        sage.level_up()
+    for equipment_type in EQUIPMENT_TYPES:
+        if setup_rng.random() < 0.5:
+            sage.equip(equipment_type())
+    # 途中状態から始めて状態遷移の幅を広げる
+    sage.hp = setup_rng.randint(1, sage.max_hp)
+    sage.mp = setup_rng.randint(0, sage.max_mp)
+    if setup_rng.random() < 0.2:
+        sage.status_effects.append("毒")
+    check_reequip(copy.copy(sage))  # 空いている枠にも装備するので複製で確かめる（装備一覧は作り直される）
+
+    battle = Battle(sage, test_mode=True, rng=random.Random(f"{seed}:battle"), output=_discard)
+    battle.start_battle()
+    return battle
+
+
+def random_action(battle, rng):
+    """ランダムな行動を選ぶ"""
+    roll = rng.random()
+    if roll < 0.5:
+        return (ATTACK, None)
+    if roll < 0.9:
+        return (SPELL, rng.choice(list(battle.player.spells)))
+    return (ESCAPE, None)
+
+
+def run_case(seed, actions=None, max_turns=200):
+    """1バトルを実行して不変条件を確認する
+
+    Args:
+        seed: エンカウント・乱数・行動選択のシード
+        actions: 行動の列（省略時はシードからランダムに生成、使い切ったら攻撃を続ける）
+        max_turns: これを超えても決着しなければ「終了しない」違反とみなす
+    Returns:
+        (実際に取った行動の列, 違反 or None)
+    """
+    action_rng = random.Random(f"{seed}:actions")
+    taken = []
+    try:
+        battle = build_encounter(seed)
+        check_invariants(battle, 0)
+        for turn in range(1, max_turns + 1):
+            if actions is None:
+                action = random_action(battle, action_rng)
+            elif turn <= len(actions):
+                action = tuple(actions[turn - 1])
+            else:
+                action = (ATTACK, None)
+            taken.append(action)
+            continues = battle.play_turn(*action)
+            check_invariants(battle, turn)
+            if not continues:
+                if battle.outcome is None:
+                    raise InvariantViolation("outcome", "決着したのに結果が記録されていない", turn)
+                return taken, None
+        raise InvariantViolation("terminates", f"{max_turns}ターン経っても決着しない", max_turns)
+    except InvariantViolation as violation:
+        return taken, violation
+    except Exception as error:
+        return taken, InvariantViolation("exception", f"{type(error).__name__}: {error}", len(taken))
+
+
+def _reproduces(seed, actions, invariant, max_turns):
+    _, violation = run_case(seed, actions, max_turns)
+    return violation is not None and violation.invariant == invariant
+
+
+def shrink(seed, actions, invariant, max_turns=200, seed_search=200):
+    """違反を再現する最小のシードと行動列を探す
+
+    行動列は決着ターンまでに切り詰めた後、区間の削除と単純な行動（攻撃）への置き換えを繰り返す。
+    シードは小さい順に試し、同じ不変条件が破れる最初のものを採用する。
+    """
+    actions = [tuple(a) for a in actions]
+
+    def shrink_actions(seed, actions):
+        chunk = max(1, len(actions) // 2)
+        while chunk >= 1:
+            index = 0
+            while index < len(actions):
+                candidate = actions[:index] + actions[index + chunk:]
+                if _reproduces(seed, candidate, invariant, max_turns):
+                    actions = candidate
+                else:
+                    index += chunk
+            chunk //= 2
+        for index, action in enumerate(actions):
+            if action != (ATTACK, None):
+                candidate = actions[:index] + [(ATTACK, None)] + actions[index + 1:]
+                if _reproduces(seed, candidate, invariant, max_turns):
+                    actions = candidate
+        return actions
+
+    actions = shrink_actions(seed, actions)
+    for smaller_seed in range(min(seed, seed_search)):
+        if _reproduces(smaller_seed, actions, invariant, max_turns):
+            seed = smaller_seed
+            actions = shrink_actions(seed, actions)
+            break
+    return seed, actions
+
+
+def fuzz_range(start, count, max_turns=200, max_failures=5):
+    """シード start から count 件のバトルを実行する（ワーカープロセスで呼ばれる）"""
+    failures = []
+    turns = 0
+    for seed in range(start, start + count):
+        taken, violation = run_case(seed, max_turns=max_turns)
+        turns += len(taken)
+        if violation is not None and len(failures) < max_failures:
+            failures.append({'seed': seed, 'actions': taken, 'invariant': violation.invariant,
+                             'message': str(violation)})
+    return {'battles': count, 'turns': turns, 'failures': failures}
+
+
+def fuzz(battles, workers=None, base_seed=0, max_turns=200, chunk_size=2000, do_shrink=True):
+    """ランダムなバトルを並列に実行して不変条件違反を集める"""
+    chunks = [(start, min(chunk_size, base_seed + battles - start))
+              for start in range(base_seed, base_seed + battles, chunk_size)]
+    summary = {'battles': 0, 'turns': 0, 'failures': []}
+    if workers == 1:
+        results = [fuzz_range(start, count, max_turns) for start, count in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(fuzz_range, *zip(*chunks), [max_turns] * len(chunks)))
+    for result in results:
+        summary['battles'] += result['battles']
+        summary['turns'] += result['turns']
+        summary['failures'].extend(result['failures'])
+
+    if do_shrink:
+        # 不変条件ごとに最初の違反だけを最小化する
+        shrunk = {}
+        for failure in summary['failures']:
+            if failure['invariant'] in shrunk:
+                continue
+            seed, actions = shrink(failure['seed'], failure['actions'], failure['invariant'], max_turns)
+            _, violation = run_case(seed, actions, max_turns)
+            shrunk[failure['invariant']] = {'seed': seed, 'actions': actions, 'message': str(violation)}
+        summary['shrunk'] = shrunk
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ランダムなバトルでゲームの不変条件を検査する")
+    parser.add_argument("-n", "--battles", type=int, default=100000, help="実行するバトル数")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    parser.add_argument("--seed", type=int, default=0, help="最初のシード")
+    parser.add_argument("--max-turns", type=int, default=200, help="決着しないとみなすターン数")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="シードと行動列のJSON（例: '{\"seed\": 3, \"actions\": [[1, null]]}'）を再生する")
+    parser.add_argument("--output", type=str, default=None, help="結果をJSONで書き出すファイル")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        case = json.loads(args.replay)
+        taken, violation = run_case(case['seed'], case.get('actions'), args.max_turns)
+        print(violation if violation else f"違反なし（{len(taken)}ターン）")
+        return 1 if violation else 0
+
+    started = time.perf_counter()
+    summary = fuzz(args.battles, args.workers, args.seed, args.max_turns)
+    elapsed = time.perf_counter() - started
+    print(f"{summary['battles']}バトル / {summary['turns']}ターン を {elapsed:.1f}秒で検査 "
+          f"（{summary['battles'] / elapsed * 3600:,.0f}バトル/時）")
+    for invariant, case in summary.get('shrunk', {}).items():
+        print(f"違反 {invariant}: シード{case['seed']} 行動{case['actions']}")
+        print(f"  {case['message']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 1 if summary['failures'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""シードを固定したバトルの記録（ゴールデントレース）と照合して、ゲームのルールが変わっていないか確かめる
+
+Battle を速くするための書き換えでダメージ計算や判定の順番が黙って変わらないよう、
+(スライムの種類, レベル, 行動方針, 開始時の状態, 敵の強さ) の組ごとに決まったシードのバトルを実行し、ターンごとに
+
+    行動, そのターンに出たメッセージ（ID と引数）, ターン終了時の状態（賢者と敵のHP・MPなど）
+
+を1行の JSON にして、バトルの始めからの連続したハッシュ（ローリングハッシュ）に足していく。
+開始時の状態は満タン（fresh）と、HP・MP・経験値をシードから決めて毒も受けうる途中の状態（worn）の2通りで、
+後者で負け・毒・レベルアップも通るようにする。敵は表どおり（normal）と、HP と攻撃力を上げたもの（tough）の
+2通りで、後者では1ターンで決着しにくくなり、毒や分裂などの特技や長引いたバトルも通るようにする。
+ゴールデンファイルにはバトルごとにターンごとのハッシュの先頭 HASH_CHARS 文字だけを保存し、
+sample_every 件に1件だけ全ターンの記録を残す。照合では同じバトルを実行し直して、
+ハッシュが最初に食い違ったターンを報告する（全記録のあるバトルなら、そのターンの中身も比べる）。
+
+ルールを意図して変えたとき（バランス表の変更も含む）は record で作り直す。
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from balance import DEFAULT_BALANCE
+from simulator import POLICIES, SPECIES, make_sage
+from slime_battle import Battle
+
+FORMAT_VERSION = 2
+HASH_CHARS = 8  # ターンごとに保存するハッシュの長さ（16進の文字数）
+DEFAULT_PATH = "golden_traces.json"
+DEFAULT_LEVELS = (1, 3, 5, 10, 20)
+CONDITIONS = ("fresh", "worn")
+ENEMIES = ("normal", "tough")
+TOUGH_HP = 8  # tough の敵の HP の倍率
+TOUGH_ATTACK = 2  # tough の敵の攻撃力の倍率
+
+Divergence = namedtuple("Divergence", "case turn expected actual")
+
+
+def case_name(species, level, policy, condition, strength, index):
+    return f"{species}:{level}:{policy}:{condition}:{strength}:{index}"
+
+
+def _state(battle):
+    player, enemy = battle.player, battle.current_enemy
+    return {"player": [player.hp, player.max_hp, player.mp, player.max_mp, player.level, player.exp, player.gold,
+                       sorted(player.status_effects)],
+            "enemy": [enemy.name, enemy.hp, enemy.attack, enemy.defense], "outcome": battle.outcome}
+
+
+def _encode(record):
+    # Message は (ID, 引数) のタプルなので JSON の配列になる。引数の順番の違いはキーの並べ替えで吸収する
+    return json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def trace_battle(species, level, policy, condition, strength, index, seed=0, max_turns=100, balance=None):
+    """1バトルを実行して、ターンごとの記録（0番目はバトル開始時の状態）の JSON 文字列のリストを返す"""
+    if condition not in CONDITIONS:
+        raise ValueError(f"未知の開始時の状態: {condition}")
+    if strength not in ENEMIES:
+        raise ValueError(f"未知の敵の強さ: {strength}")
+    rng = random.Random(f"{seed}:{case_name(species, level, policy, condition, strength, index)}")
+    events = []
+    player = make_sage(level)
+    if condition == "worn":
+        player.hp = rng.randint(1, player.max_hp)
+        player.mp = rng.randint(0, player.max_mp)
+        player.exp = rng.randrange(player.exp, player.get_next_level_exp())
+        if rng.random() < 0.3:
+            player.status_effects.append("毒")
+    enemy = SPECIES[species]() if balance is None else balance.make_enemy(species)
+    if strength == "tough":
+        enemy.hp = enemy.max_hp = enemy.max_hp * TOUGH_HP
+        enemy.attack *= TOUGH_ATTACK
+    battle = Battle(player, test_mode=True, rng=rng, output=events.append, enemies=[enemy], balance=balance)
+    battle.current_enemy = enemy
+    choose = POLICIES[policy]
+    records = [_encode({"start": _state(battle), "spells": list(player.spells)})]
+    for _ in range(max_turns):
+        action = choose(battle, rng)
+        continues = battle.play_turn(*action)
+        records.append(_encode({"action": action, "events": events, "state": _state(battle)}))
+        events.clear()
+        if not continues:
+            break
+    return records
+
+
+def rolling_hashes(records):
+    """記録の列の、先頭からそのターンまでのハッシュ（先頭 HASH_CHARS 文字）をつなげた文字列"""
+    digest = hashlib.blake2b(digest_size=16)
+    hashes = []
+    for record in records:
+        digest.update(record.encode("utf-8"))
+        digest.update(b"\n")
+        hashes.append(digest.hexdigest()[:HASH_CHARS])
+    return "".join(hashes)
+
+
+def _split(hashes):
+    return [hashes[start:start + HASH_CHARS] for start in range(0, len(hashes), HASH_CHARS)]
+
+
+def first_divergence(expected, actual):
+    """2つのハッシュ列が最初に食い違うターン（同じなら None）"""
+    expected, actual = _split(expected), _split(actual)
+    for turn, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            return turn
+    if len(expected) != len(actual):
+        return min(len(expected), len(actual))  # 片方だけが先に決着した
+    return None
+
+
+def cases(matrix):
+    """照合するバトルの一覧 [(種類, レベル, 方針, 開始時の状態, 敵の強さ, 番号)]（ハッシュはこの順に保存する）"""
+    return [(species, level, policy, condition, strength, index) for species in matrix["species"]
+            for level in matrix["levels"] for policy in matrix["policies"] for condition in matrix["conditions"]
+            for strength in matrix["enemies"] for index in range(matrix["battles"])]
+
+
+def record_chunk(chunk, matrix):
+    """バトルをまとめて記録する（ワーカーで呼ばれる）"""
+    hashes, traces = [], {}
+    for case in chunk:
+        records = trace_battle(*case, seed=matrix["seed"], max_turns=matrix["max_turns"])
+        hashes.append(rolling_hashes(records))
+        if case[-1] % matrix["sample_every"] == 0:
+            traces[case_name(*case)] = records
+    return hashes, traces
+
+
+def verify_chunk(chunk, matrix, hashes, traces, max_reports=5):
+    """バトルをまとめて実行し直して照合する（ワーカーで呼ばれる）
+
+    Args:
+        hashes: chunk のバトルごとのハッシュ列（同じ順）
+        traces: {バトルの名前: 全ターンの記録}（記録のあるものだけ）
+    Returns:
+        (照合したターン数, 食い違ったバトル数, 最初の max_reports 件の [Divergence])
+    """
+    turns = diverged = 0
+    divergences = []
+    for case, golden in zip(chunk, hashes):
+        name = case_name(*case)
+        records = trace_battle(*case, seed=matrix["seed"], max_turns=matrix["max_turns"])
+        turns += len(records) - 1
+        turn = first_divergence(golden, rolling_hashes(records))
+        if turn is None:
+            continue
+        diverged += 1
+        if len(divergences) >= max_reports:
+            continue
+        expected = traces.get(name)
+        if expected is not None:
+            expected = expected[turn] if turn < len(expected) else None
+        divergences.append(Divergence(name, turn, expected, records[turn] if turn < len(records) else None))
+    return turns, diverged, divergences
+
+
+def _chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _run(function, arguments, workers):
+    """function を arguments の各列（チャンクごとの引数）で呼ぶ（workers が1以外ならワーカーで並列に）"""
+    if workers == 1:
+        return list(map(function, *arguments))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, *arguments))
+
+
+def record(species=None, levels=DEFAULT_LEVELS, policies=None, conditions=CONDITIONS, enemies=ENEMIES, battles=40,
+           seed=0, max_turns=100, sample_every=50, workers=None, chunk_size=500):
+    """ゴールデントレースを作る（既定のバランス表で）"""
+    matrix = {"species": list(species or SPECIES), "levels": list(levels), "policies": list(policies or POLICIES),
+              "conditions": list(conditions), "enemies": list(enemies), "battles": battles, "seed": seed,
+              "max_turns": max_turns, "sample_every": sample_every}
+    golden = {"version": FORMAT_VERSION, "content": DEFAULT_BALANCE.digest, "matrix": matrix,
+              "hashes": [], "traces": {}}
+    chunks = _chunks(cases(matrix), chunk_size)
+    for hashes, traces in _run(record_chunk, (chunks, [matrix] * len(chunks)), workers):
+        golden["hashes"].extend(hashes)
+        golden["traces"].update(traces)
+    return golden
+
+
+def verify(golden, workers=None, chunk_size=500, max_reports=5):
+    """ゴールデントレースと照合する
+
+    Returns:
+        {"battles", "turns", "diverged": 食い違ったバトル数, "divergences": 最初の max_reports 件の [Divergence]}
+    Raises:
+        ValueError: ファイルの形式かバランス表が記録したときと違う（record で作り直す）
+    """
+    if golden.get("version") != FORMAT_VERSION:
+        raise ValueError(f"ゴールデンファイルの形式が違います: {golden.get('version')}")
+    if golden["content"] != DEFAULT_BALANCE.digest:
+        raise ValueError("バランス表が記録したときと違います（意図した変更なら record で作り直してください）")
+    matrix = golden["matrix"]
+    chunks = _chunks(cases(matrix), chunk_size)
+    hashes = _chunks(golden["hashes"], chunk_size)
+    traces = [{case_name(*case): golden["traces"][case_name(*case)] for case in chunk
+               if case_name(*case) in golden["traces"]} for chunk in chunks]
+    results = _run(verify_chunk, (chunks, [matrix] * len(chunks), hashes, traces, [max_reports] * len(chunks)),
+                   workers)
+    divergences = [divergence for _, _, found in results for divergence in found][:max_reports]
+    return {"battles": sum(len(chunk) for chunk in chunks), "turns": sum(result[0] for result in results),
+            "diverged": sum(result[1] for result in results), "divergences": divergences}
+
+
+def save(golden, path=DEFAULT_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(golden, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+
+
+def load(path=DEFAULT_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="バトルのゴールデントレースの記録・照合")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_command = commands.add_parser("record", help="ゴールデントレースを作り直す")
+    record_command.add_argument("-n", "--battles", type=int, default=40, help="組ごとのバトル数")
+    record_command.add_argument("--levels", type=int, nargs="+", default=list(DEFAULT_LEVELS))
+    record_command.add_argument("--sample-every", type=int, default=50, help="全記録を残す間隔")
+    record_command.add_argument("--seed", type=int, default=0)
+    verify_command = commands.add_parser("verify", help="ゴールデントレースと照合する")
+    verify_command.add_argument("--max-reports", type=int, default=5)
+    for command in (record_command, verify_command):
+        command.add_argument("-f", "--file", default=DEFAULT_PATH)
+        command.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "record":
+        golden = record(levels=args.levels, battles=args.battles, seed=args.seed, sample_every=args.sample_every,
+                        workers=args.workers)
+        save(golden, args.file)
+        print(f"{len(golden['hashes']):,}バトル（全記録 {len(golden['traces']):,}件）を {args.file} に記録しました"
+              f"（{time.perf_counter() - started:.1f}秒）")
+        return 0
+
+    try:
+        report = verify(load(args.file), args.workers, max_reports=args.max_reports)
+    except ValueError as error:
+        print(error)
+        return 2
+    print(f"{report['battles']:,}バトル / {report['turns']:,}ターン を {time.perf_counter() - started:.1f}秒で照合"
+          f"（食い違い {report['diverged']:,}バトル）")
+    for divergence in report["divergences"]:
+        print(f"食い違い {divergence.case}: ターン{divergence.turn}")
+        if divergence.expected is not None:
+            print(f"  記録: {divergence.expected}")
+        print(f"  今回: {divergence.actual}")
+    return 1 if report["diverged"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
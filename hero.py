@@ -1,10 +1,84 @@
+import sys
+from types import MappingProxyType
+from elements import ElementTable
+from slime import BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
+from messages import Message
+
+# 呪文ごとの消費MP
+SPELL_COSTS = {
+    "ホイミ": 4,
+    "ベホイミ": 10,
+    "ベホマ": 20,
+    "メラ": 5,
+    "メラミ": 12,
+    "メラゾーマ": 25,
+    "ルーラ": 8,
+    "バイキルト": 15,
+    "マホカンタ": 30,
+    "ザオラル": 50
+}
+
+# 攻撃呪文の基本ダメージ
+SPELL_DAMAGE = {
+    "メラ": 30,
+    "メラミ": 70,
+    "メラゾーマ": 150
+}
+
+ATTACK_SPELLS = tuple(SPELL_DAMAGE)
+
+# 攻撃呪文の属性
+SPELL_ELEMENTS = {
+    "メラ": "火",
+    "メラミ": "火",
+    "メラゾーマ": "火"
+}
+
+# 属性倍率表（全バトルで共有するので固定する。標準のスライムに無い相性は表を変えずに計算される）
+ELEMENT_TABLE = ElementTable(elements=SPELL_ELEMENTS.values(),
+                             affinities=dict.fromkeys((cls().weakness, cls().resistance) for cls in (
+                                 BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime)),
+                             frozen=True)
+
+# 回復呪文の回復量
+SPELL_HEAL = {
+    "ホイミ": 30,
+    "ベホイミ": 75,
+    "ベホマ": 200
+}
+
+# 賢者がレベルアップで習得する呪文
+SPELL_LEARN_LEVELS = {
+    3: ["ベホイミ", "メラミ"],
+    5: ["ベホマ", "メラゾーマ"],
+    7: ["ルーラ"],
+    10: ["バイキルト", "マホカンタ"],
+    15: ["ザオラル"]
+}
+
+# 装備スロット（何も装備していない状態は全員で共有する）
+EQUIPMENT_SLOTS = ("武器", "防具", "装飾品")
+NO_EQUIPMENT = MappingProxyType(dict.fromkeys(EQUIPMENT_SLOTS))
+
+SAGE_STARTING_SPELLS = ("ホイミ", "メラ")
+
+
+def intern_spells(spells):
+    """呪文名の並びを、同じ文字列オブジェクトを共有するタプルにする"""
+    return tuple(sys.intern(spell) for spell in spells)
+
+
 class Equipment:
+    __slots__ = ("name", "equipment_type", "stats")
+
     def __init__(self, name, equipment_type, stats):
         self.name = name
         self.equipment_type = equipment_type  # "武器", "防具", "装飾品"
         self.stats = stats  # 装備品のステータス変更値を辞書で保持
 
 class UltimateWeapon(Equipment):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="破壊神の杖",
@@ -17,6 +91,8 @@ class UltimateWeapon(Equipment):
         )
 
 class UltimateArmor(Equipment):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="賢者のローブ",
@@ -29,6 +105,8 @@ class UltimateArmor(Equipment):
         )
 
 class UltimateAccessory(Equipment):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="精霊の首飾り",
@@ -41,6 +119,10 @@ class UltimateAccessory(Equipment):
         )
 
 class AllyCharacter:
+    # 大量のキャラクターを同時に持てるよう、インスタンスごとの __dict__ を持たない
+    __slots__ = ("hp", "max_hp", "mp", "max_mp", "attack", "defense", "name", "exp", "gold", "level",
+                 "job", "magic_attack", "magic_defense", "spells", "status_effects", "equipment")
+
     def __init__(self):
         self.hp = 1
         self.max_hp = 1
@@ -50,17 +132,19 @@ class AllyCharacter:
         self.defense = 1
         self.name = "味方キャラクター"
         self.exp = 0
+        self.gold = 0
         self.level = 1
         self.job = "未設定"
         self.magic_attack = 1
         self.magic_defense = 1
-        self.spells = []
+        self.spells = ()  # 呪文名のタプル（習得時に作り直す）
         self.status_effects = []  # 状態異常を管理するリストを追加
-        self.equipment = {
-            "武器": None,
-            "防具": None,
-            "装飾品": None
-        }
+        self.equipment = NO_EQUIPMENT  # 読み取り専用（装備の変更時に作り直す）
+
+    def take_damage(self, damage):
+        """ダメージを受ける処理"""
+        self.hp = max(0, self.hp - damage)
+        return self.hp <= 0  # True if defeated
 
     def get_status(self):
         return {
@@ -74,6 +158,7 @@ class AllyCharacter:
             "魔力": self.magic_attack,
             "魔法防御": self.magic_defense,
             "経験値": self.exp,
+            "ゴールド": self.gold,
             "使用可能な呪文": self.spells,
             "武器": self.equipment["武器"].name if self.equipment["武器"] else "なし",
             "防具": self.equipment["防具"].name if self.equipment["防具"] else "なし",
@@ -97,35 +182,41 @@ class AllyCharacter:
         if equipment.equipment_type not in self.equipment:
             return f"その装備品は装備できない！"
 
-        # 既存の装備を外す
+        # 既存の装備を外す（HP・MPの上限での切り詰めは付け替え後にまとめて行う）
         old_equipment = self.equipment[equipment.equipment_type]
         if old_equipment:
             for stat, value in old_equipment.stats.items():
                 if stat == "hp":
                     self.max_hp -= value
-                    self.hp = min(self.hp, self.max_hp)
                 elif stat == "mp":
                     self.max_mp -= value
-                    self.mp = min(self.mp, self.max_mp)
                 else:
                     setattr(self, stat, getattr(self, stat) - value)
 
-        # 新しい装備を付ける
-        self.equipment[equipment.equipment_type] = equipment
+        # 新しい装備を付ける（装備一覧は共有されうるので書き換えずに作り直す）
+        self.set_equipment_slot(equipment.equipment_type, equipment)
         for stat, value in equipment.stats.items():
             if stat == "hp":
                 self.max_hp += value
-                self.hp = min(self.hp, self.max_hp)
             elif stat == "mp":
                 self.max_mp += value
-                self.mp = min(self.mp, self.max_mp)
             else:
                 setattr(self, stat, getattr(self, stat) + value)
+        self.hp = min(self.hp, self.max_hp)
+        self.mp = min(self.mp, self.max_mp)
 
         return f"{equipment.name}を装備した！"
 
+    def set_equipment_slot(self, slot, equipment):
+        """ステータスを変えずに装備スロットの中身だけを差し替える（保存データの復元にも使う）"""
+        slots = dict(self.equipment)
+        slots[slot] = equipment
+        self.equipment = MappingProxyType(slots)
+
 
 class Sage(AllyCharacter):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__()
         self.name = name
@@ -139,13 +230,9 @@ class Sage(AllyCharacter):
         self.defense = 10
         self.magic_attack = 25
         self.magic_defense = 20
-        self.spells = ["ホイミ", "メラ"]  # 初期呪文
+        self.spells = SAGE_STARTING_SPELLS  # 初期呪文（全員で共有するタプル）
         self.status_effects = []
-        self.equipment = {
-            "武器": None,
-            "防具": None,
-            "装飾品": None
-        }
+        self.equipment = NO_EQUIPMENT
 
     def level_up(self):
         """レベルアップ時のステータス上昇と新しい呪文の習得"""
@@ -160,22 +247,12 @@ class Sage(AllyCharacter):
         self.magic_defense += 2
 
         # 新しい呪文の習得（重複を防ぐ）
-        new_spells = []
-        if self.level == 3:
-            new_spells = ["ベホイミ", "メラミ"]
-        elif self.level == 5:
-            new_spells = ["ベホマ", "メラゾーマ"]
-        elif self.level == 7:
-            new_spells = ["ルーラ"]
-        elif self.level == 10:
-            new_spells = ["バイキルト", "マホカンタ"]
-        elif self.level == 15:
-            new_spells = ["ザオラル"]
+        new_spells = SPELL_LEARN_LEVELS.get(self.level, [])
 
         # 重複を防いで追加
-        for spell in new_spells:
-            if spell not in self.spells:
-                self.spells.append(spell)
+        learned = tuple(spell for spell in new_spells if spell not in self.spells)
+        if learned:
+            self.spells += learned
 
     def get_next_level_exp(self):
         """次のレベルに必要な経験値を計算"""
@@ -183,75 +260,52 @@ class Sage(AllyCharacter):
         multiplier = 1.5
         return int(base * (multiplier ** (self.level - 1)))
 
-    def cast_spell(self, spell_name, target=None):
-        """呪文を使用する"""
-        spell_costs = {
-            "ホイミ": 4,
-            "ベホイミ": 10,
-            "ベホマ": 20,
-            "メラ": 5,
-            "メラミ": 12,
-            "メラゾーマ": 25,
-            "ルーラ": 8,
-            "バイキルト": 15,
-            "マホカンタ": 30,
-            "ザオラル": 50
-        }
-
-        spell_damage = {
-            "メラ": 30,
-            "メラミ": 70,
-            "メラゾーマ": 150
-        }
+    def cast_spell(self, spell_name, target=None, balance=None):
+        """呪文を使用する（結果は表示前の Message で返す）
 
+        balance: 消費MPと効果量を引くバランス表（省略時はこのモジュールの表）
+        """
         if spell_name not in self.spells:
-            return f"{self.name}は{spell_name}を使えない！"
-        
-        cost = spell_costs.get(spell_name, 0)
+            return Message("spell.cannot_use", caster=self.name, spell=spell_name)
+
+        if balance is None:
+            costs, damage_table, heal_table = SPELL_COSTS, SPELL_DAMAGE, SPELL_HEAL
+        else:
+            costs, damage_table, heal_table = balance.spell_costs, balance.spell_damage, balance.spell_heal
+        cost = costs.get(spell_name, 0)
         if self.mp < cost:
-            return f"MPが足りない！ あと{cost - self.mp}必要"
+            return Message("spell.not_enough_mp", shortage=cost - self.mp)
 
         self.mp -= cost
         
         # 呪文の効果
-        if spell_name == "ホイミ":
-            heal = 30
-            if target:
-                target.hp = min(target.max_hp, target.hp + heal)
-            return f"{target.name if target else self.name}のHPが{heal}回復した！"
-        
-        elif spell_name == "ベホイミ":
-            heal = 75
+        if spell_name in heal_table:
+            heal = heal_table[spell_name]
             if target:
                 target.hp = min(target.max_hp, target.hp + heal)
-            return f"{target.name if target else self.name}のHPが{heal}回復した！"
+            return Message("spell.heal", target=target.name if target else self.name, amount=heal)
         
-        elif spell_name == "ベホマ":
-            heal = 200
+        elif spell_name in ATTACK_SPELLS:
             if target:
-                target.hp = min(target.max_hp, target.hp + heal)
-            return f"{target.name if target else self.name}のHPが{heal}回復した！"
-        
-        elif spell_name in ["メラ", "メラミ", "メラゾーマ"]:
-            if target:
-                damage = spell_damage[spell_name]
+                damage = ELEMENT_TABLE.damage(damage_table[spell_name], SPELL_ELEMENTS[spell_name], target)
                 target.take_damage(damage)
-            return f"{self.name}は{spell_name}を唱えた！\n炎のダメージ（{'小' if spell_name == 'メラ' else '中' if spell_name == 'メラミ' else '大'}）"
+            power = ("spell.power_small" if spell_name == "メラ" else
+                     "spell.power_medium" if spell_name == "メラミ" else "spell.power_large")
+            return Message("spell.attack", caster=self.name, spell=spell_name, power=Message(power))
         
         elif spell_name == "ルーラ":
-            return f"{self.name}はルーラを唱えた！\n好きな場所に移動できる！"
+            return Message("spell.warp", caster=self.name)
         
         elif spell_name == "バイキルト":
             if target:
                 target.attack *= 2
-            return f"{target.name if target else self.name}の攻撃力が2倍になった！"
+            return Message("spell.attack_up", target=target.name if target else self.name)
         
         elif spell_name == "マホカンタ":
-            return f"{self.name}は魔法を跳ね返すバリアを張った！"
+            return Message("spell.reflect", caster=self.name)
         
         elif spell_name == "ザオラル":
-            return f"{self.name}は復活の呪文を唱えた！"
-
+            return Message("spell.revive", caster=self.name)
 
 if __name__ == "__main__":
     # 賢者のインスタンスを作成してテスト
@@ -0,0 +1,111 @@
+"""スクリプトからの入力で main() やバトルの入力待ちを自動で進める
+
+input() の代わりに ScriptedInput を main(input_func=...) や Battle(input_func=...) に渡すと、
+プロンプトでの往復なしにコマンドを順に返す。コマンドはリスト・ジェネレーター・ファイルから読める。
+
+スクリプトファイルは1行に1つの入力を書く（# 以降はコメント、空行は無視する）:
+
+    てるた      # 名前
+    1           # 攻撃
+    2           # 呪文
+    メラ        # 呪文は番号のほか名前でも選べる
+    1           # 続ける
+"""
+import sys
+import time
+import random
+import argparse
+from itertools import chain, repeat
+
+
+class ScriptExhausted(EOFError):
+    """スクリプトのコマンドを使い切った（input() の入力の終わりと同じく EOFError として扱われる）"""
+
+
+def parse_script(lines):
+    """スクリプトの行からコマンドを取り出す"""
+    for line in lines:
+        command = line.split("#", 1)[0].strip()
+        if command:
+            yield command
+
+
+class ScriptedInput:
+    """コマンドを順に返す入力関数
+
+    Args:
+        commands: コマンドの並び（リスト・ジェネレーターなど、無限でもよい）
+        echo: プロンプトと入力を書き出す関数（省略時は何も表示しない、プロンプトも整形しない）
+    """
+
+    def __init__(self, commands, echo=None):
+        self._commands = iter(commands)
+        self.echo = echo
+        self.consumed = 0
+
+    @classmethod
+    def from_file(cls, path, echo=None):
+        with open(path, encoding="utf-8") as f:
+            return cls(list(parse_script(f)), echo)
+
+    def __call__(self, prompt=""):
+        try:
+            command = next(self._commands)
+        except StopIteration:
+            raise ScriptExhausted(f"スクリプトの{self.consumed}個のコマンドを使い切りました") from None
+        self.consumed += 1
+        if self.echo is not None:
+            self.echo(f"{prompt}{command}")
+        return str(command)
+
+
+def keep_attacking(name, count=None):
+    """名前を入力したあと "1"（攻撃、バトルの後は「続ける」）を count 回入力するジェネレーター
+
+    count を省略したら賢者が倒れるまで続ける。
+    """
+    return chain([name], repeat("1") if count is None else repeat("1", count))
+
+
+def _discard(*args, **kwargs):
+    """ゲームの出力を捨てる"""
+
+
+def run_sessions(commands, sessions, seed=0, output=None):
+    """同じスクリプトで main() を繰り返し実行する（進行状況は保存しない）
+
+    output を渡すとゲームの出力とプロンプト・入力を書き出す（省略時は捨てる）。
+
+    Returns:
+        (プレイヤーのリスト, 秒数)
+    """
+    from slime_battle import main
+
+    players = []
+    started = time.perf_counter()
+    for number in range(sessions):
+        read = ScriptedInput(commands, echo=output)
+        players.append(main(store_path=None, input_func=read, output=output or _discard,
+                            rng=random.Random(f"{seed}:{number}")))
+    return players, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="スクリプトの入力でゲームを最後まで自動で進める")
+    parser.add_argument("script", help="コマンドを1行に1つずつ書いたファイル")
+    parser.add_argument("-n", "--sessions", type=int, default=1, help="繰り返すセッション数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", action="store_true", help="ゲームの出力を表示する")
+    args = parser.parse_args(argv)
+
+    with open(args.script, encoding="utf-8") as f:
+        commands = list(parse_script(f))
+    players, seconds = run_sessions(commands, args.sessions, args.seed, print if args.show else None)
+    levels = [player.level for player in players if player is not None]
+    print(f"{args.sessions:,}セッション {seconds:.2f}秒（{args.sessions / max(seconds, 1e-9):,.0f}セッション/秒）"
+          f"  最終レベル {min(levels, default=0)}〜{max(levels, default=0)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""装備の組み合わせ（武器・防具・装飾品を1つずつ）を遭遇表に対して最適化する
+
+1つの組み合わせの評価にバトルを何千回も回す代わりに、通常攻撃だけで戦う賢者と
+1種類のスライムとのバトルを閉じた式で見積もる（命中の回数は負の二項分布、
+敵の逃走は毎ターン一定の確率、賢者が倒れるターンは期待ダメージの累計から求める）。
+見積もりは敵の種類ごとに「倒すのに必要な命中数」と「賢者が倒れる敵の行動回数」の組でキャッシュする。
+
+探索は次の順に行う:
+    1. スロットごとに、別の装備と比べてどの能力値（攻撃力・守備力・最大HP）も上回らない装備を除く
+    2. スロットを順に決める分枝限定法。残りのスロットにそれぞれの最大値が乗った楽観的な能力値で
+       上界を見積もり、これまでの最良の組み合わせに届かない枝を切る
+
+どちらの目的（勝率、ターンあたりの獲得経験値）も能力値について単調に増えるように定義しているので、
+1 と 2 で最適な組み合わせを取りこぼすことはない。ターンあたりの経験値では、負けたバトルは
+max_turns ターン分に数える（負けるとセッションが終わるので、長く粘って負けるほうが得にはならない）。
+"""
+import sys
+import math
+import time
+import random
+import argparse
+from collections import namedtuple
+from slime import PoisonSlime, KingSlime
+from hero import EQUIPMENT_SLOTS, Equipment
+from balance import DEFAULT_BALANCE, SPECIES_CLASSES
+from simulator import BattleConfig, EQUIPMENT, make_sage, run_battle
+
+# 通常攻撃だけで戦うときに勝敗へ効く能力値（装備の stats のキー、"hp" は最大HP）
+STATS = ("attack", "defense", "hp")
+OBJECTIVES = ("win_rate", "exp_per_turn")
+
+HIT_CHANCE = 0.95  # Battle.player_attack の命中率
+SPECIAL_CHANCE = 0.3  # Battle.enemy_turn の特殊能力の発動率
+
+Estimate = namedtuple("Estimate", "win_rate exp turns exp_per_turn")
+Loadout = namedtuple("Loadout", "items stats estimate score")
+
+
+def item_vector(item):
+    """装備の能力値のうち STATS の分"""
+    return tuple(item.stats.get(stat, 0) for stat in STATS)
+
+
+class Opponent:
+    """1種類のスライムとのバトルの見積もり"""
+
+    def __init__(self, enemy, escape, max_turns):
+        self.hp = enemy.hp
+        self.attack = enemy.attack
+        self.defense = enemy.defense
+        self.exp = enemy.exp
+        self.escape = escape
+        self.max_turns = max_turns
+        self.special = None
+        if enemy.special_ability and isinstance(enemy, (PoisonSlime, KingSlime)):
+            self.special = PoisonSlime if isinstance(enemy, PoisonSlime) else KingSlime
+        self._deaths = {}
+        self._outcomes = {}
+
+    def hits_needed(self, attack):
+        return math.ceil(self.hp / max(1, attack - self.defense // 2))
+
+    def death_turn(self, defense, max_hp):
+        """賢者が倒れる敵の行動の回数（max_turns までに倒れなければ max_turns + 1）
+
+        各ターンの期待ダメージを足し合わせ、最大HPに届いたターンとする。
+        """
+        key = (defense, max_hp)
+        turn = self._deaths.get(key)
+        if turn is not None:
+            return turn
+        normal = max(1, self.attack - defense // 2)
+        poison = 0
+        if self.special is KingSlime:
+            per_turn = (1 - SPECIAL_CHANCE) * normal + SPECIAL_CHANCE * max(1, self.attack * 2 - defense // 2)
+        elif self.special is PoisonSlime:
+            per_turn = (1 - SPECIAL_CHANCE) * normal
+            poison = max(1, max_hp // 10)  # Battle.process_status_effects の毒のダメージ
+        else:
+            per_turn = normal
+        damage = 0.0
+        healthy = 1.0  # まだ毒を受けていない確率
+        turn = self.max_turns + 1
+        for number in range(1, self.max_turns + 1):
+            if poison:
+                healthy *= 1 - SPECIAL_CHANCE
+            damage += per_turn + poison * (1 - healthy)
+            if damage >= max_hp:
+                turn = number
+                break
+        self._deaths[key] = turn
+        return turn
+
+    def estimate(self, stats):
+        """(勝率, 獲得経験値の期待値, ターン数の期待値) を見積もる（負けは max_turns ターンに数える）"""
+        attack, defense, max_hp = stats
+        key = (self.hits_needed(attack), self.death_turn(defense, max_hp))
+        outcome = self._outcomes.get(key)
+        if outcome is None:
+            outcome = self._outcomes[key] = self._outcome(*key)
+        return outcome
+
+    def _outcome(self, hits, death):
+        """命中数 hits で勝ち、敵の death 回目の行動で負けるバトルの結果の分布を足し合わせる"""
+        limit = self.max_turns
+        stay = 1 - self.escape
+        win = exp = turns = 0.0
+        pmf = HIT_CHANCE ** hits  # ちょうど number ターン目に hits 回目の命中をする確率
+        below = 1.0  # number ターンまでの命中が hits 回に届かない確率
+        alive = 1.0  # 敵がここまで逃げずにいる確率
+        for number in range(1, min(limit, death) + 1):
+            if number >= hits:
+                if number > hits:
+                    pmf *= (number - 1) / (number - hits) * (1 - HIT_CHANCE)
+                below -= pmf
+                won = pmf * alive
+                win += won
+                turns += won * number
+            ongoing = below * alive
+            escaped = ongoing * self.escape
+            exp += escaped * (self.exp // 3)
+            turns += escaped * number
+            alive *= stay
+            if number == death:
+                turns += ongoing * stay * limit  # 負け
+            elif number == limit:
+                turns += ongoing * stay * limit  # 打ち切り
+        return win, exp + win * self.exp, turns
+
+
+class EncounterModel:
+    """遭遇表（スライムの種類 → 出現の重み）に対する装備の評価
+
+    Args:
+        encounters: {種類名: 重み}（省略時は Battle の標準の出現候補を同じ重みで）
+        level: 賢者のレベル
+        balance: バランス表のスナップショット（省略時は既定値）
+        max_turns: これを超えたら打ち切り
+    """
+
+    def __init__(self, encounters=None, level=1, balance=None, max_turns=100):
+        balance = balance if balance is not None else DEFAULT_BALANCE
+        encounters = encounters if encounters is not None else dict.fromkeys(SPECIES_CLASSES, 1)
+        for species, weight in encounters.items():
+            if species not in SPECIES_CLASSES:
+                raise ValueError(f"未知のスライム: {species}")
+            if weight < 0:
+                raise ValueError(f"出現の重みは0以上です: {species}")
+        total = sum(encounters.values())
+        if total <= 0:
+            raise ValueError("遭遇表が空です")
+        sage = make_sage(level)
+        self.level = level
+        self.balance = balance
+        self.max_turns = max_turns
+        self.encounters = dict(encounters)
+        self.base = (sage.attack, sage.defense, sage.max_hp)
+        self.opponents = []
+        for species, weight in encounters.items():
+            if weight:
+                enemy = balance.make_enemy(species)
+                self.opponents.append((weight / total, Opponent(enemy, balance.escape_chance(enemy), max_turns)))
+        self.evaluated = 0
+
+    def evaluate(self, bonus):
+        """装備による能力値の増分 bonus（STATS の順）の見積もり"""
+        self.evaluated += 1
+        stats = tuple(base + extra for base, extra in zip(self.base, bonus))
+        win = exp = turns = 0.0
+        for weight, opponent in self.opponents:
+            won, gained, spent = opponent.estimate(stats)
+            win += weight * won
+            exp += weight * gained
+            turns += weight * spent
+        return Estimate(win, exp, turns, exp / turns if turns else 0.0)
+
+
+def group_by_slot(catalog):
+    """装備をスロットごとに分ける（知らないスロットの装備があれば ValueError）"""
+    slots = {slot: [] for slot in EQUIPMENT_SLOTS}
+    for item in catalog:
+        if item.equipment_type not in slots:
+            raise ValueError(f"未知のスロット: {item.equipment_type}（{item.name}）")
+        slots[item.equipment_type].append(item)
+    return slots
+
+
+def prune_dominated(items):
+    """別の装備（または何も付けないこと）と比べてどの能力値も上回らない装備を除く
+
+    Returns:
+        [(能力値, 装備または None)] 能力値の大きい順。能力値が同じ装備は最初のものだけを残す
+    """
+    candidates = [(item_vector(item), index, item) for index, item in enumerate(items)]
+    candidates.append(((0,) * len(STATS), len(items), None))
+    candidates.sort(key=lambda candidate: (tuple(-value for value in candidate[0]), candidate[1]))
+    front = []
+    for vector, _, item in candidates:
+        # 辞書順で大きいものから見るので、支配する側は必ず先に残っている
+        if any(all(a >= b for a, b in zip(kept, vector)) for kept, _ in front):
+            continue
+        front.append((vector, item))
+    return front
+
+
+def _add(a, b):
+    return tuple(x + y for x, y in zip(a, b))
+
+
+def optimize(catalog, model, objective="win_rate"):
+    """目的の見積もりが最大になる装備の組み合わせを探す
+
+    Args:
+        catalog: 装備（Equipment）の並び
+        model: EncounterModel
+        objective: "win_rate" または "exp_per_turn"
+    Returns:
+        (Loadout, 探索の統計の dict)
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"未知の目的: {objective}")
+    started = time.perf_counter()
+    evaluated = model.evaluated
+    slots = group_by_slot(catalog)
+    fronts = [prune_dominated(slots[slot]) for slot in EQUIPMENT_SLOTS]
+    zero = (0,) * len(STATS)
+    # optimistic[i]: i 番目以降のスロットの能力値をそれぞれ最大にした増分
+    optimistic = [zero] * (len(fronts) + 1)
+    for index in range(len(fronts) - 1, -1, -1):
+        best_of_slot = tuple(max(vector[n] for vector, _ in fronts[index]) for n in range(len(STATS)))
+        optimistic[index] = _add(optimistic[index + 1], best_of_slot)
+
+    def score(bonus):
+        return getattr(model.evaluate(bonus), objective)
+
+    best = [-1.0, None, None]  # 目的の値, 能力値の増分, 装備
+    nodes = 0
+
+    def search(index, bonus, chosen):
+        nonlocal nodes
+        nodes += 1
+        if index == len(fronts):
+            value = score(bonus)
+            if value > best[0]:
+                best[:] = [value, bonus, chosen]
+            return
+        children = []
+        for vector, item in fronts[index]:
+            child = _add(bonus, vector)
+            children.append((score(_add(child, optimistic[index + 1])), child, item))
+        children.sort(key=lambda entry: -entry[0])  # 上界の高い枝から見る
+        for bound, child, item in children:
+            if bound <= best[0]:
+                break
+            search(index + 1, child, chosen + (item,))
+
+    search(0, zero, ())
+    _, bonus, chosen = best
+    estimate = model.evaluate(bonus)
+    loadout = Loadout(dict(zip(EQUIPMENT_SLOTS, chosen)), _add(model.base, bonus), estimate,
+                      getattr(estimate, objective))
+    stats = {"items": len(catalog), "candidates": sum(item is not None for front in fronts for _, item in front),
+             "nodes": nodes, "evaluated": model.evaluated - evaluated,
+             "seconds": time.perf_counter() - started}
+    return loadout, stats
+
+
+def verify(items, model, battles=1000, seed=0):
+    """見積もりを実際のバトルで確かめる（毎回新しい賢者に装備させ、遭遇表から敵を選ぶ）
+
+    Returns:
+        見積もりと同じ数え方の Estimate
+    """
+    rng = random.Random(seed)
+    species = list(model.encounters)
+    weights = [model.encounters[name] for name in species]
+    wins = exp = turns = 0
+    for _ in range(battles):
+        sage = make_sage(model.level)
+        for item in items.values():
+            if item is not None:
+                sage.equip(item)
+        sage.hp = sage.max_hp
+        config = BattleConfig(rng.choices(species, weights)[0], model.level)
+        outcome, spent, gained, _ = run_battle(config, rng, model.max_turns, player=sage, balance=model.balance)
+        wins += outcome == "win"
+        exp += gained
+        turns += model.max_turns if outcome == "lose" else spent
+    return Estimate(wins / battles, exp / battles, turns / battles, exp / turns if turns else 0.0)
+
+
+def random_catalog(count, seed=0):
+    """能力値がランダムな装備を count 個作る（探索の計測用）"""
+    rng = random.Random(seed)
+    catalog = []
+    for number in range(count):
+        slot = EQUIPMENT_SLOTS[number % len(EQUIPMENT_SLOTS)]
+        stats = {stat: rng.randint(0, 60) for stat in rng.sample(STATS, rng.randint(1, len(STATS)))}
+        if rng.random() < 0.5:
+            stats["mp"] = rng.randint(0, 50)
+        catalog.append(Equipment(f"{slot}{number}", slot, stats))
+    return catalog
+
+
+def parse_encounters(entries):
+    """["KingSlime=2", "MetalSlime"] のような指定を {種類名: 重み} にする"""
+    encounters = {}
+    for entry in entries:
+        species, _, weight = entry.partition("=")
+        encounters[species] = float(weight) if weight else 1.0
+    return encounters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="遭遇表に対して最適な装備の組み合わせを探す")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--pack", help="装備を読むコンテンツパックのバンドル（省略時は最強装備）")
+    source.add_argument("--random", type=int, metavar="N", help="能力値がランダムな装備 N 個で探す")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--objective", default="win_rate", choices=OBJECTIVES)
+    parser.add_argument("--encounter", nargs="*", default=None, metavar="種類[=重み]",
+                        help="遭遇表（省略時は全種類を同じ重みで）")
+    parser.add_argument("--max-turns", type=int, default=100)
+    parser.add_argument("--verify", type=int, default=0, metavar="N", help="見つけた組み合わせで N 回バトルして確かめる")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.pack:
+        from content_pack import ContentPack
+        with ContentPack(args.pack) as pack:
+            catalog = [pack.make_equipment(name) for name in pack.keys("equipment")]
+    elif args.random:
+        catalog = random_catalog(args.random, args.seed)
+    else:
+        catalog = [cls() for cls in EQUIPMENT.values()]
+    encounters = parse_encounters(args.encounter) if args.encounter else None
+    model = EncounterModel(encounters, args.level, max_turns=args.max_turns)
+    loadout, stats = optimize(catalog, model, args.objective)
+
+    print(f"装備 {stats['items']:,}個（候補 {stats['candidates']:,}個） 節点 {stats['nodes']:,} "
+          f"評価 {stats['evaluated']:,}回 {stats['seconds']:.2f}秒")
+    for slot, item in loadout.items.items():
+        print(f"  {slot}: {item.name if item is not None else '（なし）'}")
+    attack, defense, max_hp = loadout.stats
+    print(f"  攻撃力 {attack}  守備力 {defense}  最大HP {max_hp}")
+    estimate = loadout.estimate
+    print(f"見積もり  勝率 {estimate.win_rate:.3f}  経験値/ターン {estimate.exp_per_turn:.3f}")
+    if args.verify:
+        measured = verify(loadout.items, model, args.verify, args.seed)
+        print(f"実測      勝率 {measured.win_rate:.3f}  経験値/ターン {measured.exp_per_turn:.3f}"
+              f"（{args.verify:,}バトル）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import sys
+import gc
+import argparse
+import tracemalloc
+from collections.abc import Mapping
+from slime import BaseSlime, KingSlime, MetalKingSlime
+from hero import Sage
+from slime_battle import Player
+from simulator import make_sage
+
+# 計測するエンティティの種類 → 生成関数
+ENTITY_FACTORIES = {
+    "BaseSlime": BaseSlime,
+    "KingSlime": KingSlime,
+    "MetalKingSlime": MetalKingSlime,
+    "Player": lambda: Player("プレイヤー"),
+    "Sage": lambda: Sage("賢者"),
+    "Sage(Lv15・最強装備)": lambda: make_sage(15, ("UltimateWeapon", "UltimateArmor", "UltimateAccessory")),
+}
+
+
+class _DictLayout:
+    """__slots__ 導入前と同じく、属性を __dict__ に持つオブジェクト"""
+
+
+def legacy_layout(entity):
+    """同じ中身を以前の持ち方（__dict__、インスタンスごとのリスト・辞書）で作り直す"""
+    legacy = _DictLayout()
+    for cls in type(entity).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if not hasattr(entity, name):
+                continue
+            value = getattr(entity, name)
+            if isinstance(value, (list, tuple)):
+                value = list(value)
+            elif isinstance(value, Mapping):
+                value = dict(value)
+            setattr(legacy, name, value)
+    return legacy
+
+
+def measure(factory, count):
+    """count 個のエンティティを保持したときの1個あたりのバイト数"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        entities = [factory() for _ in range(count)]
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # 入れ物のリスト自体の大きさは除く
+    return (after - before - sys.getsizeof(entities)) / count
+
+
+def run_benchmark(count=10000, names=None):
+    """種類ごとに {"before": バイト数, "after": バイト数} を返す"""
+    results = {}
+    for name in names or ENTITY_FACTORIES:
+        factory = ENTITY_FACTORIES[name]
+        results[name] = {
+            "before": measure(lambda: legacy_layout(factory()), count),
+            "after": measure(factory, count),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="エンティティ1個あたりのメモリ使用量を計測する")
+    parser.add_argument("-n", "--count", type=int, default=100000, help="種類ごとに生成する数")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.count)
+    print(f"{'種類':<24}{'以前(B)':>10}{'現在(B)':>10}{'削減率':>8}")
+    for name, sizes in results.items():
+        saved = 1 - sizes["after"] / sizes["before"]
+        print(f"{name:<24}{sizes['before']:>10.0f}{sizes['after']:>10.0f}{saved:>8.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
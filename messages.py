@@ -0,0 +1,264 @@
+import sys
+from string import Formatter
+
+DEFAULT_LOCALE = "ja"
+
+# メッセージID → テンプレート（日本語）
+MESSAGES_JA = {
+    # バトルの進行
+    "battle.rule_open": "\n" + "=" * 50,
+    "battle.rule": "=" * 50,
+    "battle.turn": "\n" + "-" * 20 + " ターン {turn} " + "-" * 20,
+    "battle.appear": "野生の{enemy}が現れた！",
+    "battle.enemy_info": "\n【敵の情報】",
+    "battle.enemy_type": "種類: {value}",
+    "battle.enemy_hp": "HP: {value}",
+    "battle.enemy_attack": "攻撃力: {value}",
+    "battle.enemy_defense": "防御力: {value}",
+    "battle.enemy_ability": "特殊能力: {value}",
+    "battle.enemy_weakness": "弱点: {value}",
+    "battle.enemy_resistance": "耐性: {value}",
+    # 行動の選択
+    "menu.your_turn": "\nあなたのターン！",
+    "menu.option": "{number}: {label}",
+    "menu.attack": "攻撃",
+    "menu.spell": "呪文",
+    "menu.escape": "逃げる",
+    "menu.back": "戻る",
+    "menu.action_prompt": "行動を選択してください (1-3): ",
+    "menu.invalid_action": "無効な選択です。1から3の数字を入力してください。",
+    "menu.spell_list": "\n使用可能な呪文:",
+    "menu.spell_prompt": "呪文を選択してください (1-{last}): ",
+    "menu.invalid_choice": "無効な選択です。",
+    # 攻撃・ダメージ
+    "battle.spell_result": "\n{result}",
+    "battle.attack": "\n{attacker}の攻撃！",
+    "battle.attack_miss": "\n{attacker}の攻撃！しかし、外れてしまった！",
+    "battle.damage": "{target}に{damage}のダメージ！",
+    "battle.super_effective": "効果は抜群だ！",
+    "battle.not_very_effective": "効果はいまひとつのようだ…",
+    "battle.poison_attack": "\n{enemy}の毒攻撃！",
+    "battle.poisoned": "{target}は毒状態になった！",
+    "battle.split_attack": "\n{enemy}の分裂攻撃！",
+    "battle.poison_damage": "\n毒のダメージ！{target}に{damage}のダメージ！",
+    # 逃走・決着
+    "battle.fled": "\n{name}は逃げ出した！",
+    "battle.escape_failed": "\n逃げ出せなかった！",
+    "battle.enemy_fled_exp": "逃げられてしまった... 経験値を{exp}獲得！",
+    "battle.enemy_defeated": "\n{enemy}を倒した！",
+    "battle.exp_gained": "経験値を{exp}獲得！",
+    "battle.gold_gained": "ゴールドを{gold}獲得！",
+    "battle.player_down": "\n{name}は力尽きた...",
+    "battle.game_over": "ゲームオーバー",
+    "battle.level_up": "\nレベルアップ！ {level}になった！",
+    "battle.stats_up": "ステータスが上昇した！",
+    # ステータス表示
+    "status.name": "【{name}】",
+    "status.enemy_name": "\n【{name}】",
+    "status.hp": "HP: {hp}/{max_hp}",
+    "status.mp": "MP: {mp}/{max_mp}",
+    "status.effects": "状態: {effects}",
+    # 呪文
+    "spell.cannot_use": "{caster}は{spell}を使えない！",
+    "spell.not_enough_mp": "MPが足りない！ あと{shortage}必要",
+    "spell.heal": "{target}のHPが{amount}回復した！",
+    "spell.attack": "{caster}は{spell}を唱えた！\n炎のダメージ（{power}）",
+    "spell.power_small": "小",
+    "spell.power_medium": "中",
+    "spell.power_large": "大",
+    "spell.warp": "{caster}はルーラを唱えた！\n好きな場所に移動できる！",
+    "spell.attack_up": "{target}の攻撃力が2倍になった！",
+    "spell.reflect": "{caster}は魔法を跳ね返すバリアを張った！",
+    "spell.revive": "{caster}は復活の呪文を唱えた！",
+    # ゲームの開始・終了
+    "game.title": "スライムバトル！",
+    "game.name_prompt": "あなたの名前を入力してください: ",
+    "game.welcome_back": "おかえりなさい、{name}！（レベル{level}）",
+    "game.continue": "続ける",
+    "game.quit": "終了",
+    "game.choice_prompt": "選択してください (1-2): ",
+}
+
+# 英語のテンプレート（無いIDは日本語で表示する）
+MESSAGES_EN = {
+    "battle.turn": "\n" + "-" * 20 + " Turn {turn} " + "-" * 20,
+    "battle.appear": "A wild {enemy} appeared!",
+    "battle.enemy_info": "\n[Enemy]",
+    "battle.enemy_type": "Type: {value}",
+    "battle.enemy_attack": "Attack: {value}",
+    "battle.enemy_defense": "Defense: {value}",
+    "battle.enemy_ability": "Ability: {value}",
+    "battle.enemy_weakness": "Weakness: {value}",
+    "battle.enemy_resistance": "Resistance: {value}",
+    "menu.your_turn": "\nYour turn!",
+    "menu.attack": "Attack",
+    "menu.spell": "Spell",
+    "menu.escape": "Run",
+    "menu.back": "Back",
+    "menu.action_prompt": "Choose an action (1-3): ",
+    "menu.invalid_action": "Invalid choice. Enter a number from 1 to 3.",
+    "menu.spell_list": "\nSpells:",
+    "menu.spell_prompt": "Choose a spell (1-{last}): ",
+    "menu.invalid_choice": "Invalid choice.",
+    "battle.attack": "\n{attacker} attacks!",
+    "battle.attack_miss": "\n{attacker} attacks! But it missed!",
+    "battle.damage": "{target} takes {damage} damage!",
+    "battle.super_effective": "It's super effective!",
+    "battle.not_very_effective": "It's not very effective...",
+    "battle.poison_attack": "\n{enemy} uses a poison attack!",
+    "battle.poisoned": "{target} is poisoned!",
+    "battle.split_attack": "\n{enemy} uses a split attack!",
+    "battle.poison_damage": "\nPoison! {target} takes {damage} damage!",
+    "battle.fled": "\n{name} ran away!",
+    "battle.escape_failed": "\nCouldn't escape!",
+    "battle.enemy_fled_exp": "It got away... Gained {exp} EXP!",
+    "battle.enemy_defeated": "\n{enemy} was defeated!",
+    "battle.exp_gained": "Gained {exp} EXP!",
+    "battle.gold_gained": "Gained {gold} gold!",
+    "battle.player_down": "\n{name} has fallen...",
+    "battle.game_over": "GAME OVER",
+    "battle.level_up": "\nLevel up! Reached level {level}!",
+    "battle.stats_up": "Stats increased!",
+    "status.effects": "Status: {effects}",
+    "spell.cannot_use": "{caster} can't use {spell}!",
+    "spell.not_enough_mp": "Not enough MP! {shortage} more needed",
+    "spell.heal": "{target} recovered {amount} HP!",
+    "spell.attack": "{caster} casts {spell}!\nFire damage ({power})",
+    "spell.power_small": "small",
+    "spell.power_medium": "medium",
+    "spell.power_large": "large",
+    "spell.warp": "{caster} casts Zoom!\nYou can travel anywhere!",
+    "spell.attack_up": "{target}'s attack doubled!",
+    "spell.reflect": "{caster} raised a spell-reflecting barrier!",
+    "spell.revive": "{caster} casts a revival spell!",
+    "game.title": "Slime Battle!",
+    "game.name_prompt": "Enter your name: ",
+    "game.welcome_back": "Welcome back, {name}! (Level {level})",
+    "game.continue": "Continue",
+    "game.quit": "Quit",
+    "game.choice_prompt": "Choose (1-2): ",
+}
+
+
+class Message(tuple):
+    """表示前のメッセージ（メッセージID, 引数）
+
+    作るときは整形せず、str() されたときに初めてテンプレートに当てはめる。
+    結果を捨てるだけのシミュレーションでは文字列の組み立てが起きない。
+    """
+    __slots__ = ()
+
+    def __new__(cls, message_id, **args):
+        return tuple.__new__(cls, (message_id, args))
+
+    def __reduce__(self):
+        # 引数はキーワードでしか渡せないので、pickle・copy では組み立て直す関数を通す
+        return _rebuild_message, (self[0], self[1])
+
+    @property
+    def id(self):
+        return self[0]
+
+    @property
+    def args(self):
+        return self[1]
+
+    def render(self, locale=None):
+        return get_catalog(locale).format(self[0], self[1])
+
+    def __str__(self):
+        return self.render()
+
+    def __contains__(self, text):
+        # 以前の文字列の戻り値と同じく `"MPが足りない" in result` で調べられるようにする
+        return text in self.render()
+
+    def __repr__(self):
+        return f"Message({self[0]!r}, **{self[1]!r})"
+
+
+def _rebuild_message(message_id, args):
+    return Message(message_id, **args)
+
+
+class Catalog:
+    """ロケールごとのテンプレート集
+
+    テンプレートは最初に使われたときに一度だけ分解し、以降は分解済みの部品をつなぐだけで整形する。
+    """
+    _formatter = Formatter()
+
+    def __init__(self, locale, templates, fallback=None):
+        self.locale = locale
+        self.templates = {sys.intern(message_id): template for message_id, template in templates.items()}
+        self.fallback = fallback
+        self._parsed = {}
+
+    def template(self, message_id):
+        template = self.templates.get(message_id)
+        if template is None:
+            if self.fallback is None:
+                raise KeyError(f"未登録のメッセージ: {message_id}")
+            return self.fallback.template(message_id)
+        return template
+
+    def parsed(self, message_id):
+        """分解済みのテンプレート（(文字列, 引数名, 書式) の並び）"""
+        parts = self._parsed.get(message_id)
+        if parts is None:
+            parts = tuple((literal, field, spec or "")
+                          for literal, field, spec, _ in self._formatter.parse(self.template(message_id)))
+            self._parsed[sys.intern(message_id)] = parts
+        return parts
+
+    def format(self, message_id, args):
+        pieces = []
+        for literal, field, spec in self.parsed(message_id):
+            pieces.append(literal)
+            if field is not None:
+                value = args[field]
+                if isinstance(value, Message):
+                    value = self.format(value[0], value[1])
+                pieces.append(format(value, spec))
+        return "".join(pieces)
+
+
+_catalogs = {}
+_sources = {DEFAULT_LOCALE: MESSAGES_JA, "en": MESSAGES_EN}
+_current_locale = DEFAULT_LOCALE
+
+
+def register_locale(locale, templates):
+    """ロケールを追加する（足りないメッセージは既定のロケールで表示する）"""
+    _sources[locale] = templates
+    _catalogs.pop(locale, None)
+
+
+def get_catalog(locale=None):
+    """ロケールのテンプレート集（最初に使われたときに作る）"""
+    locale = locale or _current_locale
+    catalog = _catalogs.get(locale)
+    if catalog is None:
+        if locale not in _sources:
+            raise KeyError(f"未登録のロケール: {locale}")
+        fallback = get_catalog(DEFAULT_LOCALE) if locale != DEFAULT_LOCALE else None
+        catalog = _catalogs[locale] = Catalog(locale, _sources[locale], fallback)
+    return catalog
+
+
+def set_locale(locale):
+    """表示に使うロケールを切り替える"""
+    global _current_locale
+    get_catalog(locale)
+    _current_locale = locale
+
+
+def get_locale():
+    return _current_locale
+
+
+def render(message, locale=None):
+    """メッセージを文字列にする（ただの文字列はそのまま返す）"""
+    if isinstance(message, Message):
+        return message.render(locale)
+    return str(message)
@@ -0,0 +1,250 @@
+import json
+import sqlite3
+import time
+import threading
+from hero import Sage, UltimateWeapon, UltimateArmor, UltimateAccessory, intern_spells
+
+DEFAULT_STORE_PATH = "slime_battle.db"
+
+# 保存した装備名から装備を復元するための対応表
+EQUIPMENT_BY_NAME = {cls().name: cls for cls in (UltimateWeapon, UltimateArmor, UltimateAccessory)}
+# 装備品は状態を持たないので、復元したプレイヤー全員で同じインスタンスを共有する
+SHARED_EQUIPMENT = {name: cls() for name, cls in EQUIPMENT_BY_NAME.items()}
+
+PROFILE_STATS = ["level", "exp", "gold", "hp", "max_hp", "mp", "max_mp",
+                 "attack", "defense", "magic_attack", "magic_defense"]
+
+# ランキングの種類 → (テーブル, 並び順の列)
+LEADERBOARDS = {
+    "level": ("players", "level DESC, exp DESC"),
+    "exp": ("players", "exp DESC"),
+    "gold": ("players", "gold DESC"),
+    "wins": ("lifetime_stats", "wins DESC"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    level INTEGER NOT NULL,
+    exp INTEGER NOT NULL,
+    gold INTEGER NOT NULL,
+    hp INTEGER NOT NULL,
+    max_hp INTEGER NOT NULL,
+    mp INTEGER NOT NULL,
+    max_mp INTEGER NOT NULL,
+    attack INTEGER NOT NULL,
+    defense INTEGER NOT NULL,
+    magic_attack INTEGER NOT NULL,
+    magic_defense INTEGER NOT NULL,
+    spells TEXT NOT NULL,
+    equipment TEXT NOT NULL,
+    status_effects TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lifetime_stats (
+    name TEXT PRIMARY KEY REFERENCES players(name),
+    battles INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    escapes INTEGER NOT NULL DEFAULT 0,
+    enemy_escapes INTEGER NOT NULL DEFAULT 0,
+    turns INTEGER NOT NULL DEFAULT 0,
+    exp_gained INTEGER NOT NULL DEFAULT 0,
+    gold_gained INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS kills (
+    name TEXT NOT NULL REFERENCES players(name),
+    species TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, species)
+);
+CREATE INDEX IF NOT EXISTS idx_players_level ON players(level DESC, exp DESC);
+CREATE INDEX IF NOT EXISTS idx_players_exp ON players(exp DESC);
+CREATE INDEX IF NOT EXISTS idx_players_gold ON players(gold DESC);
+CREATE INDEX IF NOT EXISTS idx_stats_wins ON lifetime_stats(wins DESC);
+CREATE INDEX IF NOT EXISTS idx_kills_species ON kills(species, count DESC);
+"""
+
+OUTCOME_COLUMNS = {
+    "win": "wins",
+    "lose": "losses",
+    "escape": "escapes",
+    "enemy_escape": "enemy_escapes",
+}
+
+
+class ProgressStore:
+    """プレイヤーの進行状況・通算成績・ランキングを保存するSQLiteストア
+
+    WALモードで開き、書き込みはイベントごとではなくバトル単位でまとめて1トランザクションにする。
+    batch_size を大きくすると、複数バトル分をさらにまとめて書き込む（サーバー向け）。
+    接続は複数のスレッドから使えるよう、書き込み待ちの列と接続の利用をロックで順番にする。
+    """
+    def __init__(self, path=DEFAULT_STORE_PATH, batch_size=1):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()  # flush() は他のメソッドの中からも呼ばれる
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self._pending = []
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ---- 書き込み ----
+
+    def record_battle(self, player, battle):
+        """1バトル分の結果を書き込み待ちに積む（batch_size 件たまったら書き込む）"""
+        enemy = battle.current_enemy
+        record = {
+            'profile': self._profile_row(player),
+            'outcome': battle.outcome,
+            'turns': battle.turn_count,
+            'exp_gained': battle.exp_gained,
+            'gold_gained': battle.gold_gained,
+            'killed': enemy.name if battle.outcome == "win" and enemy is not None else None,
+        }
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def save_player(self, player):
+        """プレイヤーのプロフィールだけを保存する"""
+        row = self._profile_row(player)
+        with self._lock:
+            self.flush()
+            with self.connection:
+                self._upsert_profiles([row])
+
+    def flush(self):
+        """書き込み待ちの結果を1トランザクションで書き込む"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            with self.connection:
+                # 同じプレイヤーのプロフィールは最後の状態だけを書けばよい
+                latest = {}
+                for record in pending:
+                    latest[record['profile']['name']] = record['profile']
+                self._upsert_profiles(latest.values())
+
+                stats = []
+                kills = []
+                for record in pending:
+                    name = record['profile']['name']
+                    outcome_column = OUTCOME_COLUMNS.get(record['outcome'])
+                    stats.append((name, 1,
+                                  1 if outcome_column == "wins" else 0,
+                                  1 if outcome_column == "losses" else 0,
+                                  1 if outcome_column == "escapes" else 0,
+                                  1 if outcome_column == "enemy_escapes" else 0,
+                                  record['turns'], record['exp_gained'], record['gold_gained']))
+                    if record['killed']:
+                        kills.append((name, record['killed']))
+                self.connection.executemany("""
+                    INSERT INTO lifetime_stats
+                        (name, battles, wins, losses, escapes, enemy_escapes, turns, exp_gained, gold_gained)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        battles = battles + excluded.battles,
+                        wins = wins + excluded.wins,
+                        losses = losses + excluded.losses,
+                        escapes = escapes + excluded.escapes,
+                        enemy_escapes = enemy_escapes + excluded.enemy_escapes,
+                        turns = turns + excluded.turns,
+                        exp_gained = exp_gained + excluded.exp_gained,
+                        gold_gained = gold_gained + excluded.gold_gained
+                """, stats)
+                self.connection.executemany("""
+                    INSERT INTO kills (name, species, count) VALUES (?, ?, 1)
+                    ON CONFLICT(name, species) DO UPDATE SET count = count + 1
+                """, kills)
+
+    def _profile_row(self, player):
+        row = {stat: getattr(player, stat) for stat in PROFILE_STATS}
+        row['name'] = player.name
+        row['spells'] = json.dumps(list(player.spells), ensure_ascii=False)
+        row['equipment'] = json.dumps({slot: item.name if item else None
+                                       for slot, item in player.equipment.items()}, ensure_ascii=False)
+        row['status_effects'] = json.dumps(list(player.status_effects), ensure_ascii=False)
+        row['updated_at'] = time.time()
+        return row
+
+    def _upsert_profiles(self, rows):
+        columns = ["name"] + PROFILE_STATS + ["spells", "equipment", "status_effects", "updated_at"]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+        self.connection.executemany(
+            f"INSERT INTO players ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(name) DO UPDATE SET {updates}",
+            [tuple(row[column] for column in columns) for row in rows])
+
+    # ---- 読み込み ----
+
+    def load_player(self, name):
+        """保存されたプロフィールから賢者を復元する（無ければ None）"""
+        with self._lock:
+            self.flush()
+            row = self.connection.execute(
+                f"SELECT {', '.join(PROFILE_STATS)}, spells, equipment, status_effects FROM players WHERE name = ?",
+                (name,)).fetchone()
+        if row is None:
+            return None
+        sage = Sage(name)
+        for stat, value in zip(PROFILE_STATS, row):
+            setattr(sage, stat, value)
+        sage.spells = intern_spells(json.loads(row[len(PROFILE_STATS)]))
+        sage.status_effects = json.loads(row[len(PROFILE_STATS) + 2])
+        # 保存したステータスは装備込みの値なので、装備は効果を再適用せずに戻す
+        for slot, item_name in json.loads(row[len(PROFILE_STATS) + 1]).items():
+            if item_name in SHARED_EQUIPMENT:
+                sage.set_equipment_slot(slot, SHARED_EQUIPMENT[item_name])
+        if sage.hp <= 0:
+            # 力尽きたプレイヤーは教会で復活した状態から再開する
+            sage.hp = sage.max_hp
+            sage.status_effects = []
+        return sage
+
+    def lifetime_stats(self, name):
+        """通算成績"""
+        with self._lock:
+            self.flush()
+            cursor = self.connection.execute("SELECT * FROM lifetime_stats WHERE name = ?", (name,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            stats = dict(zip([column[0] for column in cursor.description], row))
+            stats['kills'] = dict(self.connection.execute(
+                "SELECT species, count FROM kills WHERE name = ? ORDER BY count DESC", (name,)).fetchall())
+        return stats
+
+    def leaderboard(self, metric="level", limit=10):
+        """ランキング（索引を使って上位だけを取り出す）"""
+        if metric not in LEADERBOARDS:
+            raise ValueError(f"未知のランキング: {metric}")
+        table, order = LEADERBOARDS[metric]
+        column = order.split()[0]
+        with self._lock:
+            self.flush()
+            return self.connection.execute(
+                f"SELECT name, {column} FROM {table} ORDER BY {order} LIMIT ?", (limit,)).fetchall()
+
+    def species_leaderboard(self, species, limit=10):
+        """スライムの種類ごとの討伐数ランキング"""
+        with self._lock:
+            self.flush()
+            return self.connection.execute(
+                "SELECT name, count FROM kills WHERE species = ? ORDER BY count DESC LIMIT ?",
+                (species, limit)).fetchall()
@@ -0,0 +1,171 @@
+import sys
+import math
+import random
+import argparse
+from statistics import NormalDist
+from slime_battle import Battle
+from simulator import BattleConfig, run_battle
+
+# 偏りを掛けられる判定（Battle.roll の event）
+EVENTS = ("player_hit", "player_escape", "enemy_escape", "enemy_special")
+
+# よく調べる稀な事象 → (条件, 結果, 判定ごとの偏らせた確率)
+PRESETS = {
+    # 逃げられる前にメタルキングスライムを倒す（毎ターン90%で逃げる）
+    "metal_king_kill": (BattleConfig("MetalKingSlime"), "win", {"enemy_escape": 0.2}),
+    # ポイズンスライムの毒で賢者が力尽きる（攻撃が外れ続け、毒を受ける必要がある）
+    "poison_death": (BattleConfig("PoisonSlime"), "lose", {"player_hit": 0.1}),
+}
+
+
+class BiasedBattle(Battle):
+    """判定の確率を偏らせ、本来の確率との比（尤度比）を重みとして掛け合わせるバトル
+
+    偏らせた確率 q で判定し、起きたら p/q、起きなかったら (1-p)/(1-q) を重みに掛ける。
+    重み付きで数えれば、偏らせずに実行した場合の確率の不偏推定になる。
+    確率が0や1の判定は偏らせない（重みは変わらない）。
+    """
+
+    def __init__(self, player, biases=None, **kwargs):
+        super().__init__(player, **kwargs)
+        self.biases = biases or {}
+        self.weight = 1.0
+
+    def roll(self, probability, event):
+        biased = self.biases.get(event)
+        if biased is None or probability <= 0.0 or probability >= 1.0:
+            return super().roll(probability, event)
+        happened = self.rng.random() < biased
+        if happened:
+            self.weight *= probability / biased
+        else:
+            self.weight *= (1.0 - probability) / (1.0 - biased)
+        return happened
+
+
+class WeightedEstimate:
+    """重み付きの指示関数の平均（稀な事象の確率）と信頼区間"""
+
+    def __init__(self):
+        self.battles = 0
+        self.hits = 0          # 事象が起きたバトル数（重み付け前）
+        self.total = 0.0       # Σ w・1[事象]
+        self.total_sq = 0.0    # Σ (w・1[事象])²
+
+    def add(self, weight, happened):
+        self.battles += 1
+        if happened:
+            self.hits += 1
+            self.total += weight
+            self.total_sq += weight * weight
+
+    @property
+    def probability(self):
+        return self.total / self.battles if self.battles else 0.0
+
+    @property
+    def stderr(self):
+        if self.battles < 2:
+            return math.inf
+        mean = self.probability
+        variance = (self.total_sq - self.battles * mean * mean) / (self.battles - 1)
+        return math.sqrt(max(variance, 0.0) / self.battles)
+
+    def interval(self, confidence=0.95):
+        """正規近似の信頼区間 (下限, 上限)"""
+        half = NormalDist().inv_cdf(0.5 + confidence / 2) * self.stderr
+        return max(0.0, self.probability - half), self.probability + half
+
+    def relative_half_width(self, confidence=0.95):
+        """信頼区間の半幅 ÷ 推定値（事象が一度も起きていなければ inf）"""
+        if self.hits == 0:
+            return math.inf
+        low, high = self.interval(confidence)
+        return (high - low) / 2 / self.probability
+
+    def summary(self, confidence=0.95):
+        low, high = self.interval(confidence)
+        return {"probability": self.probability, "stderr": self.stderr, "low": low, "high": high,
+                "battles": self.battles, "hits": self.hits}
+
+
+def estimate(config, outcome, biases=None, battles=None, target=None, confidence=0.95, seed=0,
+             max_turns=100, batch_size=1000, max_battles=10_000_000):
+    """稀な結果が起きる確率を重要度サンプリングで推定する
+
+    Args:
+        config: バトルの条件
+        outcome: 推定したい結果（"win", "lose" など）
+        biases: 判定ごとの偏らせた確率（{} や None なら普通のモンテカルロ法）
+        battles: 実行するバトル数（target と同時に指定したときは上限）
+        target: 信頼区間の相対半幅がこれ以下になったら止める
+        batch_size: target の判定をするバトル数の間隔
+    Returns:
+        WeightedEstimate
+    """
+    for event, probability in (biases or {}).items():
+        if event not in EVENTS:
+            raise ValueError(f"未知の判定: {event}")
+        if not 0.0 < probability < 1.0:
+            raise ValueError("偏らせた確率は0より大きく1より小さくしてください")
+    if battles is None and target is None:
+        raise ValueError("battles か target を指定してください")
+    limit = battles if battles is not None else max_battles
+    rng = random.Random(seed)
+    result = WeightedEstimate()
+    battle = None
+
+    def make_battle(player, **kwargs):
+        nonlocal battle
+        battle = BiasedBattle(player, biases, **kwargs)
+        return battle
+
+    while result.battles < limit:
+        for _ in range(min(batch_size, limit - result.battles)):
+            happened = run_battle(config, rng, max_turns, battle_class=make_battle)[0] == outcome
+            result.add(battle.weight, happened)
+        if target is not None and result.relative_half_width(confidence) <= target:
+            break
+    return result
+
+
+def parse_biases(items):
+    biases = {}
+    for item in items or ():
+        event, _, value = item.partition("=")
+        biases[event] = float(value)
+    return biases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="稀なバトル結果の確率を重要度サンプリングで推定する")
+    parser.add_argument("preset", nargs="?", choices=sorted(PRESETS), help="よく調べる事象")
+    parser.add_argument("--species", help="スライムの種類（プリセットを使わない場合）")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--outcome", default="win")
+    parser.add_argument("--bias", action="append", help="判定の偏らせた確率（例: enemy_escape=0.2）")
+    parser.add_argument("--target", type=float, default=0.05, help="目標とする信頼区間の相対半幅")
+    parser.add_argument("--max-battles", type=int, default=1_000_000)
+    parser.add_argument("--plain", action="store_true", help="比較のため偏らせずにも実行する")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.preset:
+        config, outcome, biases = PRESETS[args.preset]
+    elif args.species:
+        config, outcome, biases = BattleConfig(args.species, args.level), args.outcome, {}
+    else:
+        parser.error("プリセットか --species を指定してください")
+    biases = dict(biases, **parse_biases(args.bias))
+
+    runs = [("重要度サンプリング", biases)] + ([("モンテカルロ法", {})] if args.plain else [])
+    for label, run_biases in runs:
+        result = estimate(config, outcome, run_biases, battles=args.max_battles, target=args.target, seed=args.seed)
+        low, high = result.interval()
+        print(f"{label}: P({outcome}) = {result.probability:.3e}  95%信頼区間 [{low:.3e}, {high:.3e}]  "
+              f"{result.battles:,}バトル（事象 {result.hits:,}回）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
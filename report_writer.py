@@ -0,0 +1,314 @@
+import os
+import json
+import datetime
+from html import escape
+from typing import Optional, List, Dict, Any, Tuple
+from xml.sax.saxutils import quoteattr
+
+REPORT_TITLE = "スライムバトルゲーム テスト実行レポート"
+
+HTML_HEAD = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{REPORT_TITLE}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        h1 {{ color: #333; }}
+        .success {{ color: green; }}
+        .failure {{ color: red; }}
+        .test-case {{ margin: 10px 0; padding: 10px; border: 1px solid #ddd; }}
+        .test-details {{ margin-left: 20px; }}
+        pre {{ background-color: #f5f5f5; padding: 10px; }}
+    </style>
+</head>
+<body>
+    <h1>{REPORT_TITLE}</h1>
+"""
+
+HTML_TAIL = """
+</body>
+</html>
+"""
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def class_name_of(detail: Dict[str, Any]) -> str:
+    """テストID（モジュール.クラス.メソッド）からクラス名を取り出す"""
+    return detail['name'].split('.')[1]
+
+
+def group_by_class(details: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """テスト結果をクラスごとにまとめる（出現順を保つ）"""
+    test_classes: Dict[str, List[Dict[str, Any]]] = {}
+    for detail in details:
+        test_classes.setdefault(class_name_of(detail), []).append(detail)
+    return test_classes
+
+
+def count_results(details: List[Dict[str, Any]]) -> Dict[str, int]:
+    """結果の種類ごとの件数"""
+    return {
+        'OK': sum(1 for t in details if t['result'] == 'OK'),
+        'FAIL': sum(1 for t in details if t['result'] == 'FAIL'),
+        'ERROR': sum(1 for t in details if t['result'] == 'ERROR'),
+        'cached': sum(1 for t in details if t.get('cached')),
+    }
+
+
+def _result_label(test: Dict[str, Any]) -> str:
+    return f"{test['result']}{'（キャッシュ）' if test.get('cached') else ''}"
+
+
+# ---- Markdown ----
+
+def markdown_summary(now: datetime.datetime, tests_run: int, counts: Dict[str, int]) -> str:
+    return f"""## 実行概要
+- 実行日時: {now.strftime('%Y-%m-%d %H:%M:%S')}
+- テスト数: {tests_run}
+- 成功: {counts['OK']}
+- 失敗: {counts['FAIL']}
+- エラー: {counts['ERROR']}
+- キャッシュ利用: {counts['cached']}
+
+"""
+
+
+def markdown_class_section(class_name: str, tests: List[Dict[str, Any]]) -> str:
+    parts = [f"### {class_name}\n\n"]
+    for test in tests:
+        test_name = test['name'].split('.')[-1]
+        status_emoji = "✅" if test['result'] == 'OK' else "❌"
+        parts.append(f"#### {status_emoji} {test_name}\n")
+        parts.append(f"- 説明: {test['doc']}\n")
+        parts.append(f"- 結果: {_result_label(test)}\n")
+        parts.append(f"- 実行時間: {test['time']:.3f}秒\n")
+        if test['result'] != 'OK':
+            parts.append(f"- エラー詳細:\n```\n{test['error']}\n```\n")
+        parts.append("\n")
+    return "".join(parts)
+
+
+def markdown_trends(trends: List[Dict[str, Any]]) -> str:
+    if not trends:
+        return ""
+    parts = ["## 実行時間の推移（増加が大きい順）\n\n",
+             "| テスト | 推移 | 最新 | 増加率/回 |\n",
+             "|---|---|---|---|\n"]
+    for trend in trends:
+        parts.append(f"| {trend['name']} | {sparkline(trend['history'])} | "
+                     f"{trend['history'][-1]:.3f}秒 | {trend['slope'] * 1000:+.3f}ms |\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+# ---- HTML ----
+
+def html_summary(now: datetime.datetime, tests_run: int, counts: Dict[str, int]) -> str:
+    return f"""    <h2>実行概要</h2>
+    <ul>
+        <li>実行日時: {now.strftime('%Y-%m-%d %H:%M:%S')}</li>
+        <li>テスト数: {tests_run}</li>
+        <li>成功: {counts['OK']}</li>
+        <li>失敗: {counts['FAIL']}</li>
+        <li>エラー: {counts['ERROR']}</li>
+        <li>キャッシュ利用: {counts['cached']}</li>
+    </ul>
+"""
+
+
+def html_class_section(class_name: str, tests: List[Dict[str, Any]]) -> str:
+    parts = [f"<h2>{escape(class_name)}</h2>"]
+    for test in tests:
+        test_name = test['name'].split('.')[-1]
+        status_class = "success" if test['result'] == 'OK' else "failure"
+        parts.append(f"""
+    <div class="test-case">
+        <h3 class="{status_class}">{escape(test_name)}</h3>
+        <div class="test-details">
+            <p><strong>説明:</strong> {escape(test['doc'])}</p>
+            <p><strong>結果:</strong> {_result_label(test)}</p>
+            <p><strong>実行時間:</strong> {test['time']:.3f}秒</p>
+""")
+        if test['result'] != 'OK':
+            parts.append(f"""
+            <p><strong>エラー詳細:</strong></p>
+            <pre>{escape(test['error'])}</pre>
+""")
+        parts.append("""
+        </div>
+    </div>
+""")
+    return "".join(parts)
+
+
+def html_trends(trends: List[Dict[str, Any]]) -> str:
+    if not trends:
+        return ""
+    parts = ["    <h2>実行時間の推移（増加が大きい順）</h2>\n    <table>\n",
+             "        <tr><th>テスト</th><th>推移</th><th>最新</th><th>増加率/回</th></tr>\n"]
+    for trend in trends:
+        parts.append(f"        <tr><td>{escape(trend['name'])}</td><td>{sparkline(trend['history'])}</td>"
+                     f"<td>{trend['history'][-1]:.3f}秒</td><td>{trend['slope'] * 1000:+.3f}ms</td></tr>\n")
+    parts.append("    </table>\n")
+    return "".join(parts)
+
+
+# ---- JUnit XML ----
+
+def junit_testsuite(class_name: str, tests: List[Dict[str, Any]]) -> str:
+    counts = count_results(tests)
+    total_time = sum(t['time'] for t in tests)
+    parts = [f"  <testsuite name={quoteattr(class_name)} tests=\"{len(tests)}\" "
+             f"failures=\"{counts['FAIL']}\" errors=\"{counts['ERROR']}\" time=\"{total_time:.6f}\">\n"]
+    for test in tests:
+        classname, _, method = test['name'].rpartition('.')
+        parts.append(f"    <testcase classname={quoteattr(classname)} name={quoteattr(method)} "
+                     f"time=\"{test['time']:.6f}\"")
+        if test['result'] == 'OK':
+            parts.append("/>\n")
+            continue
+        tag = "failure" if test['result'] == 'FAIL' else "error"
+        message = test['error'].strip().splitlines()[-1] if test['error'].strip() else test['result']
+        parts.append(f">\n      <{tag} message={quoteattr(message)}>{escape(test['error'])}</{tag}>\n"
+                     f"    </testcase>\n")
+    parts.append("  </testsuite>\n")
+    return "".join(parts)
+
+
+class StreamingReportWriter:
+    """テスト結果を受け取った順にMarkdown・HTML・JUnit XMLへ書き出す
+
+    文書全体を文字列として組み立てず、テストクラスの結果が届くたびにファイルへ追記する。
+    実行概要（件数）は全テスト終了後に確定するため、各レポートの末尾に書く。
+    """
+    def __init__(self, reports_dir: str, timestamp: str):
+        if not os.path.exists(reports_dir):
+            os.makedirs(reports_dir)
+        self.paths = {
+            'markdown': f"{reports_dir}/test_report_{timestamp}.md",
+            'html': f"{reports_dir}/test_report_{timestamp}.html",
+            'junit': f"{reports_dir}/test_report_{timestamp}.xml",
+        }
+        self.details: List[Dict[str, Any]] = []
+        self.tests_run = 0
+        self._markdown = open(self.paths['markdown'], "w", encoding="utf-8")
+        self._html = open(self.paths['html'], "w", encoding="utf-8")
+        self._junit = open(self.paths['junit'], "w", encoding="utf-8")
+
+        self._markdown.write(f"# {REPORT_TITLE}\n\n## テスト詳細\n\n")
+        self._html.write(HTML_HEAD)
+        self._junit.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+        self._flush()
+
+    def _flush(self):
+        for stream in (self._markdown, self._html, self._junit):
+            stream.flush()
+
+    def add_results(self, details: List[Dict[str, Any]], tests_run: int):
+        """テストクラス1つ分の結果を追記する"""
+        self.details.extend(details)
+        self.tests_run += tests_run
+        for class_name, tests in group_by_class(details).items():
+            self._markdown.write(markdown_class_section(class_name, tests))
+            self._html.write(html_class_section(class_name, tests))
+            self._junit.write(junit_testsuite(class_name, tests))
+        self._flush()
+
+    def close(self, trends: Optional[List[Dict[str, Any]]] = None):
+        """実行概要と実行時間の推移を書き込んでファイルを閉じる"""
+        now = datetime.datetime.now()
+        counts = count_results(self.details)
+        self._markdown.write(markdown_summary(now, self.tests_run, counts))
+        self._markdown.write(markdown_trends(trends or []))
+        self._html.write(html_summary(now, self.tests_run, counts))
+        self._html.write(html_trends(trends or []))
+        self._html.write(HTML_TAIL)
+        self._junit.write("</testsuites>\n")
+        for stream in (self._markdown, self._html, self._junit):
+            stream.close()
+
+
+def sparkline(values: List[float]) -> str:
+    """数値の推移を1行のブロック文字で表す"""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = high - low
+    if span == 0:
+        return SPARK_CHARS[0] * len(values)
+    return "".join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+def _slope(values: List[float]) -> float:
+    """最小二乗法による1回あたりの増加量"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    denominator = sum((x - mean_x) ** 2 for x in range(n))
+    return numerator / denominator
+
+
+class TimingHistory:
+    """実行ごとのテスト実行時間を蓄積する履歴ストア
+
+    1回の実行を1行のJSON（テストID→マイクロ秒の整数）として追記する。
+    キャッシュから再利用した結果は実測値ではないため記録しない。
+    """
+
+    def __init__(self, path: str, max_runs: int = 50):
+        self.path = path
+        self.max_runs = max_runs
+
+    def load(self) -> List[Tuple[str, Dict[str, int]]]:
+        if not os.path.exists(self.path):
+            return []
+        runs = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                runs.append((record['run'], record['t']))
+        return runs
+
+    def record(self, run_id: str, details: List[Dict[str, Any]]):
+        """今回の実行時間を追記し、古い実行を切り詰める"""
+        timings = {t['name']: int(round(t['time'] * 1_000_000))
+                   for t in details if not t.get('cached')}
+        if not timings:
+            return
+        line = json.dumps({'run': run_id, 't': timings}, ensure_ascii=False, separators=(',', ':'))
+        runs = self.load()
+        if len(runs) + 1 > self.max_runs:
+            # 上限を超えたときだけ全体を書き直す（通常は追記のみ）
+            kept = runs[-(self.max_runs - 1):] if self.max_runs > 1 else []
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for kept_run, kept_timings in kept:
+                    f.write(json.dumps({'run': kept_run, 't': kept_timings},
+                                       ensure_ascii=False, separators=(',', ':')) + "\n")
+                f.write(line + "\n")
+            os.replace(tmp_path, self.path)
+        else:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def trends(self, limit: int = 10, min_runs: int = 3) -> List[Dict[str, Any]]:
+        """実行時間の増加が大きいテストを返す"""
+        series: Dict[str, List[float]] = {}
+        for _, timings in self.load():
+            for name, micros in timings.items():
+                series.setdefault(name, []).append(micros / 1_000_000)
+        trends = [{'name': name, 'history': history, 'slope': _slope(history)}
+                  for name, history in series.items() if len(history) >= min_runs]
+        trends.sort(key=lambda t: t['slope'], reverse=True)
+        return trends[:limit]
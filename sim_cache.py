@@ -0,0 +1,220 @@
+"""シミュレーション結果のキャッシュ（メモリ上の LRU + SQLite のファイル）
+
+同じ条件（賢者のレベル・装備、敵の種類、行動方針）とバトル数・シードのシミュレーションは、
+バランス表が同じなら何度実行しても同じ集計になる。結果を条件の正規化済みの JSON と
+バランス表の内容（balance.content_digest: 呪文の属性・習得レベルとスライムの弱点・耐性も含む）から
+作ったハッシュをキーにして保存し、次からは実行せずに返す。
+
+    メモリ   最近使った capacity 件（OrderedDict の LRU）
+    ファイル 件数の上限なし。メモリから追い出された結果や、別のプロセス・前回のセッションの結果を引く
+
+キーにはバランス表とコード側の表の内容が入っているので、どれかが変われば前の結果は引かれなくなる。
+メモリからは最後に見た digest と違う結果を消すが、ファイルは別のプロセス（別のバランス表を使う
+サービスなど）と共有しうるので、古い結果は prune() で明示的に消すか、max_age・max_entries で上限を決める。
+Battle のルール自体を変えたときは RULES_VERSION を上げると、以前の結果はすべて使われなくなる。
+"""
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from simulator import BattleConfig, simulate
+from balance import DEFAULT_BALANCE, BalanceStore, content_digest
+
+RULES_VERSION = 1  # Battle の計算が変わったら上げる
+PRUNE_EVERY = 256  # 上限があるとき、この件数を保存するごとにファイルを切り詰める
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_content ON results(content);
+"""
+
+
+def cache_key(config, balance=None, **params):
+    """条件・パラメーター・バランス表の内容から決まるキャッシュのキー
+
+    params にはバトル数・シード・打ち切りターン数など、結果を変えるものをすべて渡す。
+    """
+    balance = balance if balance is not None else DEFAULT_BALANCE
+    data = {"rules": RULES_VERSION, "content": content_digest(balance), "config": config.to_dict(), "params": params}
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SimulationCache:
+    """シミュレーション結果の2段のキャッシュ（複数のスレッドから使える）
+
+    Args:
+        path: 結果を保存する SQLite ファイル（省略時はメモリだけ）
+        capacity: メモリに置く件数
+        max_age: ファイルに残す結果の古さの上限（秒、省略時は無制限）
+        max_entries: ファイルに残す件数の上限（古いものから消す、省略時は無制限）
+    """
+
+    def __init__(self, path=None, capacity=10000, max_age=None, max_entries=None):
+        self.path = path
+        self.capacity = capacity
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._puts = 0
+        self._memory = OrderedDict()  # キー → (バランス表の digest, 結果)
+        self._lock = threading.Lock()
+        self.content = None  # 最後に見たバランス表の digest
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            self.prune()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _remember(self, key, content, value):
+        self._memory[key] = (content, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _use_content(self, content):
+        """バランス表が変わっていたら前の表の結果をメモリから消す（ロックを取って呼ぶ）"""
+        if content == self.content:
+            return
+        self.content = content
+        for key in [key for key, (cached, _) in self._memory.items() if cached != content]:
+            del self._memory[key]
+
+    def _prune_disk(self, keep_content=None):
+        """ファイルから古い結果を消す（ロックを取って呼ぶ）"""
+        with self._db:
+            if keep_content is not None:
+                self._db.execute("DELETE FROM results WHERE content != ?", (keep_content,))
+            if self.max_age is not None:
+                self._db.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.max_age,))
+            if self.max_entries is not None:
+                self._db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results "
+                                 "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def prune(self, keep_content=None):
+        """ファイルから max_age・max_entries を超えた結果を消す
+
+        Args:
+            keep_content: 指定するとこの digest 以外のバランス表の結果もすべて消す
+                          （ファイルを他のバランス表と共有していないときに）
+        """
+        if self._db is None:
+            return
+        with self._lock:
+            self._prune_disk(keep_content)
+
+    def get(self, key, content):
+        """キャッシュされた結果（無ければ None）"""
+        with self._lock:
+            self._use_content(content)
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, content, value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, content, value):
+        """結果を保存する（value は JSON にできる値）"""
+        with self._lock:
+            self._use_content(content)
+            self._remember(key, content, value)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                     (key, content, json.dumps(value, ensure_ascii=False), time.time()))
+                self._puts += 1
+                if self._puts % PRUNE_EVERY == 0 and (self.max_age is not None or self.max_entries is not None):
+                    self._prune_disk()
+
+    def invalidate(self):
+        """すべての結果を消す"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM results")
+
+    def stats(self):
+        with self._lock:
+            disk = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] if self._db is not None else 0
+            return {"memory_entries": len(self._memory), "disk_entries": disk, "memory_hits": self.memory_hits,
+                    "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+def cached_simulate(cache, config, battles, seed=0, max_turns=100, balance=None):
+    """simulate() の集計（summary() の dict）をキャッシュを通して求める
+
+    Returns:
+        (集計, キャッシュから返したか)
+    """
+    balance = balance if balance is not None else DEFAULT_BALANCE
+    key = cache_key(config, balance, battles=battles, seed=seed, max_turns=max_turns)
+    result = cache.get(key, balance.digest)
+    if result is not None:
+        return result, True
+    result = simulate(config, battles, seed, max_turns, balance=balance).summary()
+    cache.put(key, balance.digest, result)
+    return result, False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="キャッシュを通してシミュレーションする（2回目からはファイルから返す）")
+    parser.add_argument("species")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--equipment", nargs="*", default=())
+    parser.add_argument("--policy", default="attack")
+    parser.add_argument("-n", "--battles", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", default="sim_cache.db", help="結果を保存する SQLite ファイル")
+    parser.add_argument("--balance", default=None, help="バランス表のデータファイル")
+    parser.add_argument("--prune", action="store_true",
+                        help="このバランス表以外の結果をファイルから消す（ファイルを共有していないときに）")
+    args = parser.parse_args(argv)
+
+    balance = BalanceStore(args.balance).current()
+    config = BattleConfig(args.species, args.level, args.equipment, args.policy)
+    with SimulationCache(args.cache) as cache:
+        if args.prune:
+            cache.prune(keep_content=balance.digest)
+        started = time.perf_counter()
+        result, cached = cached_simulate(cache, config, args.battles, args.seed, balance=balance)
+        elapsed = time.perf_counter() - started
+    print(f"{config!r}: 勝率 {result['win_rate']:.4f}  平均ターン数 {result['mean_turns']:.2f}"
+          f"  （{'キャッシュ' if cached else '実行'} {elapsed * 1000:.1f}ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
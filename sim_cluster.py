@@ -0,0 +1,227 @@
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+import socketserver
+from collections import deque
+from sim_jobs import add_spec_arguments, job_from_args, print_totals, run_shard_step
+
+DEFAULT_PORT = 9100
+
+# プロトコル: 1行1メッセージのJSON（UTF-8）をTCPでやり取りする
+#   ワーカー → {"type": "lease", "worker": ID}
+#   調整役   → {"type": "shard", "shard_id": ..., "args": run_shard_step の引数, "lease": 秒}
+#              {"type": "wait", "retry": 秒}（貸し出し中のシャードしか残っていない）
+#              {"type": "done"}（すべてのシャードが完了した）
+#   ワーカー → {"type": "result", "worker": ID, "shard_id": ..., "rng": 乱数の状態, "stats": 集計}
+#   調整役   → {"type": "ok"} または {"type": "duplicate"}（別のワーカーが先に完了させた）
+
+
+def send_message(stream, message):
+    stream.write(json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def receive_message(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("接続が切れました")
+    return json.loads(line)
+
+
+class Coordinator:
+    """シャードをワーカーに貸し出し、結果を集める調整役
+
+    貸し出しには期限（リース）があり、期限までに結果が届かないシャードや、
+    接続が切れたワーカーに貸していたシャードは、キューに戻して別のワーカーに貸し出す。
+    同じシャードはどのワーカーが実行しても同じ結果になるので、先に届いた結果を採用する。
+    """
+
+    def __init__(self, job, lease_timeout=120.0, checkpoint_interval=10.0, retry=0.5):
+        self.job = job
+        self.lease_timeout = lease_timeout
+        self.checkpoint_interval = checkpoint_interval
+        self.retry = retry
+        self.queue = deque(shard_id for shard_id in job.shards if shard_id not in job.completed)
+        self.leases = {}  # シャードID → (ワーカーID, 期限)
+        self.requeued = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        self._last_saved = time.monotonic()
+        self.done = threading.Event()
+        if job.finished:
+            self.done.set()
+
+    def _requeue(self, shard_ids):
+        for shard_id in shard_ids:
+            del self.leases[shard_id]
+            self.queue.appendleft(shard_id)
+            self.requeued += 1
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        self._requeue([shard_id for shard_id, (_, deadline) in self.leases.items() if deadline <= now])
+
+    def lease(self, worker):
+        """ワーカーに次のシャードを貸し出す"""
+        with self._lock:
+            self._requeue_expired()
+            if self.queue:
+                shard_id = self.queue.popleft()
+                self.leases[shard_id] = (worker, time.monotonic() + self.lease_timeout)
+                config, rng_state, remaining, max_turns = self.job.next_step(shard_id, sys.maxsize)
+                return {"type": "shard", "shard_id": shard_id, "lease": self.lease_timeout,
+                        "args": [config, rng_state, remaining, max_turns]}
+            if self.leases:
+                return {"type": "wait", "retry": self.retry}
+            return {"type": "done"}
+
+    def complete(self, worker, shard_id, rng_state, stats):
+        """ワーカーから届いた結果を反映する"""
+        with self._lock:
+            if shard_id in self.job.completed or shard_id not in self.job.shards:
+                self.duplicates += 1
+                return {"type": "duplicate"}
+            self.leases.pop(shard_id, None)
+            if shard_id in self.queue:
+                self.queue.remove(shard_id)  # 期限切れで戻したが、元のワーカーが間に合った
+            self.job.apply_step(shard_id, rng_state, stats)
+            if self.job.finished:
+                self.job.save()
+                self.done.set()
+            elif time.monotonic() - self._last_saved >= self.checkpoint_interval:
+                self.job.save()
+                self._last_saved = time.monotonic()
+            return {"type": "ok"}
+
+    def release(self, worker):
+        """接続が切れたワーカーに貸していたシャードをすぐにキューに戻す"""
+        with self._lock:
+            self._requeue([shard_id for shard_id, (owner, _) in self.leases.items() if owner == worker])
+
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    """ワーカー1台との接続"""
+    coordinator = None
+
+    def handle(self):
+        workers = set()
+        try:
+            while True:
+                message = receive_message(self.rfile)
+                workers.add(message["worker"])
+                if message["type"] == "lease":
+                    send_message(self.wfile, self.coordinator.lease(message["worker"]))
+                elif message["type"] == "result":
+                    send_message(self.wfile, self.coordinator.complete(
+                        message["worker"], message["shard_id"], message["rng"], message["stats"]))
+                else:
+                    send_message(self.wfile, {"type": "error", "error": f"未知のメッセージ: {message['type']}"})
+        except (ConnectionError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            for worker in workers:
+                self.coordinator.release(worker)
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_coordinator_server(coordinator, host="127.0.0.1", port=DEFAULT_PORT):
+    """調整役のTCPサーバーを作る（port=0 なら空いているポート）"""
+    handler = type("BoundCoordinatorHandler", (CoordinatorHandler,), {"coordinator": coordinator})
+    return CoordinatorServer((host, port), handler)
+
+
+def serve_until_done(coordinator, server, timeout=None):
+    """すべてのシャードが完了するまで待ち受ける（完了したら True）"""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        return coordinator.done.wait(timeout)
+    finally:
+        server.shutdown()
+        server.server_close()
+        coordinator.job.save()
+
+
+def run_worker(host="127.0.0.1", port=DEFAULT_PORT, worker_id=None, max_shards=None, connect_retries=50):
+    """調整役からシャードを借りて実行し続けるワーカー
+
+    Returns:
+        実行したシャードの数
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    for attempt in range(connect_retries):
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except OSError:
+            if attempt == connect_retries - 1:
+                raise
+            time.sleep(0.1)
+    completed = 0
+    with connection, connection.makefile("rwb") as stream:
+        while max_shards is None or completed < max_shards:
+            try:
+                send_message(stream, {"type": "lease", "worker": worker_id})
+                reply = receive_message(stream)
+            except (ConnectionError, OSError):
+                break  # 調整役が終了した
+            if reply["type"] == "done":
+                break
+            if reply["type"] == "wait":
+                time.sleep(reply["retry"])
+                continue
+            rng_state, stats = run_shard_step(*reply["args"])
+            try:
+                send_message(stream, {"type": "result", "worker": worker_id, "shard_id": reply["shard_id"],
+                                      "rng": rng_state, "stats": stats})
+                receive_message(stream)
+            except (ConnectionError, OSError):
+                break
+            completed += 1
+    return completed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="複数ホストで分担するシミュレーション")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator_command = commands.add_parser("coordinator", help="シャードを配って結果を集める")
+    add_spec_arguments(coordinator_command)
+    coordinator_command.add_argument("--host", default="0.0.0.0")
+    coordinator_command.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator_command.add_argument("--lease", type=float, default=120.0, help="シャードの貸し出し期限（秒）")
+    coordinator_command.add_argument("--interval", type=float, default=10.0, help="チェックポイントの間隔（秒）")
+
+    worker_command = commands.add_parser("worker", help="調整役に接続してシャードを実行する")
+    worker_command.add_argument("--host", default="127.0.0.1")
+    worker_command.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        count = run_worker(args.host, args.port)
+        print(f"{count}シャードを実行しました")
+        return 0
+
+    job = job_from_args(args)
+    coordinator = Coordinator(job, lease_timeout=args.lease, checkpoint_interval=args.interval)
+    server = make_coordinator_server(coordinator, args.host, args.port)
+    print(f"{args.host}:{server.server_address[1]} でワーカーを待っています（{len(coordinator.queue)}シャード）")
+    try:
+        serve_until_done(coordinator, server)
+    except KeyboardInterrupt:
+        print(f"\n中断しました。同じコマンドで {args.checkpoint} から再開できます")
+        return 130
+    print_totals(job)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
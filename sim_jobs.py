@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from simulator import SPECIES, POLICIES, BattleConfig, SimulationStats, run_battle
+
+CHECKPOINT_VERSION = 1
+
+
+class JobError(Exception):
+    """チェックポイントが壊れている・別のジョブのものなど、再開できない場合のエラー"""
+
+
+class JobSpec:
+    """長時間シミュレーションジョブの内容（条件の一覧・条件ごとのバトル数・シャードの大きさ）"""
+
+    def __init__(self, configs, battles, shard_size=10000, seed=0, max_turns=100):
+        if battles < 1 or shard_size < 1:
+            raise ValueError("battles と shard_size は1以上で指定してください")
+        self.configs = list(configs)
+        self.battles = battles
+        self.shard_size = shard_size
+        self.seed = seed
+        self.max_turns = max_turns
+
+    @classmethod
+    def sweep(cls, species=None, levels=(1,), equipment=(), policy="attack", **kwargs):
+        """スライムの種類 × 賢者のレベルの総当たり"""
+        configs = [BattleConfig(name, level, equipment, policy)
+                   for name in (species or SPECIES) for level in levels]
+        return cls(configs, **kwargs)
+
+    def to_dict(self):
+        return {"configs": [config.to_dict() for config in self.configs], "battles": self.battles,
+                "shard_size": self.shard_size, "seed": self.seed, "max_turns": self.max_turns}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([BattleConfig.from_dict(config) for config in data["configs"]], data["battles"],
+                   data["shard_size"], data["seed"], data["max_turns"])
+
+    def shards(self):
+        """シャードID → (条件の番号, そのシャードのバトル数)"""
+        shards = {}
+        per_config = -(-self.battles // self.shard_size)
+        for config_index in range(len(self.configs)):
+            for shard_index in range(per_config):
+                count = min(self.shard_size, self.battles - shard_index * self.shard_size)
+                shards[f"{config_index}:{shard_index}"] = (config_index, count)
+        return shards
+
+    def initial_rng_state(self, shard_id):
+        """シャードの乱数の初期状態（シードと条件とシャードIDだけで決まる）"""
+        config_index, shard_index = shard_id.split(":")
+        config = self.configs[int(config_index)]
+        return random.Random(f"{self.seed}:{config.canonical_json()}:{shard_index}").getstate()
+
+
+def encode_rng_state(state):
+    version, internal, gauss_next = state
+    return [version, list(internal), gauss_next]
+
+
+def decode_rng_state(data):
+    version, internal, gauss_next = data
+    return (version, tuple(internal), gauss_next)
+
+
+def run_shard_step(config_data, rng_state, remaining, max_turns, balance=None):
+    """シャードの続きを remaining バトルだけ進める（ワーカーで呼ばれる）
+
+    balance: バランス表のスナップショット（省略時は既定値）
+
+    Returns:
+        (進めた後の乱数の状態, このステップの集計)
+    """
+    config = BattleConfig.from_dict(config_data)
+    rng = random.Random()
+    rng.setstate(decode_rng_state(rng_state))
+    stats = SimulationStats()
+    for _ in range(remaining):
+        stats.add(*run_battle(config, rng, max_turns, balance=balance))
+    return encode_rng_state(rng.getstate()), stats.to_dict()
+
+
+def write_json_atomic(path, data):
+    """一時ファイルに書いてから置き換える（途中で落ちても前のファイルが残る）"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SimulationJob:
+    """チェックポイントから再開できる長時間シミュレーションジョブ
+
+    バトルはシャードに分け、シャードごとに独立した乱数系列を使う。チェックポイントには
+    完了したシャードの集計と、途中のシャードの乱数の状態・途中までの集計を保存する。
+    集計は整数だけなので、途中で止めて再開しても、止めずに実行した場合と同じ結果になる。
+    """
+
+    def __init__(self, path, spec=None):
+        self.path = path
+        if os.path.exists(path):
+            self._load(spec)
+        elif spec is None:
+            raise JobError(f"チェックポイントがありません: {path}")
+        else:
+            self.spec = spec
+            self.completed = {}
+            self.in_progress = {}
+        self.shards = self.spec.shards()
+
+    def _load(self, spec):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as error:
+            raise JobError(f"チェックポイントを読み込めません: {error}") from error
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise JobError(f"未対応のチェックポイント形式: {data.get('version')}")
+        if spec is not None and spec.to_dict() != data["spec"]:
+            raise JobError("チェックポイントは別の内容のジョブのものです")
+        self.spec = JobSpec.from_dict(data["spec"])
+        self.completed = {shard_id: SimulationStats.from_dict(stats)
+                          for shard_id, stats in data["completed"].items()}
+        self.in_progress = {shard_id: {"done": state["done"], "rng": state["rng"],
+                                       "stats": SimulationStats.from_dict(state["stats"])}
+                            for shard_id, state in data["in_progress"].items()}
+
+    def save(self):
+        """現在の状態をチェックポイントに書き出す"""
+        write_json_atomic(self.path, {
+            "version": CHECKPOINT_VERSION,
+            "spec": self.spec.to_dict(),
+            "completed": {shard_id: stats.to_dict() for shard_id, stats in self.completed.items()},
+            "in_progress": {shard_id: {"done": state["done"], "rng": state["rng"],
+                                       "stats": state["stats"].to_dict()}
+                            for shard_id, state in self.in_progress.items()},
+        })
+
+    @property
+    def finished(self):
+        return len(self.completed) == len(self.shards)
+
+    def progress(self):
+        """(実行済みのバトル数, 全バトル数)"""
+        done = sum(stats.battles for stats in self.completed.values())
+        done += sum(state["done"] for state in self.in_progress.values())
+        return done, self.spec.battles * len(self.spec.configs)
+
+    def next_step(self, shard_id, step_battles):
+        """シャードの次のステップの run_shard_step の引数"""
+        state = self.in_progress.get(shard_id)
+        if state is None:
+            state = self.in_progress[shard_id] = {
+                "done": 0, "rng": encode_rng_state(self.spec.initial_rng_state(shard_id)),
+                "stats": SimulationStats()}
+        config_index, count = self.shards[shard_id]
+        return (self.spec.configs[config_index].to_dict(), state["rng"],
+                min(step_battles, count - state["done"]), self.spec.max_turns)
+
+    def apply_step(self, shard_id, rng_state, stats_data):
+        """run_shard_step の結果をシャードに反映する"""
+        state = self.in_progress[shard_id]
+        stats = SimulationStats.from_dict(stats_data)
+        state["rng"] = rng_state
+        state["done"] += stats.battles
+        state["stats"].merge(stats)
+        if state["done"] >= self.shards[shard_id][1]:
+            self.completed[shard_id] = self.in_progress.pop(shard_id)["stats"]
+
+    def run(self, executor=None, step_battles=1000, checkpoint_interval=60.0, max_steps=None, on_progress=None,
+            max_in_flight=None):
+        """残りのシャードを実行する
+
+        Args:
+            executor: ワーカープール（省略時はこのプロセスで順に実行）
+            step_battles: 1回のステップで進めるバトル数（チェックポイントの細かさ）
+            checkpoint_interval: チェックポイントを書き出す間隔（秒、0ならステップごと）
+            max_steps: このステップ数を実行したら止める（テストや時間の区切り用）
+            on_progress: ステップごとに (実行済み, 全体) を受け取る関数
+            max_in_flight: 同時に投入するステップ数（既定: CPU数の2倍）
+        Returns:
+            すべてのシャードが完了したら True
+        """
+        pending = [shard_id for shard_id in self.shards if shard_id not in self.completed]
+        last_saved = time.monotonic()
+        steps = 0
+        running = {}  # Future → シャードID
+        max_in_flight = max_in_flight or 2 * (os.cpu_count() or 1)
+
+        def stopping():
+            return max_steps is not None and steps + len(running) >= max_steps
+
+        def maybe_save(force=False):
+            nonlocal last_saved
+            if force or time.monotonic() - last_saved >= checkpoint_interval:
+                self.save()
+                last_saved = time.monotonic()
+
+        try:
+            while pending or running:
+                if executor is None:
+                    if stopping():
+                        break
+                    shard_id = pending[0]
+                    self.apply_step(shard_id, *run_shard_step(*self.next_step(shard_id, step_battles)))
+                    if shard_id in self.completed:
+                        pending.pop(0)
+                else:
+                    # 1つのシャードは同時に1ステップだけ進める（乱数の状態を引き継ぐため）
+                    busy = set(running.values())
+                    for shard_id in pending:
+                        if len(running) >= max_in_flight or stopping():
+                            break
+                        if shard_id not in busy:
+                            running[executor.submit(run_shard_step, *self.next_step(shard_id, step_battles))] = shard_id
+                            busy.add(shard_id)
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        shard_id = running.pop(future)
+                        self.apply_step(shard_id, *future.result())
+                        if shard_id in self.completed:
+                            pending.remove(shard_id)
+                        steps += 1
+                    maybe_save()
+                    if on_progress:
+                        on_progress(*self.progress())
+                    continue
+                steps += 1
+                maybe_save()
+                if on_progress:
+                    on_progress(*self.progress())
+        finally:
+            # 実行中のステップの結果は捨て、最後に確定した状態を保存する
+            for future in running:
+                future.cancel()
+            maybe_save(force=True)
+        return self.finished
+
+    def totals(self):
+        """条件ごとの集計（完了したシャードだけ、シャードID順に足し合わせる）"""
+        totals = [SimulationStats() for _ in self.spec.configs]
+        for shard_id in self.shards:
+            if shard_id in self.completed:
+                totals[self.shards[shard_id][0]].merge(self.completed[shard_id])
+        return {config: stats for config, stats in zip(self.spec.configs, totals)}
+
+
+def parse_levels(text):
+    """"1-5,10" のようなレベル指定を展開する"""
+    levels = []
+    for part in text.split(","):
+        if "-" in part:
+            low, high = part.split("-")
+            levels.extend(range(int(low), int(high) + 1))
+        else:
+            levels.append(int(part))
+    return levels
+
+
+def add_spec_arguments(parser):
+    """ジョブの内容を指定するコマンドライン引数を追加する"""
+    parser.add_argument("checkpoint", help="チェックポイントファイル（あれば続きから再開する）")
+    parser.add_argument("--species", default=None, help="スライムの種類（カンマ区切り、既定: 全種）")
+    parser.add_argument("--levels", default="1", help="賢者のレベル（例: 1-20 や 1,5,10）")
+    parser.add_argument("--ultimate", action="store_true", help="最強装備で戦う")
+    parser.add_argument("--policy", default="attack", choices=sorted(POLICIES))
+    parser.add_argument("-n", "--battles", type=int, default=100000, help="条件ごとのバトル数")
+    parser.add_argument("--shard-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def job_from_args(args):
+    """チェックポイントがあれば再開し、無ければ引数の内容で新しいジョブを作る"""
+    spec = None
+    if not os.path.exists(args.checkpoint):
+        spec = JobSpec.sweep(args.species.split(",") if args.species else None, parse_levels(args.levels),
+                             ("UltimateWeapon", "UltimateArmor", "UltimateAccessory") if args.ultimate else (),
+                             args.policy, battles=args.battles, shard_size=args.shard_size, seed=args.seed)
+    return SimulationJob(args.checkpoint, spec)
+
+
+def print_totals(job):
+    for config, stats in job.totals().items():
+        print(f"{config.species:<16} Lv{config.level:<3} 勝率 {stats.win_rate:6.1%}  平均 {stats.mean_turns:.2f}ターン")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="チェックポイントから再開できるシミュレーションジョブ")
+    add_spec_arguments(parser)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    parser.add_argument("--interval", type=float, default=60.0, help="チェックポイントの間隔（秒）")
+    args = parser.parse_args(argv)
+
+    job = job_from_args(args)
+    done, total = job.progress()
+    if done:
+        print(f"{args.checkpoint} から再開します（{done:,}/{total:,}バトル済み）")
+
+    def report(done, total):
+        print(f"\r{done:,}/{total:,}バトル ({done / total:.1%})", end="", flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            job.run(executor, checkpoint_interval=args.interval, on_progress=report)
+    except KeyboardInterrupt:
+        print(f"\n中断しました。同じコマンドで {args.checkpoint} から再開できます")
+        return 130
+    print()
+    print_totals(job)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from simulator import BattleConfig, simulate
+from adaptive import adaptive_summary, check_targets
+from balance import BalanceStore
+from sim_cache import SimulationCache, cache_key
+
+DEFAULT_BATTLES = 1000
+MAX_BATTLES = 1_000_000
+
+
+def run_group(config_data, seed, counts, max_turns, balance=None):
+    """同じ条件・シードの問い合わせをまとめて1回のシミュレーションで答える（ワーカーで呼ばれる）
+
+    乱数系列が共通なので、最大のバトル数だけ実行し、途中のバトル数の集計をそのまま使う。
+    """
+    config = BattleConfig.from_dict(config_data)
+    snapshots = simulate(config, max(counts), seed, max_turns, checkpoints=counts, balance=balance)
+    return {count: stats.summary() for count, stats in snapshots.items()}
+
+
+class LatencyTracker:
+    """直近の応答時間からパーセンタイルを求める"""
+    def __init__(self, window=10000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return samples[index]
+
+    def snapshot(self):
+        return {"p50_ms": self.percentile(0.50) * 1000, "p99_ms": self.percentile(0.99) * 1000,
+                "samples": len(self._samples)}
+
+
+class SimulationBatcher:
+    """同時に届いた同じ・互換な問い合わせをまとめてワーカープールで実行する
+
+    条件とシードとバランス表が同じ問い合わせは、バトル数が違っても1回の実行にまとめる（互換な問い合わせ）。
+    batch_window 秒だけ待って集まった分をまとめて投入し、実行中の問い合わせと同じものは相乗りさせる。
+    """
+    def __init__(self, executor, batch_window=0.005, max_turns=100):
+        self.executor = executor
+        self.batch_window = batch_window
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._pending = {}   # (条件, シード, 表) → {"config": 条件, "balance": 表, "counts": {バトル数: Future}}
+        self._inflight = {}  # (条件, シード, 表, バトル数) → Future
+        self.groups_run = 0
+
+    def submit(self, config, battles, seed, balance=None):
+        """問い合わせを受け付け、集計（dict）が入る Future を返す
+
+        balance: バランス表のスナップショット（省略時は既定値）
+        """
+        group_key = (config.key(), seed, balance.digest if balance is not None else None)
+        with self._lock:
+            running = self._inflight.get(group_key + (battles,))
+            if running is not None:
+                return running
+            group = self._pending.get(group_key)
+            if group is None:
+                group = self._pending[group_key] = {"config": config, "balance": balance, "counts": {}}
+                timer = threading.Timer(self.batch_window, self._dispatch, (group_key,))
+                timer.daemon = True
+                timer.start()
+            future = group["counts"].get(battles)
+            if future is None:
+                future = group["counts"][battles] = Future()
+            return future
+
+    def _dispatch(self, group_key):
+        with self._lock:
+            group = self._pending.pop(group_key, None)
+            if group is None:
+                return
+            counts = sorted(group["counts"])
+            waiters = group["counts"]
+            for count, future in waiters.items():
+                self._inflight[group_key + (count,)] = future
+            self.groups_run += 1
+        try:
+            work = self.executor.submit(run_group, group["config"].to_dict(), group_key[1], counts, self.max_turns,
+                                        group["balance"])
+        except Exception as error:
+            self._finish(group_key, waiters, error=error)
+            return
+        work.add_done_callback(lambda done: self._finish(group_key, waiters, done=done))
+
+    def _finish(self, group_key, waiters, done=None, error=None):
+        with self._lock:
+            for count in waiters:
+                self._inflight.pop(group_key + (count,), None)
+        if error is None:
+            error = done.exception()
+        for count, future in waiters.items():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[count])
+
+
+class SimulationService:
+    """問い合わせのキャッシュ・まとめ実行・応答時間の計測を行うシミュレーションサービス"""
+    def __init__(self, executor, cache_size=10000, batch_window=0.005, max_turns=100, balance=None, cache=None):
+        """
+        Args:
+            balance: バランス表を持つ BalanceStore（省略時は既定値の表のまま変わらない）
+            cache: 結果の SimulationCache（省略時はメモリに cache_size 件だけ置く）
+        """
+        self.batcher = SimulationBatcher(executor, batch_window, max_turns)
+        self.balance = balance if balance is not None else BalanceStore()
+        self.latency = LatencyTracker()
+        self.cache = cache if cache is not None else SimulationCache(capacity=cache_size)
+
+    def query(self, request):
+        """問い合わせ（dict）に答える
+
+        request: {"species": "KingSlime", "level": 7, "equipment": "ultimate",
+                  "policy": "spell", "battles": 1000, "seed": 0}
+        battles の代わりに "target": {"win_rate": 0.01} のように信頼区間の目標の幅を指定すると、
+        目標に達するまで（battles を指定したときはそれを上限として）実行する。
+        問い合わせは届いた時点のバランス表で答え、表が変われば前の表の結果はキャッシュから使わない。
+        """
+        started = time.perf_counter()
+        config = BattleConfig.from_dict(request)
+        targets = request.get("target")
+        battles = int(request.get("battles", MAX_BATTLES if targets else DEFAULT_BATTLES))
+        if not 1 <= battles <= MAX_BATTLES:
+            raise ValueError(f"battles は1〜{MAX_BATTLES}で指定してください")
+        seed = int(request.get("seed", 0))
+        balance = self.balance.current()
+        if targets:
+            targets = {metric: float(width) for metric, width in targets.items()}
+            check_targets(targets)
+            confidence = float(request.get("confidence", 0.95))
+            key = cache_key(config, balance, battles=battles, seed=seed, max_turns=self.batcher.max_turns,
+                            targets=targets, confidence=confidence)
+        else:
+            key = cache_key(config, balance, battles=battles, seed=seed, max_turns=self.batcher.max_turns)
+
+        result = self.cache.get(key, balance.digest)
+        cached = result is not None
+        if not cached:
+            if targets:
+                # 目標の精度で止める問い合わせは、バトル数が前もって決まらないのでまとめずに実行する
+                result = self.batcher.executor.submit(
+                    adaptive_summary, config.to_dict(), targets, confidence, seed,
+                    max_battles=battles, max_turns=self.batcher.max_turns, balance=balance).result()
+            else:
+                result = self.batcher.submit(config, battles, seed, balance).result()
+            self.cache.put(key, balance.digest, result)
+
+        elapsed = time.perf_counter() - started
+        self.latency.record(elapsed)
+        response = {"config": config.to_dict(), "battles": result["battles"], "seed": seed,
+                    "balance_version": balance.version, "result": result, "cached": cached,
+                    "latency_ms": elapsed * 1000}
+        response.update(self.latency.snapshot())
+        return response
+
+    def metrics(self):
+        data = self.latency.snapshot()
+        cache = self.cache.stats()
+        data.update({"cache_entries": cache["memory_entries"], "cache_disk_entries": cache["disk_entries"],
+                     "cache_hits": cache["memory_hits"] + cache["disk_hits"], "groups_run": self.batcher.groups_run})
+        return data
+
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    """POST /simulate にJSONで問い合わせ、GET /metrics で応答時間を返す"""
+    service = None
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.service.metrics())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/simulate":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            self._send_json(200, self.service.query(request))
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": str(error)})
+        except Exception as error:
+            # ワーカーの異常終了など、問い合わせの誤りでない失敗も接続を切らずに応答する
+            self._send_json(500, {"error": f"{type(error).__name__}: {error}"})
+
+    def log_message(self, format, *args):
+        pass  # 問い合わせごとのアクセスログは出さない
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    """サービスを公開するHTTPサーバーを作る（port=0 なら空いているポート）"""
+    handler = type("BoundSimulationRequestHandler", (SimulationRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="バトルシミュレーションのHTTPサービス")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    parser.add_argument("--batch-window", type=float, default=0.005, help="問い合わせをまとめる待ち時間（秒）")
+    parser.add_argument("--balance", default=None, help="バランス表のデータファイル（変更は再起動せずに反映される）")
+    parser.add_argument("--balance-interval", type=float, default=1.0, help="バランス表の変更を確かめる間隔（秒）")
+    parser.add_argument("--cache", default=None, help="結果を保存する SQLite ファイル（再起動しても前の結果を使う）")
+    args = parser.parse_args(argv)
+
+    balance = BalanceStore(args.balance)
+    if args.balance:
+        balance.watch(args.balance_interval)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor, SimulationCache(args.cache) as cache:
+        service = SimulationService(executor, batch_window=args.batch_window, balance=balance, cache=cache)
+        server = make_server(service, args.host, args.port)
+        print(f"http://{args.host}:{server.server_address[1]}/simulate で待ち受け中")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            balance.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
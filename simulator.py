@@ -0,0 +1,238 @@
+import json
+import math
+import random
+from statistics import NormalDist
+from slime import BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
+from hero import Sage, UltimateWeapon, UltimateArmor, UltimateAccessory
+from slime_battle import Battle
+
+ATTACK, SPELL, ESCAPE = 1, 2, 3  # Battle.play_turn の行動番号
+
+# シミュレーションで指定できるスライム・装備（クラス名で指定する）
+SPECIES = {cls.__name__: cls for cls in (BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime)}
+EQUIPMENT = {cls.__name__: cls for cls in (UltimateWeapon, UltimateArmor, UltimateAccessory)}
+SHARED_EQUIPMENT = {name: cls() for name, cls in EQUIPMENT.items()}  # 装備品は状態を持たないので共有する
+
+OUTCOMES = ("win", "lose", "escape", "enemy_escape", "timeout")
+
+
+def _discard(*args, **kwargs):
+    """バトルメッセージを捨てる（ヘッドレス実行用）"""
+
+
+# ---- 行動方針 ----
+
+def attack_policy(battle, rng):
+    """毎ターン通常攻撃する"""
+    return (ATTACK, None)
+
+
+def spell_policy(battle, rng):
+    """HPが減ったら回復し、それ以外は使える中で最も強い攻撃呪文を唱える"""
+    player = battle.player
+    balance = battle.balance
+    costs = balance.spell_costs
+    if player.hp * 10 < player.max_hp * 3:
+        heals = [spell for spell in player.spells if spell in balance.spell_heal and player.mp >= costs[spell]]
+        if heals:
+            return (SPELL, max(heals, key=balance.spell_heal.get))
+    attacks = [spell for spell in player.spells if spell in balance.spell_damage and player.mp >= costs[spell]]
+    if attacks:
+        return (SPELL, max(attacks, key=balance.spell_damage.get))
+    return (ATTACK, None)
+
+
+def random_policy(battle, rng):
+    """攻撃・呪文・逃走をランダムに選ぶ"""
+    roll = rng.random()
+    if roll < 0.6:
+        return (ATTACK, None)
+    if roll < 0.95:
+        return (SPELL, rng.choice(list(battle.player.spells)))
+    return (ESCAPE, None)
+
+
+POLICIES = {
+    "attack": attack_policy,
+    "spell": spell_policy,
+    "random": random_policy,
+}
+
+
+class BattleConfig:
+    """シミュレーションするバトルの条件（賢者のレベル・装備、敵の種類、行動方針）"""
+
+    def __init__(self, species, level=1, equipment=(), policy="attack"):
+        if species not in SPECIES:
+            raise ValueError(f"未知のスライム: {species}")
+        if policy not in POLICIES:
+            raise ValueError(f"未知の行動方針: {policy}")
+        for item in equipment:
+            if item not in EQUIPMENT:
+                raise ValueError(f"未知の装備: {item}")
+        if level < 1:
+            raise ValueError("レベルは1以上です")
+        self.species = species
+        self.level = level
+        self.equipment = tuple(sorted(set(equipment)))
+        self.policy = policy
+
+    @classmethod
+    def from_dict(cls, data):
+        equipment = data.get("equipment", ())
+        if equipment == "ultimate":
+            equipment = tuple(EQUIPMENT)
+        return cls(data["species"], int(data.get("level", 1)), tuple(equipment), data.get("policy", "attack"))
+
+    def to_dict(self):
+        return {"species": self.species, "level": self.level,
+                "equipment": list(self.equipment), "policy": self.policy}
+
+    def key(self):
+        """同じ条件なら同じになる正規化済みのキー"""
+        return (self.species, self.level, self.equipment, self.policy)
+
+    def canonical_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+    def __eq__(self, other):
+        return isinstance(other, BattleConfig) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"BattleConfig({self.species!r}, level={self.level}, equipment={self.equipment!r}, policy={self.policy!r})"
+
+
+def make_sage(level=1, equipment=()):
+    """指定レベル・装備の賢者を作る"""
+    sage = Sage("シミュレーション")
+    for _ in range(level - 1):
+        sage.level_up()
+    for item in equipment:
+        sage.equip(SHARED_EQUIPMENT[item])
+    sage.hp = sage.max_hp
+    sage.mp = sage.max_mp
+    return sage
+
+
+def run_battle(config, rng, max_turns=100, player=None, battle_class=Battle, balance=None):
+    """1バトルを入力なしで最後まで実行する
+
+    Args:
+        config: バトルの条件
+        rng: このバトルで使う乱数生成器（敵・行動方針の乱数もここから引く）
+        max_turns: これを超えたら "timeout" として打ち切る
+        player: 続きから戦う賢者（省略時は config から新しく作る）
+        battle_class: Battle またはその派生クラス
+        balance: バランス表のスナップショット（省略時は既定値）
+    Returns:
+        (結果, ターン数, 獲得経験値, 獲得ゴールド)
+    """
+    if player is None:
+        player = make_sage(config.level, config.equipment)
+    enemy = SPECIES[config.species]() if balance is None else balance.make_enemy(config.species)
+    battle = battle_class(player, test_mode=True, rng=rng, output=_discard, enemies=[enemy], balance=balance)
+    battle.current_enemy = enemy
+    policy = POLICIES[config.policy]
+    for _ in range(max_turns):
+        if not battle.play_turn(*policy(battle, rng)):
+            return battle.outcome, battle.turn_count, battle.exp_gained, battle.gold_gained
+    return "timeout", battle.turn_count, battle.exp_gained, battle.gold_gained
+
+
+class SimulationStats:
+    """バトル結果の集計（整数だけを持つので、足し合わせる順序によらず同じ値になる）"""
+    FIELDS = ("battles",) + OUTCOMES + ("turns", "turns_sq", "exp", "gold")  # turns_sq はターン数の2乗和
+
+    def __init__(self, **counts):
+        for field in self.FIELDS:
+            setattr(self, field, counts.get(field, 0))
+
+    def add(self, outcome, turns, exp, gold):
+        self.battles += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self.turns += turns
+        self.turns_sq += turns * turns
+        self.exp += exp
+        self.gold += gold
+
+    def merge(self, other):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def copy(self):
+        return SimulationStats(**self.to_dict())
+
+    @property
+    def win_rate(self):
+        return self.win / self.battles if self.battles else 0.0
+
+    @property
+    def mean_turns(self):
+        return self.turns / self.battles if self.battles else 0.0
+
+    def win_rate_interval(self, confidence=0.95):
+        """勝率の信頼区間（Wilson の方法。勝率が0や1に近くても幅が0にならない）"""
+        if not self.battles:
+            return 0.0, 1.0
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        n, p = self.battles, self.win_rate
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(0.0, center - half), min(1.0, center + half)
+
+    def mean_turns_interval(self, confidence=0.95):
+        """平均ターン数の信頼区間（正規近似）"""
+        if self.battles < 2:
+            return 0.0, math.inf
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        variance = (self.turns_sq - self.turns * self.turns / self.battles) / (self.battles - 1)
+        half = z * math.sqrt(max(variance, 0.0) / self.battles)
+        return self.mean_turns - half, self.mean_turns + half
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field, 0) for field in cls.FIELDS})
+
+    def summary(self):
+        """集計値と主な指標"""
+        data = self.to_dict()
+        data["win_rate"] = self.win_rate
+        data["mean_turns"] = self.mean_turns
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, SimulationStats) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"SimulationStats({self.to_dict()})"
+
+
+def simulate(config, battles, seed=0, max_turns=100, checkpoints=None, rng=None, balance=None):
+    """同じ条件のバトルを繰り返して集計する
+
+    乱数は1本の系列から順に引くので、n バトルの結果は
+    より多くのバトルを実行したときの最初の n バトル分の集計と一致する。
+
+    Args:
+        checkpoints: 途中の集計も欲しいバトル数のリスト（指定時は {バトル数: 集計} を返す）
+        rng: 乱数生成器（省略時は seed から作る）
+        balance: バランス表のスナップショット（省略時は既定値）
+    """
+    rng = rng if rng is not None else random.Random(seed)
+    stats = SimulationStats()
+    wanted = set(checkpoints or ())
+    snapshots = {}
+    for number in range(1, battles + 1):
+        stats.add(*run_battle(config, rng, max_turns, balance=balance))
+        if number in wanted:
+            snapshots[number] = stats.copy()
+    if checkpoints is not None:
+        return snapshots
+    return stats
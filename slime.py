@@ -1,4 +1,9 @@
 class EnemyCharacter:
+    # 大量の敵を同時に持てるよう、インスタンスごとの __dict__ を持たない
+    # art はコンテンツパック由来の敵だけが持つ
+    __slots__ = ("hp", "max_hp", "attack", "defense", "name", "exp", "gold", "type",
+                 "weakness", "resistance", "status_effects", "color", "special_ability", "art")
+
     def __init__(self):
         self.hp = 1
         self.max_hp = 1
@@ -11,6 +16,8 @@ class EnemyCharacter:
         self.weakness = None
         self.resistance = None
         self.status_effects = []
+        self.color = None
+        self.special_ability = None
 
     def take_damage(self, damage):
         """ダメージを受ける処理"""
@@ -32,6 +39,8 @@ class EnemyCharacter:
 
 
 class BaseSlime(EnemyCharacter):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.hp = 10
@@ -49,6 +58,8 @@ class BaseSlime(EnemyCharacter):
 
 
 class MetalSlime(BaseSlime):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "メタルスライム"
@@ -65,11 +76,14 @@ class MetalSlime(BaseSlime):
 
 
 class StrayMetal(BaseSlime):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "はぐれメタル"
         self.color = "銀"
         self.hp = 6
+        self.max_hp = 6
         self.attack = 5
         self.defense = 255
         self.special_ability = "非常に高確率で逃げる"
@@ -80,11 +94,14 @@ class StrayMetal(BaseSlime):
 
 
 class PoisonSlime(BaseSlime):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "ポイズンスライム"
         self.color = "紫"
         self.hp = 15
+        self.max_hp = 15
         self.attack = 8
         self.special_ability = "毒攻撃"
         self.exp = 5
@@ -92,11 +109,14 @@ class PoisonSlime(BaseSlime):
 
 
 class KingSlime(BaseSlime):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "キングスライム"
         self.color = "青"
         self.hp = 30
+        self.max_hp = 30
         self.attack = 15
         self.defense = 8
         self.special_ability = "分裂攻撃"
@@ -105,11 +125,14 @@ class KingSlime(BaseSlime):
 
 
 class MetalKingSlime(BaseSlime):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.name = "メタルキングスライム"
         self.color = "金"
         self.hp = 8
+        self.max_hp = 8
         self.attack = 10
         self.defense = 255
         self.special_ability = "非常に高確率で逃げる"
@@ -137,7 +160,7 @@ if __name__ == "__main__":
         for key, value in status.items():
             if key != "名前":  # 名前は既に表示したのでスキップ
                 print(f"{key}: {value}")
-        # 色は EnemyCharacter には無い特別な属性なので個別に表示
+        # 色は get_status() に含まれないので個別に表示
         print(f"色: {slime.color}")
         if slime.special_ability:
             print(f"特殊能力: {slime.special_ability}") 
\ No newline at end of file
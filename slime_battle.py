@@ -1,63 +1,79 @@
 import random
 import time
-from slime import BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
-from hero import Sage
+from slime import MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
+from hero import Sage, SPELL_ELEMENTS, ATTACK_SPELLS, ELEMENT_TABLE
+from elements import NEUTRAL
+from progress_store import ProgressStore, DEFAULT_STORE_PATH
+from messages import Message
+from balance import DEFAULT_BALANCE, BalanceStore
 
-class SlimeArt:
-    @staticmethod
-    def get_slime_art(slime):
-        """スライムの種類に応じたASCIIアートを返す"""
-        base_art = """
+# スライムのASCIIアート（アートID → アート）
+SLIME_ARTS = {
+    "base": """
          ／￣￣＼
        ／   ●   ●＼
      ｜      ∇      ｜
        ＼＿＿＿／
          ／   ＼
        （＿＿＿）
-"""
-        metal_art = """
+""",
+    "metal": """
          ／￣￣＼
        ／   ◎   ◎＼
      ｜      ∇      ｜
        ＼＿★＿／
          ／   ＼
        （＿＿＿）
-"""
-        metal_king_art = """
+""",
+    "metal_king": """
          ／￣👑￣＼
        ／   ◎   ◎＼
      ｜      ∇      ｜
        ＼＿★＿／
          ／   ＼
        （＿＿＿）
-"""
-        king_art = """
+""",
+    "king": """
          ／￣👑￣＼
        ／   ●   ●＼
      ｜      ∇      ｜
        ＼＿♔＿／
          ／   ＼
        （＿＿＿）
-"""
-        poison_art = """
+""",
+    "poison": """
          ／￣￣＼
        ／   ◉   ◉＼
      ｜      ☠      ｜
        ＼＿∿＿／
          ／   ＼
        （＿＿＿）
-"""
-        
+""",
+}
+
+class SlimeArt:
+    @staticmethod
+    def get_art_id(slime):
+        """スライムの種類に応じたアートIDを返す"""
         if isinstance(slime, MetalKingSlime):
-            return metal_king_art
+            return "metal_king"
         elif isinstance(slime, (MetalSlime, StrayMetal)):
-            return metal_art
+            return "metal"
         elif isinstance(slime, KingSlime):
-            return king_art
+            return "king"
         elif isinstance(slime, PoisonSlime):
-            return poison_art
+            return "poison"
         else:
-            return base_art
+            return "base"
+
+    @staticmethod
+    def get_slime_art(slime):
+        """スライムの種類に応じたASCIIアートを返す"""
+        # コンテンツパック由来の敵は自前のアートを持つ
+        art = getattr(slime, "art", None)
+        if art:
+            return art
+        return SLIME_ARTS[SlimeArt.get_art_id(slime)]
 
     @staticmethod
     def get_slime_color(slime):
@@ -72,6 +88,9 @@ class SlimeArt:
         return color_map.get(slime.color, "") + "{}" + reset
 
 class Player:
+    __slots__ = ("name", "hp", "max_hp", "mp", "max_mp", "attack", "defense", "level", "exp", "gold",
+                 "status_effects")
+
     def __init__(self, name):
         self.name = name
         self.hp = 100
@@ -82,8 +101,14 @@ class Player:
         self.defense = 10
         self.level = 1
         self.exp = 0
+        self.gold = 0
         self.status_effects = []
 
+    def take_damage(self, damage):
+        """ダメージを受ける処理"""
+        self.hp = max(0, self.hp - damage)
+        return self.hp <= 0  # True if defeated
+
     def get_status(self):
         return {
             "名前": self.name,
@@ -97,19 +122,34 @@ class Player:
         }
 
 class Battle:
-    def __init__(self, player, test_mode=False):
+    def __init__(self, player, test_mode=False, rng=None, output=None, enemies=None, element_table=None,
+                 balance=None, input_func=None):
+        """
+        Args:
+            player: プレイヤーキャラクター
+            test_mode: Trueなら入力待ちをせずに動作する
+            rng: 乱数生成器（random.Random互換、省略時はrandomモジュール）
+            output: メッセージの出力先（省略時はprint、シミュレーション時は捨てる関数を渡す）
+            enemies: 出現する敵のリスト（省略時は標準の6種、コンテンツパックの敵も渡せる）
+            element_table: 属性倍率表（省略時は hero.ELEMENT_TABLE）
+            balance: バランス表のスナップショット（省略時は既定値、バトル中は差し替わらない）
+            input_func: 入力を読む関数（省略時はinput、input_script.ScriptedInput でスクリプトから読める）
+        """
         self.player = player
-        self.enemies = [
-            BaseSlime(),
-            MetalSlime(),
-            StrayMetal(),
-            PoisonSlime(),
-            KingSlime(),
-            MetalKingSlime()
-        ]
+        self.balance = balance if balance is not None else DEFAULT_BALANCE
+        if enemies is None:
+            enemies = self.balance.make_enemies()
+        self.enemies = enemies
         self.current_enemy = None
         self.turn_count = 0
         self.test_mode = test_mode  # テストモード用フラグ
+        self.rng = rng if rng is not None else random
+        self.output = output if output is not None else print
+        self.input_func = input_func if input_func is not None else input
+        self.outcome = None  # 決着: "win", "lose", "escape", "enemy_escape"
+        self.exp_gained = 0  # このバトルで得た経験値・ゴールド
+        self.gold_gained = 0
+        self.element_table = element_table if element_table is not None else ELEMENT_TABLE
 
     def start_battle(self, auto_action=None):
         """バトルを開始する
@@ -118,25 +158,28 @@ class Battle:
             auto_action: テストモード時の自動アクション（1: 攻撃, 2: 呪文, 3: 逃げる）
         """
         self.turn_count = 0  # ターン数を初期化
-        self.current_enemy = random.choice(self.enemies)
-        print("\n" + "="*50)
+        self.outcome = None
+        self.exp_gained = 0
+        self.gold_gained = 0
+        self.current_enemy = self.rng.choice(self.enemies)
+        self.output(Message("battle.rule_open"))
         
         # 敵の出現メッセージと情報
-        print(f"野生の{self.current_enemy.name}が現れた！")
-        print(f"\n【敵の情報】")
-        print(f"種類: {self.current_enemy.type}")
-        print(f"HP: {self.current_enemy.hp}")
-        print(f"攻撃力: {self.current_enemy.attack}")
-        print(f"防御力: {self.current_enemy.defense}")
+        self.output(Message("battle.appear", enemy=self.current_enemy.name))
+        self.output(Message("battle.enemy_info"))
+        self.output(Message("battle.enemy_type", value=self.current_enemy.type))
+        self.output(Message("battle.enemy_hp", value=self.current_enemy.hp))
+        self.output(Message("battle.enemy_attack", value=self.current_enemy.attack))
+        self.output(Message("battle.enemy_defense", value=self.current_enemy.defense))
         if self.current_enemy.special_ability:
-            print(f"特殊能力: {self.current_enemy.special_ability}")
-        print(f"弱点: {self.current_enemy.weakness}")
-        print(f"耐性: {self.current_enemy.resistance}")
+            self.output(Message("battle.enemy_ability", value=self.current_enemy.special_ability))
+        self.output(Message("battle.enemy_weakness", value=self.current_enemy.weakness))
+        self.output(Message("battle.enemy_resistance", value=self.current_enemy.resistance))
         
         # スライムのアスキーアート表示
         art = SlimeArt.get_slime_art(self.current_enemy)
         color_format = SlimeArt.get_slime_color(self.current_enemy)
-        print(color_format.format(art))
+        self.output(color_format.format(art))
         
         self.show_battle_status()
         
@@ -144,7 +187,7 @@ class Battle:
             # 通常のバトルループ
             while True:
                 self.turn_count += 1
-                print("\n" + "-"*20 + f" ターン {self.turn_count} " + "-"*20)
+                self.output(Message("battle.turn", turn=self.turn_count))
                 
                 if not self.player_turn():
                     break
@@ -152,12 +195,13 @@ class Battle:
                 if not self.enemy_turn():
                     break
                 
-                self.process_status_effects()
+                if not self.process_status_effects():
+                    break
                 self.show_battle_status()
         elif auto_action is not None:
             # テストモード：1ターンだけ実行
             self.turn_count += 1
-            print("\n" + "-"*20 + f" ターン {self.turn_count} " + "-"*20)
+            self.output(Message("battle.turn", turn=self.turn_count))
             
             if auto_action == 1:
                 return self.player_attack()
@@ -166,12 +210,34 @@ class Battle:
             elif auto_action == 3:
                 return self.try_escape()
 
+    def play_turn(self, action, spell_name=None):
+        """入力を待たずに1ターン（プレイヤー行動→敵の行動→状態異常）を進める
+
+        Args:
+            action: 1: 攻撃, 2: 呪文, 3: 逃げる
+            spell_name: action が 2 のときに唱える呪文
+        Returns:
+            バトルが続くなら True
+        """
+        self.turn_count += 1
+        if action == 1:
+            continues = self.player_attack()
+        elif action == 2:
+            continues = self.cast_selected_spell(spell_name)
+        else:
+            continues = self.try_escape()
+        if not continues:
+            return False
+        if not self.enemy_turn():
+            return False
+        return self.process_status_effects()
+
     def player_turn(self):
         """プレイヤーのターン処理"""
-        print("\nあなたのターン！")
-        print("1: 攻撃")
-        print("2: 呪文")
-        print("3: 逃げる")
+        self.output(Message("menu.your_turn"))
+        self.output(Message("menu.option", number=1, label=Message("menu.attack")))
+        self.output(Message("menu.option", number=2, label=Message("menu.spell")))
+        self.output(Message("menu.option", number=3, label=Message("menu.escape")))
         
         if self.test_mode:
             # テストモード時は入力をスキップ
@@ -179,12 +245,12 @@ class Battle:
             
         while True:
             try:
-                choice = int(input("行動を選択してください (1-3): "))
+                choice = int(self.input_func(Message("menu.action_prompt")))
                 if 1 <= choice <= 3:
                     break
             except ValueError:
                 pass
-            print("無効な選択です。1から3の数字を入力してください。")
+            self.output(Message("menu.invalid_action"))
 
         if choice == 1:
             return self.player_attack()
@@ -195,89 +261,119 @@ class Battle:
 
     def player_cast_spell(self):
         """呪文選択と使用"""
-        print("\n使用可能な呪文:")
+        self.output(Message("menu.spell_list"))
         spells = self.player.spells
         for i, spell in enumerate(spells, 1):
-            print(f"{i}: {spell}")
-        print(f"{len(spells) + 1}: 戻る")
+            self.output(Message("menu.option", number=i, label=spell))
+        self.output(Message("menu.option", number=len(spells) + 1, label=Message("menu.back")))
 
         while True:
+            answer = self.input_func(Message("menu.spell_prompt", last=len(spells) + 1)).strip()
+            if answer in spells:
+                # 番号のほか呪文の名前でも選べる（覚えた呪文で番号がずれてもスクリプトが使える）
+                choice = spells.index(answer) + 1
+                break
             try:
-                choice = int(input(f"呪文を選択してください (1-{len(spells) + 1}): "))
+                choice = int(answer)
                 if 1 <= choice <= len(spells) + 1:
                     break
             except ValueError:
                 pass
-            print("無効な選択です。")
+            self.output(Message("menu.invalid_choice"))
 
         if choice == len(spells) + 1:
             return self.player_turn()
 
-        selected_spell = spells[choice - 1]
-        
-        # 攻撃呪文の場合
-        if selected_spell in ["メラ", "メラミ", "メラゾーマ"]:
-            result = self.player.cast_spell(selected_spell, self.current_enemy)
-            print("\n" + result)
-            
-            # ダメージ計算
-            spell_damage = {
-                "メラ": 30,
-                "メラミ": 70,
-                "メラゾーマ": 150
-            }
-            
-            base_damage = spell_damage[selected_spell]
-            # 弱点の場合、ダメージ2倍
-            if self.current_enemy.weakness == "火":
-                base_damage *= 2
-                print("効果は抜群だ！")
+        return self.cast_selected_spell(spells[choice - 1])
+
+    def cast_selected_spell(self, selected_spell):
+        """選んだ呪文を使用する"""
+        # 覚えていない・MPが足りない場合は失敗メッセージだけ表示してターンを消費する
+        if (selected_spell not in self.player.spells
+                or self.player.mp < self.balance.spell_costs.get(selected_spell, 0)):
+            self.output(Message("battle.spell_result",
+                                result=self.player.cast_spell(selected_spell, balance=self.balance)))
+            return True
+
+        # 攻撃呪文の場合（MPの消費とメッセージは賢者側、ダメージはここで1回だけ与える）
+        if selected_spell in ATTACK_SPELLS:
+            result = self.player.cast_spell(selected_spell, balance=self.balance)
+            self.output(Message("battle.spell_result", result=result))
             
-            self.current_enemy.take_damage(base_damage)
-            print(f"{self.current_enemy.name}に{base_damage}のダメージ！")
+            # ダメージ計算（属性倍率表を引く）
+            base_damage = self.deal_damage(self.current_enemy, self.balance.spell_damage[selected_spell],
+                                           SPELL_ELEMENTS[selected_spell])
+            self.output(Message("battle.damage", target=self.current_enemy.name, damage=base_damage))
             
             if self.current_enemy.hp <= 0:
-                return self.win_battle()
+                self.win_battle()
+                return False
             return True
 
+        # 回復・補助呪文は自分に使う
+        self.output(Message("battle.spell_result",
+                            result=self.player.cast_spell(selected_spell, self.player, self.balance)))
+        return True
+
+    def roll(self, probability, event):
+        """確率 probability で起きる判定を1回行う
+
+        判定はすべてここを通るので、派生クラスで確率の偏りや記録を差し込める。
+        event: "player_hit", "player_escape", "enemy_escape", "enemy_special"
+        """
+        return self.rng.random() < probability
+
+    def deal_damage(self, target, base_damage, element=NEUTRAL):
+        """属性倍率を掛けたダメージを与え、与えたダメージを返す"""
+        multiplier = self.element_table.multiplier_for(element, target)
+        damage = max(1, int(base_damage * multiplier))
+        if multiplier > 1:
+            self.output(Message("battle.super_effective"))
+        elif multiplier < 1:
+            self.output(Message("battle.not_very_effective"))
+        target.take_damage(damage)
+        return damage
+
     def player_attack(self):
         """プレイヤーの通常攻撃"""
         damage = max(1, self.player.attack - self.current_enemy.defense // 2)
         hit_chance = 0.95  # 通常攻撃の命中率
 
-        if random.random() < hit_chance:
-            self.current_enemy.hp -= damage
-            print(f"\n{self.player.name}の攻撃！")
-            print(f"{self.current_enemy.name}に{damage}のダメージ！")
+        if self.roll(hit_chance, "player_hit"):
+            self.output(Message("battle.attack", attacker=self.player.name))
+            damage = self.deal_damage(self.current_enemy, damage)
+            self.output(Message("battle.damage", target=self.current_enemy.name, damage=damage))
             
             if self.current_enemy.hp <= 0:
                 self.win_battle()
                 return False
         else:
-            print(f"\n{self.player.name}の攻撃！しかし、外れてしまった！")
+            self.output(Message("battle.attack_miss", attacker=self.player.name))
         
         return True
 
     def try_escape(self):
         """逃走を試みる"""
-        escape_chance = 0.5
-        if random.random() < escape_chance:
-            print(f"\n{self.player.name}は逃げ出した！")
+        if self.roll(self.balance.player_escape_chance, "player_escape"):
+            self.output(Message("battle.fled", name=self.player.name))
+            self.outcome = "escape"
             return False
         else:
-            print("\n逃げ出せなかった！")
+            self.output(Message("battle.escape_failed"))
         return True
 
     def enemy_turn(self):
         """敵のターン処理"""
-        if random.random() < self.get_escape_chance():
-            print(f"\n{self.current_enemy.name}は逃げ出した！")
+        if self.roll(self.get_escape_chance(), "enemy_escape"):
+            self.output(Message("battle.fled", name=self.current_enemy.name))
+            self.outcome = "enemy_escape"
+            self.exp_gained = self.current_enemy.exp // 3
             self.player.exp += self.current_enemy.exp // 3
-            print(f"逃げられてしまった... 経験値を{self.current_enemy.exp // 3}獲得！")
+            self.output(Message("battle.enemy_fled_exp", exp=self.current_enemy.exp // 3))
             return False
 
         # 特殊能力の発動判定
-        if self.current_enemy.special_ability and random.random() < 0.3:
+        if self.current_enemy.special_ability and self.roll(0.3, "enemy_special"):
             return self.enemy_special_attack()
         else:
             return self.enemy_normal_attack()
@@ -285,9 +381,9 @@ class Battle:
     def enemy_normal_attack(self):
         """敵の通常攻撃"""
         damage = max(1, self.current_enemy.attack - self.player.defense // 2)
-        self.player.hp -= damage
-        print(f"\n{self.current_enemy.name}の攻撃！")
-        print(f"{self.player.name}に{damage}のダメージ！")
+        self.output(Message("battle.attack", attacker=self.current_enemy.name))
+        damage = self.deal_damage(self.player, damage)
+        self.output(Message("battle.damage", target=self.player.name, damage=damage))
 
         if self.player.hp <= 0:
             self.lose_battle()
@@ -299,13 +395,13 @@ class Battle:
         if isinstance(self.current_enemy, PoisonSlime):
             if "毒" not in self.player.status_effects:
                 self.player.status_effects.append("毒")
-                print(f"\n{self.current_enemy.name}の毒攻撃！")
-                print(f"{self.player.name}は毒状態になった！")
+                self.output(Message("battle.poison_attack", enemy=self.current_enemy.name))
+                self.output(Message("battle.poisoned", target=self.player.name))
         elif isinstance(self.current_enemy, KingSlime):
             damage = max(1, self.current_enemy.attack * 2 - self.player.defense // 2)
-            self.player.hp -= damage
-            print(f"\n{self.current_enemy.name}の分裂攻撃！")
-            print(f"{self.player.name}に{damage}のダメージ！")
+            self.output(Message("battle.split_attack", enemy=self.current_enemy.name))
+            damage = self.deal_damage(self.player, damage)
+            self.output(Message("battle.damage", target=self.player.name, damage=damage))
         else:
             return self.enemy_normal_attack()
 
@@ -316,20 +412,14 @@ class Battle:
 
     def get_escape_chance(self):
         """敵の逃走確率を取得"""
-        if isinstance(self.current_enemy, MetalKingSlime):
-            return 0.9
-        elif isinstance(self.current_enemy, StrayMetal):
-            return 0.8
-        elif isinstance(self.current_enemy, MetalSlime):
-            return 0.7
-        return 0.0
+        return self.balance.escape_chance(self.current_enemy)
 
     def process_status_effects(self):
         """状態異常の処理"""
         if "毒" in self.player.status_effects:
             poison_damage = max(1, self.player.max_hp // 10)
-            self.player.hp -= poison_damage
-            print(f"\n毒のダメージ！{self.player.name}に{poison_damage}のダメージ！")
+            self.player.take_damage(poison_damage)
+            self.output(Message("battle.poison_damage", target=self.player.name, damage=poison_damage))
             
             if self.player.hp <= 0:
                 self.lose_battle()
@@ -338,12 +428,16 @@ class Battle:
 
     def win_battle(self):
         """勝利時の処理"""
-        print(f"\n{self.current_enemy.name}を倒した！")
+        self.outcome = "win"
+        self.output(Message("battle.enemy_defeated", enemy=self.current_enemy.name))
         exp_gained = self.current_enemy.exp
         gold_gained = self.current_enemy.gold
         self.player.exp += exp_gained
-        print(f"経験値を{exp_gained}獲得！")
-        print(f"ゴールドを{gold_gained}獲得！")
+        self.player.gold += gold_gained
+        self.exp_gained = exp_gained
+        self.gold_gained = gold_gained
+        self.output(Message("battle.exp_gained", exp=exp_gained))
+        self.output(Message("battle.gold_gained", gold=gold_gained))
         
         # レベルアップ判定
         while self.player.exp >= self.player.get_next_level_exp():
@@ -351,8 +445,9 @@ class Battle:
 
     def lose_battle(self):
         """敗北時の処理"""
-        print(f"\n{self.player.name}は力尽きた...")
-        print("ゲームオーバー")
+        self.outcome = "lose"
+        self.output(Message("battle.player_down", name=self.player.name))
+        self.output(Message("battle.game_over"))
 
     def get_next_level_exp(self):
         """次のレベルに必要な経験値を計算"""
@@ -361,48 +456,87 @@ class Battle:
     def level_up(self):
         """レベルアップ処理"""
         self.player.level_up()
-        print(f"\nレベルアップ！ {self.player.level}になった！")
-        print("ステータスが上昇した！")
+        self.output(Message("battle.level_up", level=self.player.level))
+        self.output(Message("battle.stats_up"))
 
     def show_battle_status(self):
         """バトル状況の表示"""
-        print("\n" + "="*50)
-        print(f"【{self.player.name}】")
-        print(f"HP: {self.player.hp}/{self.player.max_hp}")
-        print(f"MP: {self.player.mp}/{self.player.max_mp}")
+        self.output(Message("battle.rule_open"))
+        self.output(Message("status.name", name=self.player.name))
+        self.output(Message("status.hp", hp=self.player.hp, max_hp=self.player.max_hp))
+        self.output(Message("status.mp", mp=self.player.mp, max_mp=self.player.max_mp))
         if self.player.status_effects:
-            print(f"状態: {', '.join(self.player.status_effects)}")
+            self.output(Message("status.effects", effects=", ".join(self.player.status_effects)))
         
-        print(f"\n【{self.current_enemy.name}】")
-        print(f"HP: {self.current_enemy.hp}")
+        self.output(Message("status.enemy_name", name=self.current_enemy.name))
+        self.output(Message("battle.enemy_hp", value=self.current_enemy.hp))
         
         # スライムのアスキーアート表示（簡易版）
         art = SlimeArt.get_slime_art(self.current_enemy)
         color_format = SlimeArt.get_slime_color(self.current_enemy)
-        print(color_format.format(art))
+        self.output(color_format.format(art))
         
-        print("="*50)
+        self.output(Message("battle.rule"))
+
+def main(store_path=DEFAULT_STORE_PATH, balance_path=None, input_func=None, output=None, rng=None,
+         battle_class=None):
+    """ゲームを開始する
 
-def main():
-    print("スライムバトル！")
-    player_name = input("あなたの名前を入力してください: ")
-    player = Sage(player_name)  # プレイヤーは賢者として開始
+    Args:
+        store_path: 進行状況を保存するデータベース（None なら保存しない）
+        balance_path: バランス表のデータファイル（変更はプレイ中に次のバトルから反映される）
+        input_func: 入力を読む関数（省略時はinput、入力が尽きたら EOFError で終了する）
+        output: メッセージの出力先（省略時はprint）
+        rng: 乱数生成器（省略時はrandomモジュール）
+        battle_class: Battle またはその派生クラス（計測用のフックを差し込むときに使う）
+    Returns:
+        プレイヤー
+    """
+    read = input_func if input_func is not None else input
+    battle_class = battle_class if battle_class is not None else Battle
+    show = output if output is not None else print
+    balance = BalanceStore(balance_path)
+    if balance_path:
+        balance.watch()
+    show(Message("game.title"))
+    try:
+        player_name = read(Message("game.name_prompt"))
+    except EOFError:
+        balance.stop()
+        return None
+    store = ProgressStore(store_path) if store_path else None
+    player = store.load_player(player_name) if store else None
+    if player is None:
+        player = Sage(player_name)  # プレイヤーは賢者として開始
+    else:
+        show(Message("game.welcome_back", name=player.name, level=player.level))
     
-    while True:
-        battle = Battle(player)
-        battle.start_battle()
-        
-        if player.hp <= 0:
-            break
-            
-        print("\n1: 続ける")
-        print("2: 終了")
-        try:
-            choice = int(input("選択してください (1-2): "))
-            if choice == 2:
+    try:
+        while True:
+            battle = battle_class(player, rng=rng, output=show, balance=balance.current(), input_func=read)
+            battle.start_battle()
+            if store:
+                store.record_battle(player, battle)  # バトルごとに1回だけ書き込む
+
+            if player.hp <= 0:
                 break
-        except ValueError:
-            pass
+            
+            show()
+            show(Message("menu.option", number=1, label=Message("game.continue")))
+            show(Message("menu.option", number=2, label=Message("game.quit")))
+            try:
+                choice = int(read(Message("game.choice_prompt")))
+                if choice == 2:
+                    break
+            except ValueError:
+                pass
+    except EOFError:
+        pass  # 入力が尽きたら（Ctrl-D やスクリプトの終わり）終了する
+    finally:
+        balance.stop()
+        if store:
+            store.close()
+    return player
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,278 @@
+import re
+import sys
+import math
+from PySide6.QtCore import QObject, QThread, QTimer, Qt, Signal, Slot
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPixmap
+from PySide6.QtWidgets import (QApplication, QComboBox, QHBoxLayout, QLabel, QMainWindow, QProgressBar,
+                               QPushButton, QTextEdit, QVBoxLayout, QWidget)
+from hero import Sage
+from slime_battle import Battle, SlimeArt, SLIME_ARTS
+from messages import Message
+
+FRAME_INTERVAL_MS = 16  # 約60fps
+
+# スライムの色名 → 描画色（ターミナル版のカラーコードに対応）
+COLOR_MAP = {
+    "青": QColor(80, 120, 255),
+    "銀": QColor(200, 200, 210),
+    "金": QColor(240, 200, 40),
+    "紫": QColor(180, 80, 220),
+}
+DEFAULT_COLOR = QColor(230, 230, 230)
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class SpriteAtlas:
+    """スライムのアートを一度だけラスタライズして QPixmap をキャッシュする
+
+    キーは (アートID, 色名)。描画のたびに文字を組み版せず、キャッシュ済みの画像を貼るだけにする。
+    QPixmap は GUI スレッドでしか作れないため、UI スレッドからだけ使う。
+    """
+    def __init__(self, font_family="Monospace", point_size=14):
+        self.font = QFont(font_family, point_size)
+        self.font.setStyleHint(QFont.TypeWriter)
+        self._pixmaps = {}
+
+    def pixmap(self, art_id, color, art_text=None):
+        key = (art_id, color)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            pixmap = self._rasterize(art_text if art_text is not None else SLIME_ARTS[art_id],
+                                     COLOR_MAP.get(color, DEFAULT_COLOR))
+            self._pixmaps[key] = pixmap
+        return pixmap
+
+    def pixmap_for(self, enemy):
+        """敵キャラクターに対応するスプライト"""
+        art = getattr(enemy, "art", None)
+        art_id = f"pack:{enemy.name}" if art else SlimeArt.get_art_id(enemy)
+        return self.pixmap(art_id, enemy.color, art)
+
+    def _rasterize(self, text, color):
+        lines = text.strip("\n").split("\n")
+        metrics = QFontMetrics(self.font)
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 8
+        height = metrics.lineSpacing() * len(lines) + 8
+        pixmap = QPixmap(width, height)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(self.font)
+        painter.setPen(color)
+        for row, line in enumerate(lines):
+            painter.drawText(4, 4 + metrics.ascent() + row * metrics.lineSpacing(), line)
+        painter.end()
+        return pixmap
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+
+def battle_state(battle):
+    """UIに必要なバトルの状態"""
+    player, enemy = battle.player, battle.current_enemy
+    state = {
+        "turn": battle.turn_count,
+        "outcome": battle.outcome,
+        "player_name": player.name,
+        "player_level": player.level,
+        "player_hp": player.hp,
+        "player_max_hp": player.max_hp,
+        "player_mp": player.mp,
+        "player_max_mp": player.max_mp,
+        "player_status": tuple(player.status_effects),
+        "spells": tuple(player.spells),
+    }
+    if enemy is not None:
+        state.update({
+            "enemy_name": enemy.name,
+            "enemy_hp": enemy.hp,
+            "enemy_max_hp": enemy.max_hp,
+            "enemy_color": enemy.color,
+        })
+    return state
+
+
+def state_delta(previous, current):
+    """前回から変わった項目だけを取り出す"""
+    return {key: value for key, value in current.items() if previous.get(key, object()) != value}
+
+
+class BattleWorker(QObject):
+    """ワーカースレッドでバトルを進め、状態の差分とメッセージをUIスレッドへ送る"""
+    message = Signal(str)
+    state_changed = Signal(dict)
+    encounter = Signal(object)  # 新しい敵（スプライトの選択用）
+    busy = Signal(bool)
+
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+        self.battle = None
+        self._last_state = {}
+
+    def _emit(self, text=""):
+        # ターミナル用の色コードはログには不要
+        self.message.emit(ANSI_ESCAPE.sub("", str(text)))
+
+    def _publish(self):
+        state = battle_state(self.battle)
+        delta = state_delta(self._last_state, state)
+        self._last_state = state
+        if delta:
+            self.state_changed.emit(delta)
+
+    @Slot()
+    def start_encounter(self):
+        self.busy.emit(True)
+        self.battle = Battle(self.player, test_mode=True, output=self._emit)
+        self.battle.start_battle()
+        self.encounter.emit(self.battle.current_enemy)
+        self._last_state = {}
+        self._publish()
+        self.busy.emit(False)
+
+    @Slot(int, str)
+    def play_turn(self, action, spell_name):
+        if self.battle is None or self.battle.outcome is not None:
+            return
+        self.busy.emit(True)
+        self._emit(Message("battle.turn", turn=self.battle.turn_count + 1))
+        continues = self.battle.play_turn(action, spell_name or None)
+        if continues is False and self.battle.outcome is None:
+            self.battle.outcome = "escape"
+        self._publish()
+        self.busy.emit(False)
+
+
+class BattleWindow(QMainWindow):
+    """スライムバトルのウィンドウ（描画とボタン操作だけを受け持つ）"""
+    request_turn = Signal(int, str)
+    request_encounter = Signal()
+
+    def __init__(self, player):
+        super().__init__()
+        self.setWindowTitle("スライムバトル")
+        self.atlas = SpriteAtlas()
+        self.state = {}
+        self.sprite = None
+        self._shown_sprite = None
+        self.frame = 0
+
+        self.sprite_label = QLabel()
+        self.sprite_label.setAlignment(Qt.AlignCenter)
+        self.sprite_label.setMinimumHeight(180)
+        self.enemy_label = QLabel()
+        self.enemy_hp = QProgressBar()
+        self.player_label = QLabel()
+        self.player_hp = QProgressBar()
+        self.player_mp = QProgressBar()
+        self.log = QTextEdit()
+        self.log.setReadOnly(True)
+
+        self.attack_button = QPushButton(str(Message("menu.attack")))
+        self.spell_box = QComboBox()
+        self.spell_button = QPushButton(str(Message("menu.spell")))
+        self.escape_button = QPushButton(str(Message("menu.escape")))
+        self.next_button = QPushButton("次のバトル")
+        self.action_buttons = [self.attack_button, self.spell_button, self.escape_button]
+
+        buttons = QHBoxLayout()
+        for widget in (self.attack_button, self.spell_box, self.spell_button, self.escape_button, self.next_button):
+            buttons.addWidget(widget)
+        layout = QVBoxLayout()
+        for widget in (self.enemy_label, self.enemy_hp, self.sprite_label, self.player_label,
+                       self.player_hp, self.player_mp):
+            layout.addWidget(widget)
+        layout.addLayout(buttons)
+        layout.addWidget(self.log)
+        central = QWidget()
+        central.setLayout(layout)
+        self.setCentralWidget(central)
+
+        # バトルのロジックはワーカースレッドで動かし、シグナル（キュー接続）でやり取りする
+        self.thread = QThread(self)
+        self.worker = BattleWorker(player)
+        self.worker.moveToThread(self.thread)
+        self.worker.message.connect(self.log.append)
+        self.worker.state_changed.connect(self.apply_delta)
+        self.worker.encounter.connect(self.show_enemy)
+        self.worker.busy.connect(self.set_busy)
+        self.request_turn.connect(self.worker.play_turn)
+        self.request_encounter.connect(self.worker.start_encounter)
+        self.thread.start()
+
+        self.attack_button.clicked.connect(lambda: self.request_turn.emit(1, ""))
+        self.spell_button.clicked.connect(lambda: self.request_turn.emit(2, self.spell_box.currentText()))
+        self.escape_button.clicked.connect(lambda: self.request_turn.emit(3, ""))
+        self.next_button.clicked.connect(self.request_encounter.emit)
+
+        # 一定間隔で再描画する（ゲームロジックの処理時間に左右されない）
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(FRAME_INTERVAL_MS)
+        self.request_encounter.emit()
+
+    @Slot(object)
+    def show_enemy(self, enemy):
+        self.sprite = self.atlas.pixmap_for(enemy)
+
+    @Slot(dict)
+    def apply_delta(self, delta):
+        self.state.update(delta)
+        state = self.state
+        if "enemy_name" in state:
+            self.enemy_label.setText(f"【{state['enemy_name']}】")
+            self.enemy_hp.setRange(0, state["enemy_max_hp"])
+            self.enemy_hp.setValue(state["enemy_hp"])
+        status = f"（{', '.join(state['player_status'])}）" if state.get("player_status") else ""
+        self.player_label.setText(f"【{state['player_name']}】 レベル{state['player_level']} {status}")
+        self.player_hp.setRange(0, state["player_max_hp"])
+        self.player_hp.setValue(state["player_hp"])
+        self.player_hp.setFormat("HP %v/%m")
+        self.player_mp.setRange(0, state["player_max_mp"])
+        self.player_mp.setValue(state["player_mp"])
+        self.player_mp.setFormat("MP %v/%m")
+        if "spells" in delta:
+            self.spell_box.clear()
+            self.spell_box.addItems(list(state["spells"]))
+        self.update_buttons()
+
+    def update_buttons(self, busy=False):
+        finished = self.state.get("outcome") is not None
+        for button in self.action_buttons:
+            button.setEnabled(not busy and not finished and self.state.get("player_hp", 0) > 0)
+        self.next_button.setEnabled(not busy and finished and self.state.get("player_hp", 0) > 0)
+
+    @Slot(bool)
+    def set_busy(self, busy):
+        self.update_buttons(busy)
+
+    def tick(self):
+        """1フレーム分の描画（キャッシュ済みスプライトを上下に揺らすだけ）"""
+        self.frame += 1
+        if self.sprite is None:
+            return
+        offset = int(4 * math.sin(self.frame / 10))
+        self.sprite_label.setContentsMargins(0, 4 + offset, 0, 4 - offset)
+        if self._shown_sprite is not self.sprite:
+            self.sprite_label.setPixmap(self.sprite)
+            self._shown_sprite = self.sprite
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.thread.quit()
+        self.thread.wait()
+        super().closeEvent(event)
+
+
+def main(argv=None):
+    app = QApplication(argv if argv is not None else sys.argv)
+    window = BattleWindow(Sage("ゆうしゃ"))
+    window.resize(640, 720)
+    window.show()
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
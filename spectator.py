@@ -0,0 +1,298 @@
+"""注目のバトル（メタルキングスライムとの遭遇など）を大勢の観戦者に配信する
+
+バトルの出来事（メッセージと状態の差分）は BattleFeed で1回だけバイト列に符号化し、
+SpectatorHub が1つのイベントループから全観戦者へ同じバイト列を配る。
+
+観戦者ごとに上限付きのキューを持ち、溢れたときの扱いを選べる:
+    "skip"  たまっていた分を捨て、最新のキーフレーム（状態の全項目）から見直してもらう
+            （max_skips 回を超えたら切断する）
+    "drop"  切断する
+どちらの場合もバトルの側が観戦者を待つことはない。
+
+パケットの形式: 種別(B), 長さ(I), 本体（リトルエンディアン）
+    MESSAGE  表示するメッセージ（UTF-8）
+    STATE    battle_sync の差分フレーム
+    KEYFRAME battle_sync のキーフレーム
+    END      バトルの結果（UTF-8）
+"""
+import sys
+import random
+import struct
+import asyncio
+import argparse
+from collections import deque
+from battle_sync import BattleState, ClientState
+from simulator import SPECIES, POLICIES, make_sage
+from slime_battle import Battle
+
+DEFAULT_PORT = 9200
+
+MESSAGE, STATE, KEYFRAME, END = 1, 2, 3, 4
+PACKET_HEADER = struct.Struct("<BI")
+
+
+def encode_packet(kind, payload):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    return PACKET_HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_packet(reader):
+    """パケットを1つ読む（接続が閉じたら None）"""
+    try:
+        header = await reader.readexactly(PACKET_HEADER.size)
+        kind, length = PACKET_HEADER.unpack(header)
+        return kind, await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class Subscriber:
+    """1人の観戦者への送信待ちのパケット"""
+    __slots__ = ("pending", "wakeup", "closed", "skipped")
+
+    def __init__(self):
+        self.pending = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.skipped = 0
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+    async def next_packets(self):
+        """送るパケットがたまるまで待って、まとめて取り出す（閉じられて残りもなければ空のリスト）"""
+        while not self.pending and not self.closed:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+        packets = list(self.pending)
+        self.pending.clear()
+        return packets
+
+
+class SpectatorHub:
+    """パケットを全観戦者へ配る（イベントループのスレッドからだけ呼ぶ）"""
+
+    def __init__(self, queue_size=256, policy="skip", max_skips=None):
+        if policy not in ("skip", "drop"):
+            raise ValueError(f"未知の方針: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_skips = max_skips
+        self.subscribers = set()
+        self.keyframe = None  # 最新の状態のキーフレームのパケット
+        self.published = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        if self.keyframe is not None:
+            subscriber.pending.append(self.keyframe)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        subscriber.close()
+
+    def publish(self, packet, keyframe=None):
+        """パケットを全観戦者のキューに入れる
+
+        Args:
+            packet: 符号化済みのパケット（全員に同じオブジェクトを渡す）
+            keyframe: この出来事の後の状態のキーフレーム（あれば途中参加やスキップに使う）
+        """
+        if keyframe is not None:
+            self.keyframe = keyframe
+        self.published += 1
+        overflowed = []
+        for subscriber in self.subscribers:
+            pending = subscriber.pending
+            if len(pending) >= self.queue_size:
+                overflowed.append(subscriber)
+                continue
+            pending.append(packet)
+            subscriber.wakeup.set()
+        for subscriber in overflowed:
+            self._overflow(subscriber, packet)
+
+    def _overflow(self, subscriber, packet):
+        if self.policy == "drop" or (self.max_skips is not None and subscriber.skipped >= self.max_skips):
+            self.dropped += 1
+            subscriber.pending.clear()
+            self.unsubscribe(subscriber)
+            return
+        # 遅れている観戦者は途中の出来事を飛ばし、最新の状態から見直す
+        subscriber.skipped += 1
+        self.skipped += 1
+        subscriber.pending.clear()
+        if self.keyframe is not None and packet is not self.keyframe:
+            subscriber.pending.append(self.keyframe)
+        subscriber.pending.append(packet)
+        subscriber.wakeup.set()
+
+    def close(self):
+        """配信を終える（観戦者はたまっている分を受け取ってから切断される）"""
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {"subscribers": len(self.subscribers), "published": self.published,
+                "skipped": self.skipped, "dropped": self.dropped}
+
+
+class BattleFeed:
+    """Battle の出力先として渡し、出来事を1回だけ符号化して SpectatorHub へ送る
+
+    バトルを別のスレッドで動かす場合は loop にハブのイベントループを渡す
+    （符号化はバトルのスレッドで行い、ハブへの受け渡しだけをループに頼む）。
+    """
+
+    def __init__(self, hub, loop=None, output=None, keyframe_interval=30):
+        self.hub = hub
+        self.loop = loop
+        self.output = output
+        self.keyframe_interval = keyframe_interval
+        self.state = BattleState()
+        self._since_keyframe = 0
+
+    def _send(self, packet, keyframe=None):
+        if self.loop is None:
+            self.hub.publish(packet, keyframe)
+        else:
+            self.loop.call_soon_threadsafe(self.hub.publish, packet, keyframe)
+
+    def __call__(self, *args):
+        if self.output is not None:
+            self.output(*args)
+        self._send(encode_packet(MESSAGE, " ".join(str(arg) for arg in args)))
+
+    def update(self, battle):
+        """バトルの状態の変化を送る（ターンごとに呼ぶ）"""
+        base = self.state.version
+        if not self.state.capture(battle):
+            return
+        keyframe = encode_packet(KEYFRAME, self.state.keyframe())
+        if base == 0 or self._since_keyframe >= self.keyframe_interval:
+            self._since_keyframe = 0
+            self._send(keyframe, keyframe)
+        else:
+            self._since_keyframe += 1
+            self._send(encode_packet(STATE, self.state.delta(base)), keyframe)
+
+    def end(self, outcome):
+        self._send(encode_packet(END, outcome or ""))
+
+
+async def run_featured_battle(hub, species="MetalKingSlime", level=10, policy="attack", seed=None,
+                              turn_delay=0.5, max_turns=100, feed=None):
+    """注目のバトルを1回、このイベントループの上で配信しながら進める
+
+    feed: 配信に使う BattleFeed（省略時はこのループから直接ハブへ送るものを作る）
+    """
+    rng = random.Random(seed)
+    feed = feed if feed is not None else BattleFeed(hub)
+    battle = Battle(make_sage(level), test_mode=True, rng=rng, output=feed, enemies=[SPECIES[species]()])
+    battle.start_battle()
+    feed.update(battle)
+    choose = POLICIES[policy]
+    for _ in range(max_turns):
+        await asyncio.sleep(turn_delay)
+        continues = battle.play_turn(*choose(battle, rng))
+        feed.update(battle)
+        if not continues:
+            break
+    feed.end(battle.outcome or "timeout")
+    return battle.outcome
+
+
+async def handle_spectator(hub, reader, writer):
+    """1つの観戦者の接続にパケットを送り続ける"""
+    subscriber = hub.subscribe()
+    try:
+        while True:
+            packets = await subscriber.next_packets()
+            if not packets:
+                break
+            writer.write(b"".join(packets))
+            await writer.drain()  # この観戦者の送信だけが待つ（その間のパケットはキューにたまる）
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        hub.unsubscribe(subscriber)
+        writer.close()
+
+
+async def start_spectator_server(hub, host="127.0.0.1", port=DEFAULT_PORT):
+    return await asyncio.start_server(lambda reader, writer: handle_spectator(hub, reader, writer), host, port)
+
+
+async def watch(host, port, show=print):
+    """観戦者として接続し、メッセージを表示する
+
+    Returns:
+        最後に受け取った状態（ClientState）
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    state = ClientState()
+    try:
+        while True:
+            packet = await read_packet(reader)
+            if packet is None:
+                break
+            kind, payload = packet
+            if kind == MESSAGE:
+                show(payload.decode("utf-8"))
+            elif kind in (STATE, KEYFRAME):
+                if kind == KEYFRAME or state.version is not None:
+                    state.apply(payload)
+            elif kind == END:
+                show(f"-- 決着: {payload.decode('utf-8')} --")
+    finally:
+        writer.close()
+    return state
+
+
+async def serve(args):
+    hub = SpectatorHub(args.queue_size, args.policy, args.max_skips)
+    server = await start_spectator_server(hub, args.host, args.port)
+    print(f"{args.host}:{server.sockets[0].getsockname()[1]} で観戦を配信中")
+    async with server:
+        while True:
+            await run_featured_battle(hub, args.species, args.level, args.policy_name, turn_delay=args.turn_delay)
+            print(hub.stats())
+            await asyncio.sleep(args.turn_delay * 4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="注目のバトルを観戦者に配信する")
+    sub = parser.add_subparsers(dest="command", required=True)
+    server = sub.add_parser("serve", help="バトルを進めながら配信する")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=DEFAULT_PORT)
+    server.add_argument("--species", default="MetalKingSlime", choices=sorted(SPECIES))
+    server.add_argument("--level", type=int, default=10)
+    server.add_argument("--policy-name", default="attack", choices=sorted(POLICIES), help="賢者の行動方針")
+    server.add_argument("--turn-delay", type=float, default=0.5, help="ターンの間隔（秒）")
+    server.add_argument("--queue-size", type=int, default=256, help="観戦者ごとのキューの上限")
+    server.add_argument("--policy", default="skip", choices=("skip", "drop"), help="キューが溢れたときの扱い")
+    server.add_argument("--max-skips", type=int, default=None, help="これを超えてスキップした観戦者は切断する")
+    viewer = sub.add_parser("watch", help="観戦する")
+    viewer.add_argument("--host", default="127.0.0.1")
+    viewer.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args))
+        else:
+            asyncio.run(watch(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from simulator import BattleConfig, SimulationStats
+from adaptive import adaptive_sweep, interval_width, next_batch_size
+from sim_service import SimulationService
+
+TARGETS = {"win_rate": 0.02, "mean_turns": 0.05}
+
+
+class ConcurrencyExecutor(ThreadPoolExecutor):
+    """同時に実行されたジョブの最大数を数えるワーカープール"""
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+
+    def submit(self, function, *args, **kwargs):
+        def counted(*args, **kwargs):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                time.sleep(0.01)
+                return function(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.active -= 1
+        return super().submit(counted, *args, **kwargs)
+
+
+class TestAdaptiveStopping(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.configs = [BattleConfig("BaseSlime"), BattleConfig("MetalSlime"), BattleConfig("KingSlime")]
+
+    def test_stops_each_cell_at_target(self):
+        """条件ごとに目標の幅に達したところで止まり、難しい条件ほど多く実行するテスト"""
+        cells = adaptive_sweep(self.configs, TARGETS, batch_size=200)
+        for cell in cells.values():
+            self.assertTrue(cell.converged)
+            for metric, width in TARGETS.items():
+                self.assertLessEqual(interval_width(cell.stats, metric), width)
+        battles = {config.species: cell.stats.battles for config, cell in cells.items()}
+        self.assertLess(battles["BaseSlime"], battles["MetalSlime"])
+
+    def test_parallel_matches_sequential(self):
+        """並列に実行しても条件ごとの結果が変わらないテスト"""
+        sequential = adaptive_sweep(self.configs, TARGETS, batch_size=200)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            parallel = adaptive_sweep(self.configs, TARGETS, batch_size=200, executor=executor)
+        for config in self.configs:
+            self.assertEqual(parallel[config].stats, sequential[config].stats)
+
+    def test_parallel_shards_for_remaining_cell(self):
+        """収束していない条件が1つだけでも、そのシャードを複数のワーカーで同時に実行するテスト"""
+        configs = [BattleConfig("MetalSlime")]
+        sequential = adaptive_sweep(configs, TARGETS, batch_size=200)
+        with ConcurrencyExecutor(max_workers=4) as executor:
+            parallel = adaptive_sweep(configs, TARGETS, batch_size=200, executor=executor, workers=4)
+        self.assertGreater(executor.peak, 1)
+        self.assertEqual(parallel[configs[0]].stats, sequential[configs[0]].stats)
+
+    def test_max_battles_cap(self):
+        """上限に達したら収束していなくても打ち切るテスト"""
+        cells = adaptive_sweep([BattleConfig("MetalSlime")], {"win_rate": 0.0001}, batch_size=100, max_battles=300)
+        cell = cells[BattleConfig("MetalSlime")]
+        self.assertFalse(cell.converged)
+        self.assertEqual(cell.stats.battles, 300)
+
+    def test_next_batch_size(self):
+        """目標から遠いほど多くのバトルを割り当てるテスト"""
+        stats = SimulationStats(battles=100, win=50, turns=200, turns_sq=400)
+        far = next_batch_size(stats, {"win_rate": 0.02}, 0.95, 10, 10**6)
+        near = next_batch_size(stats, {"win_rate": 0.15}, 0.95, 10, 10**6)
+        self.assertGreater(far, near)
+        self.assertEqual(next_batch_size(stats, {"win_rate": 0.02}, 0.95, 10, 150), 50)
+
+    def test_invalid_targets(self):
+        """未知の指標や正でない幅は受け付けないテスト"""
+        with self.assertRaises(ValueError):
+            adaptive_sweep(self.configs, {"gold": 1.0})
+        with self.assertRaises(ValueError):
+            adaptive_sweep(self.configs, {"win_rate": 0})
+
+    def test_service_target_query(self):
+        """サービスの問い合わせで目標の幅を指定できるテスト"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            service = SimulationService(executor)
+            response = service.query({"species": "MetalSlime", "target": {"win_rate": 0.03}})
+            self.assertTrue(response["result"]["converged"])
+            low, high = response["result"]["win_rate_interval"]
+            self.assertLessEqual(high - low, 0.03)
+            self.assertEqual(response["battles"], response["result"]["battles"])
+            self.assertTrue(service.query({"species": "MetalSlime", "target": {"win_rate": 0.03}})["cached"])
+
+
+if __name__ == '__main__':
+    unittest.main()
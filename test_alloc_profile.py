@@ -0,0 +1,64 @@
+import random
+import unittest
+from slime_battle import Battle
+from simulator import BattleConfig, run_battle
+from alloc_profile import AllocationProfiler, MemoryBudgetExceeded, grind
+
+_leaked = []
+
+class LeakyBattle(Battle):
+    """終わったバトルを手放さない（リークの再現用）"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _leaked.append(self)
+
+class TestAllocationProfiler(unittest.TestCase):
+    def tearDown(self):
+        _leaked.clear()
+
+    def test_session_within_budget(self):
+        """長いセッションが予算内に収まり、局面ごとに集計されるテスト"""
+        profiler = AllocationProfiler(per_turn=64 * 1024, per_battle=16 * 1024, census_every=50)
+        with profiler:
+            grind(profiler, 200)
+        result = profiler.report()
+        self.assertEqual(result["battles"], 200)
+        self.assertEqual(result["violations"], [])
+        self.assertEqual(result["phases"]["encounter"]["calls"], 200)
+        self.assertGreaterEqual(result["phases"]["player"]["calls"], result["turns"])
+        self.assertGreater(result["phases"]["enemy"]["calls"], 0)
+        self.assertEqual(result["type_growth"], {})
+
+    def test_turn_budget(self):
+        """1ターンの予算を超えると記録され、strict なら例外になるテスト"""
+        profiler = AllocationProfiler(per_turn=1, warmup=0)
+        with profiler:
+            grind(profiler, 5)
+        self.assertTrue(any(violation["kind"] == "turn" for violation in profiler.violations))
+        profiler = AllocationProfiler(per_turn=1, warmup=0, strict=True)
+        with self.assertRaises(MemoryBudgetExceeded):
+            with profiler:
+                grind(profiler, 5)
+
+    def test_leak_detected(self):
+        """終わったバトルが残り続けると、バトルの予算超過と増え続ける型で見つかるテスト"""
+        profiler = AllocationProfiler(per_battle=512, census_every=20)
+        with profiler:
+            grind(profiler, 100, base=LeakyBattle)
+        self.assertTrue(any(violation["kind"] == "battle" for violation in profiler.violations))
+        self.assertGreater(profiler.type_growth().get("KingSlime", 0), 0)
+
+    def test_headless_battles(self):
+        """play_turn で進めるシミュレーションでも局面を集計できるテスト"""
+        profiler = AllocationProfiler()
+        battle_class = profiler.battle_class()
+        rng = random.Random(0)
+        with profiler:
+            for _ in range(50):
+                run_battle(BattleConfig("PoisonSlime", 3), rng, battle_class=battle_class)
+        self.assertEqual(profiler.battles, 50)
+        self.assertEqual(profiler.phases["player"].calls, profiler.turns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from slime import KingSlime, MetalKingSlime
+from slime_battle import Battle
+from simulator import BattleConfig, make_sage, run_battle
+from sim_service import SimulationService
+from balance import DEFAULT_BALANCE, BalanceError, BalanceStore
+
+def _discard(*args, **kwargs):
+    pass
+
+class TestBalanceTables(unittest.TestCase):
+    def test_defaults_match_code(self):
+        """既定の表がコードに書かれた能力値・逃走確率と一致するテスト"""
+        enemy = DEFAULT_BALANCE.make_enemy("KingSlime")
+        self.assertEqual((enemy.hp, enemy.max_hp, enemy.attack), (30, 30, 15))
+        self.assertEqual(DEFAULT_BALANCE.escape_chance(MetalKingSlime()), 0.9)
+        self.assertEqual(DEFAULT_BALANCE.escape_chance(KingSlime()), 0.0)
+        self.assertEqual(DEFAULT_BALANCE.player_escape_chance, 0.5)
+        self.assertEqual(DEFAULT_BALANCE.spell_costs["メラ"], 5)
+
+    def test_overrides_copy_on_write(self):
+        """差分を当てると新しい表ができ、元の表は変わらず、触れていない部分は共有されるテスト"""
+        tables = DEFAULT_BALANCE.with_overrides({"species": {"KingSlime": {"hp": 40}},
+                                                 "spells": {"メラ": {"cost": 3}}}, version=1)
+        self.assertEqual(tables.make_enemy("KingSlime").max_hp, 40)
+        self.assertEqual(tables.species["KingSlime"]["attack"], 15)
+        self.assertEqual(DEFAULT_BALANCE.species["KingSlime"]["hp"], 30)
+        self.assertIs(tables.species["MetalSlime"], DEFAULT_BALANCE.species["MetalSlime"])
+        self.assertNotEqual(tables.digest, DEFAULT_BALANCE.digest)
+        with self.assertRaises(TypeError):
+            tables.spell_costs["メラ"] = 1
+
+    def test_overrides_from(self):
+        """2つの表の差分を求めると、変わった値だけが入り、当て直すと同じ表になるテスト"""
+        overrides = {"species": {"KingSlime": {"hp": 40}}, "spells": {"メラ": {"cost": 3}},
+                     "escape": {"player": 0.25}}
+        tables = DEFAULT_BALANCE.with_overrides(overrides, version=1)
+        self.assertEqual(tables.overrides_from(DEFAULT_BALANCE), overrides)
+        self.assertEqual(DEFAULT_BALANCE.with_overrides(tables.overrides_from(DEFAULT_BALANCE), 2).digest,
+                         tables.digest)
+        self.assertEqual(DEFAULT_BALANCE.overrides_from(DEFAULT_BALANCE), {})
+
+    def test_invalid_overrides(self):
+        """未知の項目や範囲外の値は受け付けないテスト"""
+        for overrides in ({"species": {"Dragon": {"hp": 1}}}, {"species": {"KingSlime": {"hp": 0}}},
+                          {"spells": {"メラ": {"heal": 10}}}, {"escape": {"MetalSlime": 1.5}},
+                          {"items": {}}, [], {"species": []}, {"species": {"KingSlime": 5}}, {"escape": [1]},
+                          {"spells": {"メラ": None}}):
+            with self.assertRaises(BalanceError):
+                DEFAULT_BALANCE.with_overrides(overrides, version=1)
+
+    def test_pickle(self):
+        """ワーカーに渡せるよう pickle で同じ内容の表に戻せるテスト"""
+        tables = DEFAULT_BALANCE.with_overrides({"escape": {"player": 0.25}}, version=3)
+        restored = pickle.loads(pickle.dumps(tables))
+        self.assertEqual((restored.digest, restored.version), (tables.digest, 3))
+
+    def test_battle_uses_snapshot(self):
+        """バトルが渡された表の逃走確率・消費MPを使うテスト"""
+        tables = DEFAULT_BALANCE.with_overrides({"escape": {"MetalSlime": 0.0},
+                                                 "species": {"KingSlime": {"hp": 1000}},
+                                                 "spells": {"メラ": {"cost": 1}}}, version=1)
+        config = BattleConfig("MetalSlime")
+        outcomes = {run_battle(config, random.Random(seed), balance=tables)[0] for seed in range(20)}
+        self.assertNotIn("enemy_escape", outcomes)
+        sage = make_sage(1)
+        battle = Battle(sage, test_mode=True, rng=random.Random(0), output=_discard,
+                        enemies=[tables.make_enemy("KingSlime")], balance=tables)
+        battle.current_enemy = battle.enemies[0]
+        battle.cast_selected_spell("メラ")
+        self.assertEqual(sage.mp, sage.max_mp - 1)
+
+
+class TestBalanceStore(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "balance.json")
+        self.write({"species": {"KingSlime": {"hp": 40}}})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data, ensure_ascii=False))
+        # 書き込みが同じ時刻に収まっても変更として見えるようにする
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_in_flight_battle_keeps_version(self):
+        """表が変わっても進行中のバトルは開始時の表のまま、次のバトルから新しい表になるテスト"""
+        store = BalanceStore(self.path)
+        battle = Battle(make_sage(1), test_mode=True, output=_discard, balance=store.current())
+        self.write({"species": {"KingSlime": {"hp": 50}}})
+        self.assertTrue(store.check())
+        self.assertEqual(battle.balance.species["KingSlime"]["hp"], 40)
+        king = next(enemy for enemy in battle.enemies if isinstance(enemy, KingSlime))
+        self.assertEqual(king.hp, 40)
+        self.assertEqual(Battle(make_sage(1), balance=store.current()).balance.species["KingSlime"]["hp"], 50)
+        self.assertEqual(store.current().version, 2)
+        self.assertFalse(store.check())  # 変わっていなければ読み直さない
+
+    def test_broken_file_keeps_previous(self):
+        """壊れたファイルを書いても前の表を使い続けるテスト"""
+        store = BalanceStore(self.path)
+        before = store.current()
+        self.write("{ broken")
+        self.assertFalse(store.check())
+        self.assertIs(store.current(), before)
+        self.assertIsNotNone(store.last_error)
+        self.write({"species": {"KingSlime": {"hp": -1}}})
+        self.assertFalse(store.check())
+        self.assertIsInstance(store.last_error, BalanceError)
+        self.assertIs(store.current(), before)
+        self.write({"species": {"KingSlime": 5}})
+        self.assertFalse(store.check())
+        self.assertIsInstance(store.last_error, BalanceError)
+        self.assertIs(store.current(), before)
+
+    def test_watcher_picks_up_change(self):
+        """監視スレッドがファイルの変更を取り込むテスト"""
+        store = BalanceStore(self.path)
+        store.watch(interval=0.01)
+        try:
+            self.write({"escape": {"player": 0.9}})
+            deadline = time.monotonic() + 5
+            while store.current().player_escape_chance != 0.9 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            store.stop()
+        self.assertEqual(store.current().player_escape_chance, 0.9)
+
+    def test_service_uses_current_tables(self):
+        """サービスが問い合わせ時点の表で答え、表が変われば前の結果をキャッシュから使わないテスト"""
+        store = BalanceStore(self.path)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            service = SimulationService(executor, balance=store)
+            request = {"species": "MetalSlime", "battles": 200}
+            first = service.query(request)
+            self.assertTrue(service.query(request)["cached"])
+            self.write({"escape": {"MetalSlime": 0.0}})
+            store.check()
+            second = service.query(request)
+        self.assertFalse(second["cached"])
+        self.assertEqual(second["balance_version"], first["balance_version"] + 1)
+        self.assertEqual(second["result"]["enemy_escape"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
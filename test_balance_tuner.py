@@ -0,0 +1,71 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from simulator import BattleConfig, simulate
+from balance import DEFAULT_BALANCE
+from balance_tuner import BalanceTuner, Target, run_chunk
+
+KING_TARGETS = ("KingSlime:5:lose_rate=0.2±0.05", "KingSlime:5:mean_turns=6+-2")
+
+class TestTarget(unittest.TestCase):
+    def test_parse(self):
+        """目標の文字列を読み、形式が不正なら ValueError になるテスト"""
+        target = Target.parse("KingSlime:5:lose_rate=0.2±0.05")
+        self.assertEqual((target.config, target.metric, target.value, target.tolerance),
+                         (BattleConfig("KingSlime", 5), "lose_rate", 0.2, 0.05))
+        for text in ("KingSlime:5:lose_rate=0.2", "KingSlime:five:lose_rate=0.2±0.05",
+                     "KingSlime:5:gold=1±1", "Dragon:5:lose_rate=0.2±0.05"):
+            with self.assertRaises(ValueError):
+                Target.parse(text)
+
+
+class TestBalanceTuner(unittest.TestCase):
+    def test_common_random_numbers(self):
+        """同じ番号のバトルは候補によらず同じ乱数を使い、分けて実行しても同じ集計になるテスト"""
+        config = BattleConfig("KingSlime", 5).to_dict()
+        whole = run_chunk(config, {}, 7, 0, 200, 100)
+        halves = [run_chunk(config, {}, 7, start, 100, 100) for start in (0, 100)]
+        self.assertEqual(whole["win"], halves[0]["win"] + halves[1]["win"])
+        self.assertEqual(whole, run_chunk(config, {"species": {}}, 7, 0, 200, 100))
+
+    def test_converges_to_targets(self):
+        """キングスライムの能力値を目標の負け率・ターン数に合わせ、結果の表で再現できるテスト"""
+        targets = [Target.parse(text) for text in KING_TARGETS]
+        tuner = BalanceTuner(targets, battles=400, seed=0)
+        result = tuner.tune(max_evaluations=150)
+        self.assertTrue(result.converged)
+        self.assertLessEqual(result.evaluations, 150)
+        self.assertEqual(result.battles, result.evaluations * 400)
+        tables = DEFAULT_BALANCE.with_overrides(result.overrides, version=1)
+        stats = simulate(BattleConfig("KingSlime", 5), 4000, seed=3, balance=tables)
+        self.assertAlmostEqual(stats.lose / stats.battles, 0.2, delta=0.08)
+
+    def test_parallel_matches_serial(self):
+        """ワーカーで並列に評価しても順に評価したときと同じ結果になるテスト"""
+        targets = [Target.parse(text) for text in KING_TARGETS]
+        serial = BalanceTuner(targets, battles=200, chunk_size=50).tune(max_evaluations=30)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            parallel = BalanceTuner(targets, battles=200, chunk_size=50, executor=executor).tune(max_evaluations=30)
+        self.assertEqual(parallel.overrides, serial.overrides)
+        self.assertEqual(parallel.evaluations, serial.evaluations)
+
+    def test_base_overrides_kept(self):
+        """base の表で調整しない値も候補のバトルに使われ、結果の差分にも残るテスト"""
+        base = DEFAULT_BALANCE.with_overrides({"species": {"KingSlime": {"attack": 40}}}, version=1)
+        targets = [Target.parse("KingSlime:5:lose_rate=0.5±0.1")]
+        tuner = BalanceTuner(targets, parameters=[("KingSlime", "hp")], base=base, battles=200)
+        result = tuner.tune(max_evaluations=20)
+        self.assertEqual(result.overrides["species"]["KingSlime"]["attack"], 40)
+        self.assertIn("hp", result.overrides["species"]["KingSlime"])
+        self.assertGreater(result.measured[targets[0].config].lose, 0)
+        tables = DEFAULT_BALANCE.with_overrides(result.overrides, version=2)
+        stats = simulate(BattleConfig("KingSlime", 5), 200, seed=0, balance=tables)
+        self.assertGreater(stats.lose, 0)
+
+    def test_unknown_parameter(self):
+        """表にない能力値を調整しようとすると ValueError になるテスト"""
+        with self.assertRaises(ValueError):
+            BalanceTuner([Target.parse(KING_TARGETS[0])], parameters=[("KingSlime", "speed")])
+
+
+if __name__ == '__main__':
+    unittest.main()
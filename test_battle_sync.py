@@ -0,0 +1,109 @@
+import random
+import unittest
+from simulator import make_sage
+from slime import KingSlime, PoisonSlime
+from slime_battle import Battle
+from battle_sync import (BattleState, ClientSession, ClientState, SyncError, decode_frame, encode_frame,
+                         status_payload, ALL_FIELDS, FIELD_NAMES)
+
+def _discard(*args, **kwargs):
+    pass
+
+class TestBattleSync(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.enemy = KingSlime()
+        self.battle = Battle(make_sage(5), test_mode=True, rng=random.Random(1), output=_discard,
+                             enemies=[self.enemy])
+        self.battle.current_enemy = self.enemy
+        self.state = BattleState()
+        self.state.capture(self.battle)
+
+    def test_round_trip(self):
+        """キーフレームを戻すと全項目が元の値になるテスト"""
+        values = list(self.state.values)
+        values[FIELD_NAMES.index("player_hp")] = -3   # 負の整数
+        values[FIELD_NAMES.index("outcome")] = None
+        frame = decode_frame(encode_frame(True, 7, 0, ALL_FIELDS, values))
+        self.assertTrue(frame.keyframe)
+        self.assertEqual(frame.version, 7)
+        self.assertEqual(list(frame.fields.values()), values)
+
+    def test_delta_contains_only_changed_fields(self):
+        """差分には確認済みの版より後に変わった項目だけが入るテスト"""
+        base = self.state.version
+        self.battle.play_turn(1)
+        self.assertNotEqual(self.state.capture(self.battle), 0)
+        self.assertEqual(self.state.version, base + 1)
+        frame = decode_frame(self.state.delta(base))
+        self.assertEqual(frame.base, base)
+        self.assertIn("turn", frame.fields)
+        self.assertNotIn("player_name", frame.fields)
+        self.assertNotIn("player_spells", frame.fields)
+        self.assertLess(len(self.state.delta(base)), len(self.state.keyframe()))
+        self.assertLess(len(self.state.keyframe()), len(status_payload(self.battle)))
+
+    def test_no_change_keeps_version(self):
+        """値が変わらなければ版が進まず、送るフレームもないテスト"""
+        session = ClientSession(self.state)
+        session.ack(self.state.version)
+        self.assertEqual(self.state.capture(self.battle), 0)
+        self.assertIsNone(session.next_frame())
+
+    def test_client_follows_server(self):
+        """確認の遅れや取りこぼしがあってもクライアントがサーバーの状態に追いつくテスト"""
+        self.battle.enemies = [PoisonSlime()]
+        self.battle.current_enemy = self.battle.enemies[0]
+        session = ClientSession(self.state, keyframe_interval=4)
+        client = ClientState()
+        frames = 0
+        for turn in range(30):
+            if not self.battle.play_turn(1 if turn % 3 else 2, "ホイミ"):
+                break
+            self.state.capture(self.battle)
+            frame = session.next_frame()
+            if frame is None or turn % 5 == 4:
+                continue  # 取りこぼし
+            client.apply(frame)
+            frames += 1
+            if turn % 2:
+                session.ack(client.version)  # 確認は1つおきにしか届かない
+        self.assertGreater(frames, 0)
+        session.ack(client.version)
+        frame = session.next_frame()
+        if frame is not None:
+            client.apply(frame)
+        self.assertEqual(client.version, self.state.version)
+        self.assertEqual(client.fields, self.state.snapshot())
+
+    def test_periodic_keyframe(self):
+        """keyframe_interval 回ごとにキーフレームを送るテスト"""
+        session = ClientSession(self.state, keyframe_interval=2)
+        kinds = []
+        for _ in range(6):
+            self.battle.turn_count += 1
+            self.state.capture(self.battle)
+            kinds.append(decode_frame(session.next_frame()).keyframe)
+            session.ack(self.state.version)
+        self.assertEqual(kinds, [True, False, False, True, False, False])
+
+    def test_frames_shared_between_clients(self):
+        """同じ版にいるクライアントには同じフレームを1回だけ作って渡すテスト"""
+        first, second = ClientSession(self.state), ClientSession(self.state)
+        for session in (first, second):
+            session.ack(self.state.version)
+        self.battle.turn_count += 1
+        self.state.capture(self.battle)
+        self.assertIs(first.next_frame(), second.next_frame())
+
+    def test_unusable_delta(self):
+        """基準の版を持っていない差分や壊れたフレームは当てられないテスト"""
+        client = ClientState()
+        with self.assertRaises(SyncError):
+            client.apply(self.state.delta(0))
+        with self.assertRaises(SyncError):
+            client.apply(self.state.keyframe()[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import math
+import random
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import hero
+from campaign import EncounterTables, run_campaign, run_session, _bucket, _bucket_values, FULL, LOW_HP_SAMPLES
+
+
+class TestBuckets(unittest.TestCase):
+    def test_bucket_values(self):
+        """区間の最小・最大の値の間の値がすべてその区間に入り、満タンは別の区間になるテスト"""
+        for maximum in (7, 40, 230):
+            self.assertEqual(_bucket(maximum, maximum, 1.25), FULL)
+            self.assertEqual(_bucket_values(FULL, maximum, 1.25, 0), (maximum, maximum))
+            for value in range(0, maximum):
+                bucket = _bucket(value, maximum, 1.25)
+                low, high = _bucket_values(bucket, maximum, 1.25, 0)
+                self.assertLessEqual(low, value)
+                self.assertLessEqual(value, high)
+                self.assertEqual({_bucket(number, maximum, 1.25) for number in range(low, high + 1)}, {bucket})
+                self.assertNotEqual(_bucket(high + 1, maximum, 1.25), bucket)
+
+
+class TestCampaign(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.options = {"policy": "spell", "samples": 16}
+
+    def test_deterministic(self):
+        """同じシードなら同じセッションになり、表を使い回しても結果が変わらないテスト"""
+        first, tables = run_campaign(20, 40, seed=3, **self.options)
+        second, _ = run_campaign(20, 40, seed=3, **self.options)
+        self.assertEqual(first.sessions, second.sessions)
+        battles = tables.battles_run
+        again, _ = run_campaign(20, 40, tables, seed=3)
+        self.assertEqual(again.sessions, first.sessions)
+        self.assertEqual(tables.battles_run, battles)
+
+    def test_level_curve(self):
+        """レベルの推移が遭遇回数の区切りごとに記録され、減らないテスト"""
+        result, _ = run_campaign(30, 60, checkpoint_every=10, **self.options)
+        for session in result.sessions:
+            self.assertEqual(len(session.levels), 6)
+            self.assertEqual(session.levels, sorted(session.levels))
+        curve = result.level_curve()
+        self.assertEqual([point[0] for point in curve], [10, 20, 30, 40, 50, 60])
+        self.assertGreater(curve[-1][2], curve[0][2])
+        self.assertEqual(sum(result.death_points().values()), result.summary()["deaths"])
+
+    def test_close_to_exact_replay(self):
+        """表を引いたセッションの集計（倒れた数も含む）が、バトルを実際に再生したセッションの集計に近いテスト"""
+        sessions = 300
+        table, tables = run_campaign(sessions, 200, seed=1, **dict(self.options, samples=32))
+        exact, _ = run_campaign(sessions, 200, tables, seed=1, exact=True)
+        self.assertAlmostEqual(table.summary()["mean_final_level"], exact.summary()["mean_final_level"], delta=0.3)
+        self.assertAlmostEqual(table.gold_distribution()["total"][0] / exact.gold_distribution()["total"][0], 1,
+                               delta=0.05)
+        # 倒れた割合の差が99%の信頼区間に収まる（どちらも sessions 回の標本なので差の分散は2倍）
+        rate = exact.summary()["deaths"] / sessions
+        self.assertGreater(rate, 0)
+        width = 2.576 * math.sqrt(2 * rate * (1 - rate) / sessions)
+        self.assertAlmostEqual(table.summary()["deaths"] / sessions, rate, delta=width)
+        self.assertLess(tables.battles_run, sessions * 200)
+
+    def test_save_and_load(self):
+        """保存した表を読み込むと同じ結果になり、作り方や呪文の属性が違う表は読まないテスト"""
+        tables = EncounterTables(**self.options)
+        run_session(tables, 30, random.Random(0))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tables.json")
+            tables.save(path)
+            loaded = EncounterTables(**self.options)
+            self.assertTrue(loaded.load(path))
+            self.assertEqual(len(loaded), len(tables))
+            self.assertEqual(run_session(loaded, 30, random.Random(0)), run_session(tables, 30, random.Random(0)))
+            self.assertEqual(loaded.battles_run, 0)
+            self.assertFalse(EncounterTables("attack", samples=16).load(path))
+            with mock.patch.dict(hero.SPELL_ELEMENTS, {"メラ": "水"}):
+                self.assertFalse(EncounterTables(**self.options).load(path))
+
+    def test_precompute(self):
+        """まとめて作った表がセッション中に作る行と同じになり、並列に作っても変わらないテスト"""
+        lazy = EncounterTables(**self.options)
+        run_session(lazy, 10, random.Random(2))
+        eager = EncounterTables(**self.options)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            eager.precompute([1, 2], species=["BaseSlime", "PoisonSlime"], executor=executor)
+        self.assertEqual(eager.battles_run, sum(len(eager.outcomes(key)) for key in eager._rows))
+        self.assertEqual({len(eager.outcomes(key)) for key in eager._rows}, {16, 16 * LOW_HP_SAMPLES})
+        for key in lazy._rows:
+            if key[0] <= 2 and key[1] in ("BaseSlime", "PoisonSlime"):
+                self.assertEqual(eager.outcomes(key), lazy.outcomes(key))
+        with self.assertRaises(ValueError):
+            EncounterTables("unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import json
+import random
+import tempfile
+import unittest
+from hero import Sage
+from slime import EnemyCharacter, KingSlime, PoisonSlime
+from slime_battle import Battle, SlimeArt
+from content_pack import (ContentPack, ContentPackError, builtin_source, compile_catalog,
+                          compile_pack, merge_sources)
+
+class TestContentPack(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = os.path.join(self.tmp.name, "builtin.slpk")
+        compile_catalog(merge_sources([builtin_source()]), self.bundle, pack_name="builtin")
+        self.pack = ContentPack(self.bundle)
+
+    def tearDown(self):
+        self.pack.close()
+        self.tmp.cleanup()
+
+    def test_lookup_by_name(self):
+        """名前でスライムを取り出すテスト"""
+        king = self.pack.get("species", "キングスライム")
+        self.assertEqual(king["hp"], KingSlime().hp)
+        self.assertIsNone(self.pack.get("species", "ドラゴン"))
+
+    def test_lookup_by_index(self):
+        """タイプ・弱点・耐性の索引で検索するテスト"""
+        self.assertEqual(len(self.pack.species_by_type("スライム系")), 6)
+        self.assertEqual(len(self.pack.species_by_weakness("火")), 6)
+        self.assertEqual(len(self.pack.species_by_resistance("水")), 6)
+        fire_spells = [spell["name"] for spell in self.pack.find("spells", "element", "火")]
+        self.assertEqual(sorted(fire_spells), sorted(["メラ", "メラミ", "メラゾーマ"]))
+
+    def test_make_enemy_keeps_behavior(self):
+        """パックから作った敵が元のクラスの特性を持つテスト"""
+        poison = self.pack.make_enemy("ポイズンスライム")
+        self.assertIsInstance(poison, PoisonSlime)
+        self.assertEqual(poison.special_ability, "毒攻撃")
+        self.assertEqual(poison.hp, poison.max_hp)
+        self.assertEqual(SlimeArt.get_slime_art(poison), SlimeArt.get_slime_art(PoisonSlime()))
+
+    def test_enemy_character_base(self):
+        """base に EnemyCharacter を指定した敵が作れて、バトルで表示・攻撃できるテスト"""
+        source = {"species": [{"name": "ゴーレム", "base": "EnemyCharacter", "hp": 30, "attack": 9, "defense": 6,
+                               "exp": 10, "gold": 5, "color": "灰"}]}
+        path = os.path.join(self.tmp.name, "golem.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(source, f, ensure_ascii=False)
+        bundle = os.path.join(self.tmp.name, "golem.slpk")
+        compile_pack([path], bundle)
+        with ContentPack(bundle) as pack:
+            golem = pack.make_enemy("ゴーレム")
+        self.assertIsInstance(golem, EnemyCharacter)
+        self.assertEqual((golem.color, golem.special_ability, golem.max_hp), ("灰", None, 30))
+        output = []
+        battle = Battle(Sage("テスト"), test_mode=True, rng=random.Random(0), output=output.append,
+                        enemies=[golem])
+        battle.start_battle()
+        while battle.play_turn(1):
+            pass
+        self.assertIsNotNone(battle.outcome)
+
+    def test_make_equipment(self):
+        """パックから装備を作るテスト"""
+        staff = self.pack.make_equipment("破壊神の杖")
+        self.assertEqual(staff.equipment_type, "武器")
+        self.assertEqual(staff.stats["magic_attack"], 100)
+
+    def test_records_decoded_lazily(self):
+        """開いた直後はレコードをデコードしていないテスト"""
+        with ContentPack(self.bundle) as pack:
+            self.assertEqual(pack._decoded, {})
+            pack.get("spells", "ホイミ")
+            self.assertEqual(len(pack._decoded), 1)
+
+    def test_large_catalog(self):
+        """大量のモンスターを含むパックを検索するテスト"""
+        source = {"species": [{"name": f"スライム{i:05d}", "type": f"系統{i % 7}", "hp": i % 50 + 1,
+                               "attack": 5, "defense": 3, "exp": 1, "gold": 1,
+                               "weakness": "火" if i % 2 else "氷"} for i in range(5000)]}
+        path = os.path.join(self.tmp.name, "mod.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(source, f, ensure_ascii=False)
+        bundle = os.path.join(self.tmp.name, "mod.slpk")
+        compile_pack([path], bundle)
+        with ContentPack(bundle) as pack:
+            self.assertEqual(pack.count("species"), 5000)
+            self.assertEqual(pack.get("species", "スライム04321")["hp"], 4321 % 50 + 1)
+            self.assertEqual(len(pack.species_by_type("系統3")), len(range(3, 5000, 7)))
+            self.assertEqual(len(pack.species_by_weakness("氷")), 2500)
+
+    def test_toml_source(self):
+        """TOMLのソースをコンパイルするテスト"""
+        path = os.path.join(self.tmp.name, "mod.toml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('[[species]]\nname = "バブルスライム"\nbase = "PoisonSlime"\n'
+                    'hp = 12\nattack = 7\ndefense = 4\nexp = 4\ngold = 3\n')
+        bundle = os.path.join(self.tmp.name, "toml.slpk")
+        try:
+            compile_pack([path], bundle)
+        except ContentPackError:
+            self.skipTest("TOMLの読み込みには Python 3.11 以降が必要")
+        with ContentPack(bundle) as pack:
+            self.assertEqual(pack.make_enemy("バブルスライム").max_hp, 12)
+
+    def test_invalid_entries_rejected(self):
+        """不正なステータスや形式を拒否するテスト"""
+        bad = {"species": [{"name": "壊れたスライム", "hp": -1, "attack": 1, "defense": 1, "exp": 0, "gold": 0}]}
+        with self.assertRaises(ContentPackError):
+            compile_catalog(merge_sources([bad]), os.path.join(self.tmp.name, "bad.slpk"))
+        not_pack = os.path.join(self.tmp.name, "not_pack.slpk")
+        with open(not_pack, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ContentPackError):
+            ContentPack(not_pack)
+
+if __name__ == '__main__':
+    unittest.main()
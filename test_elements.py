@@ -0,0 +1,97 @@
+import random
+import unittest
+from slime import BaseSlime, KingSlime
+from hero import Sage, SPELL_DAMAGE
+from slime_battle import Battle
+from elements import ElementTable, NEUTRAL
+from hero import ELEMENT_TABLE
+
+class TestElementTable(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.table = ElementTable(elements=["火", "水"], affinities=[("火", "水")])
+
+    def test_interned_ids(self):
+        """属性と相性が小さな整数に置き換えられるテスト"""
+        self.assertEqual(self.table.element_id(NEUTRAL), 0)
+        self.assertEqual(self.table.element_id(None), 0)
+        self.assertEqual(self.table.element_id("火"), 1)
+        self.assertEqual(self.table.affinity_id(None, None), 0)
+        self.assertEqual(self.table.affinity_id("火", "水"), 1)
+
+    def test_multipliers(self):
+        """弱点は2倍、耐性は半分、無属性は等倍のテスト"""
+        slime = self.table.affinity_id("火", "水")
+        self.assertEqual(self.table.multiplier(self.table.element_id("火"), slime), 2.0)
+        self.assertEqual(self.table.multiplier(self.table.element_id("水"), slime), 0.5)
+        self.assertEqual(self.table.multiplier(self.table.element_id(NEUTRAL), slime), 1.0)
+
+    def test_new_entries_extend_matrix(self):
+        """後から登録した属性・相性でも倍率が引けるテスト"""
+        ice_weak = self.table.affinity_id("氷", None)
+        self.assertEqual(self.table.multiplier(self.table.element_id("氷"), ice_weak), 2.0)
+        self.assertEqual(self.table.multiplier(self.table.element_id("火"), ice_weak), 1.0)
+
+    def test_frozen_table_is_not_extended(self):
+        """固定した表は未知の名前で行・列が増えず、倍率は計算して返し、copy() すれば登録できるテスト"""
+        table = ElementTable(elements=["火"], affinities=[("火", "水")], frozen=True)
+        ice_weak = BaseSlime()
+        ice_weak.weakness, ice_weak.resistance = "氷", None
+        self.assertEqual(table.multiplier_for("氷", ice_weak), 2.0)
+        self.assertEqual(table.multiplier_for("火", ice_weak), 1.0)
+        self.assertEqual(table.multiplier_for("火", BaseSlime()), 2.0)
+        with self.assertRaises(KeyError):
+            table.element_id("氷")
+        with self.assertRaises(KeyError):
+            table.affinity_id("氷", None)
+        self.assertEqual((table.element_names, table.affinities), (["無", "火"], [(None, None), ("火", "水")]))
+        extended = table.copy()
+        self.assertEqual(extended.multiplier(extended.element_id("氷"), extended.affinity_id("氷", None)), 2.0)
+        self.assertEqual(len(table.element_names), 2)
+
+    def test_batch_damage_matches_single(self):
+        """一括計算が1件ずつの計算と一致するテスト"""
+        rng = random.Random(0)
+        bases = [rng.randint(1, 200) for _ in range(100)]
+        element_ids = [rng.randrange(3) for _ in range(100)]
+        affinity_ids = [rng.randrange(2) for _ in range(100)]
+        expected = [max(1, int(base * self.table.multiplier(e, a)))
+                    for base, e, a in zip(bases, element_ids, affinity_ids)]
+        self.assertEqual(self.table.batch_damage(bases, element_ids, affinity_ids), expected)
+
+class TestElementalBattle(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.player = Sage("テストプレイヤー")
+        self.battle = Battle(self.player, test_mode=True, rng=random.Random(0), output=lambda text: None)
+
+    def test_shared_table_unchanged_by_new_affinity(self):
+        """標準に無い弱点の敵と戦っても、共有の属性倍率表が変わらないテスト"""
+        before = (list(ELEMENT_TABLE.element_names), list(ELEMENT_TABLE.affinities))
+        enemy = BaseSlime()
+        enemy.weakness, enemy.resistance = "氷", "火"
+        enemy.hp = enemy.max_hp = 100
+        self.battle.current_enemy = enemy
+        self.battle.cast_selected_spell("メラ")
+        self.assertEqual(enemy.hp, 100 - SPELL_DAMAGE["メラ"] // 2)
+        self.assertEqual((ELEMENT_TABLE.element_names, ELEMENT_TABLE.affinities), before)
+
+    def test_spell_damage_applied_once(self):
+        """弱点の攻撃呪文のダメージが1回だけ与えられるテスト"""
+        enemy = KingSlime()
+        enemy.hp = enemy.max_hp = 100
+        self.battle.current_enemy = enemy
+        self.battle.cast_selected_spell("メラ")
+        self.assertEqual(enemy.hp, enemy.max_hp - SPELL_DAMAGE["メラ"] * 2)
+
+    def test_resisted_element_halved(self):
+        """耐性のある属性はダメージが半分になるテスト"""
+        enemy = BaseSlime()
+        enemy.hp = enemy.max_hp = 100
+        enemy.weakness, enemy.resistance = None, "火"
+        self.battle.current_enemy = enemy
+        self.battle.cast_selected_spell("メラ")
+        self.assertEqual(enemy.hp, 100 - SPELL_DAMAGE["メラ"] // 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+from slime_battle import Battle
+from fuzz_battle import build_encounter, run_case, fuzz, shrink, ATTACK
+
+class TestFuzzHarness(unittest.TestCase):
+    def test_run_case_is_reproducible(self):
+        """同じシードなら同じ行動列・結果になるテスト"""
+        first = run_case(42)
+        second = run_case(42)
+        self.assertEqual(first[0], second[0])
+        self.assertIsNone(first[1])
+
+    def test_equipment_setup_is_kept(self):
+        """装備の付け替えの確認が、シードで決めた装備（空きのある枠）を変えないテスト"""
+        equipped = [sum(item is not None for item in build_encounter(seed).player.equipment.values())
+                    for seed in range(40)]
+        self.assertIn(0, equipped)
+        self.assertIn(3, equipped)
+        self.assertLess(sum(equipped), 3 * 40)
+
+    def test_replay_matches_random_run(self):
+        """記録した行動列を再生すると同じバトルになるテスト"""
+        taken, _ = run_case(7)
+        replayed, violation = run_case(7, taken)
+        self.assertEqual(taken, replayed)
+        self.assertIsNone(violation)
+
+    def test_invariants_hold(self):
+        """ランダムなバトルで不変条件が破れないテスト"""
+        summary = fuzz(300, workers=1, do_shrink=False)
+        self.assertEqual(summary['battles'], 300)
+        self.assertEqual(summary['failures'], [])
+
+    def test_violation_is_shrunk(self):
+        """HPを直接減らす不具合が最小の行動列に縮小されるテスト"""
+        def broken_attack(battle):
+            battle.current_enemy.hp -= 100
+            if battle.current_enemy.hp <= 0:
+                battle.win_battle()
+                return False
+            return True
+
+        with mock.patch.object(Battle, "player_attack", broken_attack):
+            summary = fuzz(50, workers=1)
+            case = summary['shrunk']['hp>=0']
+            self.assertEqual(case['seed'], 0)
+            self.assertLessEqual(len(case['actions']), 1)
+
+    def test_non_terminating_battle_detected(self):
+        """決着しないバトルが検出され、縮小後も再現するテスト"""
+        with mock.patch.object(Battle, "player_attack", lambda battle: True), \
+                mock.patch.object(Battle, "enemy_turn", lambda battle: True):
+            taken, violation = run_case(5, [(ATTACK, None)] * 3, max_turns=20)
+            self.assertEqual(violation.invariant, "terminates")
+            seed, actions = shrink(5, taken, violation.invariant, max_turns=20)
+            self.assertEqual(seed, 0)
+            self.assertEqual(run_case(seed, actions, max_turns=20)[1].invariant, "terminates")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from slime_battle import Battle
+from golden_trace import (DEFAULT_PATH, HASH_CHARS, first_divergence, load, main, record, save, trace_battle,
+                          verify)
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_PATH)
+enemy_normal_attack = Battle.enemy_normal_attack
+
+
+def harder_normal_attack(battle):
+    """敵の通常攻撃が1だけ強くなる（ルールを黙って変えてしまった書き換えの代わり）"""
+    battle.current_enemy.attack += 1
+    try:
+        return enemy_normal_attack(battle)
+    finally:
+        battle.current_enemy.attack -= 1
+
+
+class TestGoldenTrace(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.small = {"species": ["KingSlime", "PoisonSlime"], "levels": [1], "policies": ["attack"],
+                      "battles": 4, "sample_every": 2, "workers": 1}
+
+    def test_committed_golden_traces(self):
+        """リポジトリのゴールデントレースと今の Battle のバトルがすべて一致するテスト"""
+        golden = load(GOLDEN_PATH)
+        report = verify(golden, workers=1)
+        self.assertGreaterEqual(report["battles"], 10000)
+        self.assertEqual(report["diverged"], 0, report["divergences"])
+        # 強い敵との長いバトルで、毒や分裂などの特技も記録に入っている
+        sampled = "".join("".join(records) for records in golden["traces"].values())
+        for message in ("battle.poisoned", "battle.split_attack", "battle.level_up"):
+            self.assertIn(f'"{message}"', sampled)
+
+    def test_trace_is_deterministic(self):
+        """同じ組・番号のバトルは何度実行しても同じ記録になり、番号が違えば別のバトルになるテスト"""
+        first = trace_battle("KingSlime", 1, "spell", "worn", "normal", 3)
+        self.assertEqual(first, trace_battle("KingSlime", 1, "spell", "worn", "normal", 3))
+        self.assertNotEqual(first, trace_battle("KingSlime", 1, "spell", "worn", "normal", 4))
+        self.assertGreater(len(trace_battle("KingSlime", 5, "attack", "fresh", "tough", 0)),
+                           len(trace_battle("KingSlime", 5, "attack", "fresh", "normal", 0)))
+        with self.assertRaises(ValueError):
+            trace_battle("KingSlime", 1, "spell", "tired", "normal", 0)
+        with self.assertRaises(ValueError):
+            trace_battle("KingSlime", 1, "spell", "worn", "giant", 0)
+
+    def test_reports_first_divergent_turn(self):
+        """ルールが変わると最初に食い違ったターンと、全記録のあるバトルではその中身を報告するテスト"""
+        golden = record(**self.small)
+        self.assertEqual(verify(golden, workers=1)["diverged"], 0)
+        with mock.patch.object(Battle, "enemy_normal_attack", harder_normal_attack):
+            report = verify(golden, workers=1)
+        self.assertGreater(report["diverged"], 0)
+        sampled = [divergence for divergence in report["divergences"] if divergence.expected is not None]
+        self.assertTrue(sampled)
+        for divergence in sampled:
+            self.assertGreaterEqual(divergence.turn, 1)
+            self.assertNotEqual(divergence.expected, divergence.actual)
+            self.assertIn('"battle.damage"', divergence.actual)
+
+    def test_exit_code_without_reports(self):
+        """食い違いを1件も表示しない設定でも、食い違いがあれば終了コードが1になるテスト"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "golden.json")
+            save(record(**self.small), path)
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(main(["verify", "-f", path, "-j", "1", "--max-reports", "0"]), 0)
+            with mock.patch.object(Battle, "enemy_normal_attack", harder_normal_attack):
+                with redirect_stdout(io.StringIO()):
+                        self.assertEqual(main(["verify", "-f", path, "-j", "1", "--max-reports", "0"]), 1)
+
+    def test_first_divergence(self):
+        """ハッシュ列の食い違いと、片方だけ先に決着した場合のターンを求めるテスト"""
+        a, b, c = "a" * HASH_CHARS, "b" * HASH_CHARS, "c" * HASH_CHARS
+        self.assertIsNone(first_divergence(a + b, a + b))
+        self.assertEqual(first_divergence(a + b + c, a + c + c), 1)
+        self.assertEqual(first_divergence(a + b, a + b + c), 2)
+
+    def test_parallel_record_matches_serial(self):
+        """ワーカーで並列に記録・照合しても順に実行したときと同じになるテスト"""
+        serial = record(**self.small)
+        parallel = record(**dict(self.small, workers=2), chunk_size=3)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(verify(serial, workers=2, chunk_size=3)["diverged"], 0)
+
+    def test_balance_change_rejected(self):
+        """バランス表が記録したときと違えば照合せずに ValueError になるテスト"""
+        golden = record(**self.small)
+        golden["content"] = "0" * 16
+        with self.assertRaises(ValueError):
+            verify(golden, workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
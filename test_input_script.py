@@ -0,0 +1,104 @@
+import os
+import random
+import tempfile
+import unittest
+from messages import Message
+from simulator import make_sage
+from slime import KingSlime
+from slime_battle import Battle, main
+from input_script import ScriptedInput, ScriptExhausted, keep_attacking, parse_script, run_sessions
+
+def _discard(*args, **kwargs):
+    pass
+
+class TestScriptedInput(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.enemy = KingSlime()
+        self.enemy.hp = self.enemy.max_hp = 1000
+
+    def battle(self, commands):
+        sage = make_sage(5)
+        battle = Battle(sage, rng=random.Random(0), output=_discard, enemies=[self.enemy],
+                        input_func=ScriptedInput(commands))
+        battle.current_enemy = self.enemy
+        return battle
+
+    def test_parse_script(self):
+        """コメントと空行を除いてコマンドを取り出すテスト"""
+        lines = ["てるた  # 名前\n", "\n", "# コメントだけの行\n", " 2 \n", "メラ\n"]
+        self.assertEqual(list(parse_script(lines)), ["てるた", "2", "メラ"])
+
+    def test_exhausted(self):
+        """コマンドを使い切ると EOFError になり、プロンプトは整形されないテスト"""
+        prompts = []
+        read = ScriptedInput(["1"])
+        self.assertEqual(read(Message("menu.action_prompt")), "1")
+        with self.assertRaises(EOFError):
+            read("")
+        self.assertTrue(issubclass(ScriptExhausted, EOFError))
+        echoed = ScriptedInput(["1"], echo=prompts.append)
+        echoed(Message("menu.action_prompt"))
+        self.assertEqual(prompts, [str(Message("menu.action_prompt")) + "1"])
+
+    def test_spell_by_name_and_number(self):
+        """呪文を名前でも番号でも選べ、不正な入力は選び直しになるテスト"""
+        battle = self.battle(["x", "9", "2", "メラ"])
+        mp = battle.player.mp
+        battle.player_turn()
+        self.assertEqual(battle.player.mp, mp - 5)
+        self.assertEqual(battle.input_func.consumed, 4)
+        battle = self.battle(["2", "4"])  # レベル5の呪文は4つで、2番目がメラ
+        self.assertEqual(battle.player.spells[1], "メラ")
+        mp = battle.player.mp
+        battle.player_turn()
+        self.assertNotEqual(battle.player.mp, mp)
+
+    def test_back_from_spell_menu(self):
+        """呪文の一覧から戻って別の行動を選べるテスト"""
+        battle = self.battle(["2", str(len(make_sage(5).spells) + 1), "1"])
+        battle.player_turn()
+        self.assertLess(self.enemy.hp, 1000)
+
+    def test_main_with_script(self):
+        """main() をスクリプトで最後まで進め、入力が尽きたら終了するテスト"""
+        player = main(store_path=None, input_func=ScriptedInput(keep_attacking("てるた", 40)),
+                      output=_discard, rng=random.Random(5))
+        self.assertEqual(player.name, "てるた")
+        self.assertIsNone(main(store_path=None, input_func=ScriptedInput([]), output=_discard))
+
+    def test_quit_command(self):
+        """バトルの後に 2 を選ぶと終了するテスト（プロンプトを見て答える入力関数も渡せる）"""
+        prompts = []
+
+        def answer(prompt):
+            prompts.append(prompt.id)
+            return "2" if prompt.id == "game.choice_prompt" else "てるた" if len(prompts) == 1 else "1"
+
+        player = main(store_path=None, input_func=answer, output=_discard, rng=random.Random(1))
+        self.assertEqual(player.name, "てるた")
+        if player.hp > 0:
+            self.assertEqual(prompts.count("game.choice_prompt"), 1)
+            self.assertEqual(prompts[-1], "game.choice_prompt")
+
+    def test_many_sessions(self):
+        """同じスクリプトで多数のセッションを実行でき、同じシードなら同じ結果になるテスト"""
+        commands = list(keep_attacking("てるた", 30))
+        players, seconds = run_sessions(commands, 200)
+        self.assertEqual(len(players), 200)
+        again, _ = run_sessions(commands, 200)
+        self.assertEqual([p.exp for p in players], [p.exp for p in again])
+
+    def test_from_file(self):
+        """スクリプトファイルから読めるテスト"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            f.write("てるた\n1  # 攻撃\n")
+        try:
+            read = ScriptedInput.from_file(f.name)
+            self.assertEqual([read(), read()], ["てるた", "1"])
+        finally:
+            os.remove(f.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
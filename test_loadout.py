@@ -0,0 +1,73 @@
+import random
+import unittest
+from itertools import product
+from hero import EQUIPMENT_SLOTS, Equipment
+from balance import DEFAULT_BALANCE
+from loadout import EncounterModel, OBJECTIVES, optimize, prune_dominated, random_catalog, verify
+
+class TestEstimate(unittest.TestCase):
+    def test_matches_simulation(self):
+        """見積もりの勝率・獲得経験値が実際のバトルの結果に近いテスト"""
+        tables = DEFAULT_BALANCE.with_overrides({"species": {"KingSlime": {"hp": 120, "attack": 30},
+                                                             "PoisonSlime": {"hp": 150, "attack": 20}}}, version=1)
+        for species, level in (("KingSlime", 10), ("PoisonSlime", 5), ("MetalSlime", 3)):
+            model = EncounterModel({species: 1}, level, balance=tables)
+            estimate = model.evaluate((0, 0, 0))
+            measured = verify({}, model, battles=2000, seed=1)
+            self.assertAlmostEqual(estimate.win_rate, measured.win_rate, delta=0.06, msg=species)
+            self.assertAlmostEqual(estimate.exp, measured.exp, delta=0.1 * measured.exp, msg=species)
+
+    def test_unknown_species(self):
+        """遭遇表に知らない種類があれば ValueError になるテスト"""
+        with self.assertRaises(ValueError):
+            EncounterModel({"Dragon": 1})
+
+
+class TestOptimize(unittest.TestCase):
+    def test_prune_dominated(self):
+        """別の装備や何も付けないことと比べてどの能力値も上回らない装備が除かれるテスト"""
+        strong = Equipment("強", "武器", {"attack": 10, "hp": 5})
+        weak = Equipment("弱", "武器", {"attack": 8, "hp": 5, "mp": 50})
+        tough = Equipment("堅", "武器", {"defense": 3})
+        cursed = Equipment("呪", "武器", {"attack": -5})
+        front = prune_dominated([weak, strong, tough, cursed])
+        self.assertEqual([item for _, item in front], [strong, tough])
+        self.assertEqual(prune_dominated([cursed]), [((0, 0, 0), None)])
+
+    def test_matches_brute_force(self):
+        """分枝限定法の結果が全組み合わせを調べた最良の値と一致するテスト"""
+        for seed in range(6):
+            rng = random.Random(seed)
+            catalog = [Equipment(f"{slot}{n}", slot, {"attack": rng.randint(-5, 30), "defense": rng.randint(-5, 30),
+                                                      "hp": rng.randint(-10, 60)})
+                       for slot in EQUIPMENT_SLOTS for n in range(6)]
+            encounters = {"KingSlime": rng.randint(1, 3), "PoisonSlime": 1, "MetalSlime": rng.randint(0, 2)}
+            tables = DEFAULT_BALANCE.with_overrides({"species": {"KingSlime": {"hp": 90, "attack": 30}}}, version=1)
+            for objective in OBJECTIVES:
+                model = EncounterModel(encounters, level=rng.randint(1, 8), balance=tables)
+                loadout, stats = optimize(catalog, model, objective)
+                choices = [[None] + [item for item in catalog if item.equipment_type == slot]
+                           for slot in EQUIPMENT_SLOTS]
+                best = max(getattr(model.evaluate(tuple(sum(item.stats[stat] for item in combo if item is not None)
+                                                        for stat in ("attack", "defense", "hp"))), objective)
+                           for combo in product(*choices))
+                self.assertAlmostEqual(loadout.score, best, places=9, msg=(seed, objective))
+                self.assertLess(stats["nodes"], 7 ** 3)
+
+    def test_large_catalog(self):
+        """数千個の装備でも数秒以内に解けるテスト"""
+        catalog = random_catalog(6000, seed=3)
+        for objective in OBJECTIVES:
+            loadout, stats = optimize(catalog, EncounterModel(level=5), objective)
+            self.assertLess(stats["seconds"], 5)
+            self.assertEqual(set(loadout.items), set(EQUIPMENT_SLOTS))
+            self.assertLess(stats["candidates"], len(catalog))
+
+    def test_unknown_slot(self):
+        """知らないスロットの装備があれば ValueError になるテスト"""
+        with self.assertRaises(ValueError):
+            optimize([Equipment("盾", "盾", {"defense": 5})], EncounterModel())
+
+
+if __name__ == '__main__':
+    unittest.main()
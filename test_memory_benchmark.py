@@ -0,0 +1,45 @@
+import unittest
+from types import MappingProxyType
+from hero import Sage, UltimateArmor, SAGE_STARTING_SPELLS
+from slime import BaseSlime, KingSlime
+from slime_battle import Player
+from memory_benchmark import legacy_layout, run_benchmark
+
+class TestSlottedEntities(unittest.TestCase):
+    def test_entities_have_no_dict(self):
+        """エンティティがインスタンスごとの __dict__ を持たないテスト"""
+        for entity in (BaseSlime(), KingSlime(), Sage("賢者"), Player("プレイヤー"), UltimateArmor()):
+            self.assertFalse(hasattr(entity, "__dict__"), type(entity).__name__)
+
+    def test_shared_defaults(self):
+        """初期呪文と空の装備一覧を共有し、変更時だけ作り直すテスト"""
+        first, second = Sage("賢者1"), Sage("賢者2")
+        self.assertIs(first.spells, SAGE_STARTING_SPELLS)
+        self.assertIs(first.equipment, second.equipment)
+        self.assertIsInstance(first.equipment, MappingProxyType)
+
+        first.equip(UltimateArmor())
+        self.assertEqual(first.equipment["防具"].name, "賢者のローブ")
+        self.assertIsNone(second.equipment["防具"])
+        for _ in range(4):
+            first.level_up()
+        self.assertIn("メラゾーマ", first.spells)
+        self.assertEqual(second.spells, SAGE_STARTING_SPELLS)
+
+    def test_legacy_layout_copies_values(self):
+        """比較用の以前の持ち方が同じ値を持つテスト"""
+        sage = Sage("賢者")
+        legacy = legacy_layout(sage)
+        self.assertEqual(legacy.spells, list(sage.spells))
+        self.assertEqual(legacy.equipment, dict(sage.equipment))
+        self.assertEqual(legacy.hp, sage.hp)
+
+    def test_benchmark_reports_savings(self):
+        """スロット化でエンティティ1個あたりのメモリが減るテスト"""
+        results = run_benchmark(count=2000, names=["BaseSlime", "Sage"])
+        for name, sizes in results.items():
+            self.assertLess(sizes["after"], sizes["before"], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import copy
+import pickle
+import random
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import messages
+from messages import Message, get_catalog, register_locale, render, set_locale
+from hero import Sage
+from slime import BaseSlime
+from slime_battle import Battle
+
+
+def _echo(message):
+    return message
+
+
+class TestMessages(unittest.TestCase):
+    def tearDown(self):
+        set_locale(messages.DEFAULT_LOCALE)
+
+    def test_render_template(self):
+        """テンプレートに引数を当てはめて表示するテスト"""
+        message = Message("battle.damage", target="スライム", damage=12)
+        self.assertEqual(message.id, "battle.damage")
+        self.assertEqual(str(message), "スライムに12のダメージ！")
+        self.assertEqual(render("そのまま"), "そのまま")
+
+    def test_nested_message(self):
+        """引数のメッセージも同じロケールで表示するテスト"""
+        message = Message("spell.attack", caster="賢者", spell="メラ", power=Message("spell.power_small"))
+        self.assertEqual(str(message), "賢者はメラを唱えた！\n炎のダメージ（小）")
+        self.assertEqual(message.render("en"), "賢者 casts メラ!\nFire damage (small)")
+
+    def test_pickle_and_copy(self):
+        """pickle・copy・ワーカープロセスを通しても同じメッセージに戻るテスト"""
+        message = Message("spell.attack", caster="賢者", spell="メラ", power=Message("spell.power_small"))
+        for restored in (pickle.loads(pickle.dumps(message)), copy.copy(message), copy.deepcopy(message)):
+            self.assertIsInstance(restored, Message)
+            self.assertIsInstance(restored.args["power"], Message)
+            self.assertEqual(restored, message)
+            self.assertEqual(str(restored), str(message))
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(executor.submit(_echo, message).result(), message)
+
+    def test_contains_like_string(self):
+        """呪文の結果を文字列と同じように調べられるテスト"""
+        sage = Sage("テスト賢者")
+        sage.mp = 0
+        result = sage.cast_spell("メラ", BaseSlime())
+        self.assertIsInstance(result, Message)
+        self.assertTrue("MPが足りない" in result)
+
+    def test_templates_parsed_once(self):
+        """テンプレートは最初に使われたときに一度だけ分解されるテスト"""
+        catalog = get_catalog()
+        str(Message("battle.gold_gained", gold=1))
+        parts = catalog.parsed("battle.gold_gained")
+        str(Message("battle.gold_gained", gold=2))
+        self.assertIs(catalog.parsed("battle.gold_gained"), parts)
+
+    def test_plug_in_locale(self):
+        """ロケールを追加でき、無いメッセージは既定のロケールで表示するテスト"""
+        register_locale("test", {"battle.game_over": "GG"})
+        set_locale("test")
+        self.assertEqual(str(Message("battle.game_over")), "GG")
+        self.assertEqual(str(Message("battle.escape_failed")), "\n逃げ出せなかった！")
+        with self.assertRaises(KeyError):
+            set_locale("unknown")
+
+    def test_battle_emits_messages(self):
+        """バトルが整形前のメッセージを出力するテスト"""
+        output = []
+        battle = Battle(Sage("テスト賢者"), test_mode=True, rng=random.Random(0), output=output.append)
+        battle.start_battle()
+        battle.play_turn(1)
+        self.assertTrue(all(isinstance(message, (Message, str)) for message in output))
+        self.assertIn("battle.appear", [message.id for message in output if isinstance(message, Message)])
+
+
+if __name__ == '__main__':
+    unittest.main()
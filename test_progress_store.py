@@ -0,0 +1,107 @@
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from hero import Sage, UltimateArmor
+from slime import KingSlime
+from slime_battle import Battle
+from progress_store import ProgressStore
+
+class TestProgressStore(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ProgressStore(os.path.join(self.tmp.name, "progress.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def win_against_king(self, sage, seed=0):
+        battle = Battle(sage, test_mode=True, rng=random.Random(seed), output=lambda text: None)
+        battle.current_enemy = KingSlime()
+        battle.current_enemy.hp = 1
+        while battle.player_attack():
+            pass
+        return battle
+
+    def test_wal_mode(self):
+        """WALモードで開かれるテスト"""
+        mode = self.store.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_profile_round_trip(self):
+        """レベル・経験値・ゴールド・装備が保存・復元されるテスト"""
+        sage = Sage("テストプレイヤー")
+        for _ in range(4):
+            sage.level_up()
+        sage.equip(UltimateArmor())
+        sage.gold = 123
+        self.store.save_player(sage)
+
+        loaded = self.store.load_player("テストプレイヤー")
+        self.assertEqual(loaded.level, 5)
+        self.assertEqual(loaded.gold, 123)
+        self.assertEqual(loaded.max_hp, sage.max_hp)
+        self.assertIn("メラゾーマ", loaded.spells)
+        self.assertEqual(loaded.equipment["防具"].name, "賢者のローブ")
+        self.assertIsNone(self.store.load_player("だれか"))
+
+    def test_battle_results_accumulate(self):
+        """バトル結果が通算成績と討伐数に積み上がるテスト"""
+        sage = Sage("テストプレイヤー")
+        for seed in range(3):
+            battle = self.win_against_king(sage, seed)
+            self.assertEqual(battle.outcome, "win")
+            self.store.record_battle(sage, battle)
+        stats = self.store.lifetime_stats("テストプレイヤー")
+        self.assertEqual(stats['battles'], 3)
+        self.assertEqual(stats['wins'], 3)
+        self.assertEqual(stats['gold_gained'], KingSlime().gold * 3)
+        self.assertEqual(stats['kills'], {"キングスライム": 3})
+        self.assertEqual(self.store.load_player("テストプレイヤー").gold, sage.gold)
+
+    def test_batched_writes(self):
+        """batch_size 件たまるまで書き込まないテスト"""
+        store = ProgressStore(os.path.join(self.tmp.name, "batched.db"), batch_size=5)
+        sage = Sage("まとめ書き")
+        for seed in range(4):
+            store.record_battle(sage, self.win_against_king(sage, seed))
+        self.assertEqual(store.connection.execute("SELECT COUNT(*) FROM players").fetchone()[0], 0)
+        store.record_battle(sage, self.win_against_king(sage, 9))
+        self.assertEqual(store.connection.execute("SELECT COUNT(*) FROM players").fetchone()[0], 1)
+        store.close()
+
+    def test_concurrent_writers(self):
+        """複数のスレッドから同時に書き込んでも通算成績が欠けないテスト"""
+        store = ProgressStore(os.path.join(self.tmp.name, "threads.db"), batch_size=3)
+        sages = [Sage(f"スレッド{number}") for number in range(4)]
+        battles = [self.win_against_king(Sage("見本"), seed) for seed in range(25)]
+
+        def play(sage):
+            for battle in battles:
+                store.record_battle(sage, battle)
+                store.leaderboard("gold")
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(play, sages))
+        for sage in sages:
+            self.assertEqual(store.lifetime_stats(sage.name)['battles'], 25)
+        store.close()
+
+    def test_leaderboards(self):
+        """ランキングが降順で返るテスト"""
+        for name, gold in [("A", 10), ("B", 30), ("C", 20)]:
+            sage = Sage(name)
+            sage.gold = gold
+            self.store.save_player(sage)
+        self.assertEqual(self.store.leaderboard("gold", limit=2), [("B", 30), ("C", 20)])
+        sage = Sage("D")
+        self.store.record_battle(sage, self.win_against_king(sage))
+        self.assertEqual(self.store.species_leaderboard("キングスライム"), [("D", 1)])
+        with self.assertRaises(ValueError):
+            self.store.leaderboard("unknown")
+
+if __name__ == '__main__':
+    unittest.main()
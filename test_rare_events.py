@@ -0,0 +1,69 @@
+import math
+import random
+import unittest
+from simulator import BattleConfig, run_battle
+from rare_events import BiasedBattle, WeightedEstimate, estimate
+
+class TestRareEvents(unittest.TestCase):
+    def test_unbiased_battle_matches_plain(self):
+        """偏りを掛けなければ通常のバトルと同じ結果になり、重みは1のままになるテスト"""
+        config = BattleConfig("KingSlime")
+        battles = []
+
+        def make_battle(player, **kwargs):
+            battles.append(BiasedBattle(player, {}, **kwargs))
+            return battles[-1]
+
+        rng = random.Random(3)
+        plain = [run_battle(config, rng) for _ in range(20)]
+        rng = random.Random(3)
+        biased = [run_battle(config, rng, battle_class=make_battle) for _ in range(20)]
+        self.assertEqual(plain, biased)
+        self.assertTrue(all(battle.weight == 1.0 for battle in battles))
+
+    def test_metal_king_kill_matches_analytic(self):
+        """メタルキングスライムを倒す確率の推定が解析解を信頼区間に含むテスト"""
+        # 1ダメージずつ8回当てる間に、逃げられずに7+k回の敵のターン（kは外した回数）を耐える確率
+        exact = 0.95 ** 8 * 0.1 ** 7 * (1 - 0.05 * 0.1) ** -8
+        result = estimate(BattleConfig("MetalKingSlime"), "win", {"enemy_escape": 0.2}, battles=5000)
+        low, high = result.interval(0.99)
+        self.assertLess(low, exact)
+        self.assertLess(exact, high)
+        self.assertLess(result.relative_half_width(), 0.1)
+        # 同じバトル数の普通のモンテカルロ法では一度も起きない
+        self.assertEqual(estimate(BattleConfig("MetalKingSlime"), "win", battles=5000).hits, 0)
+
+    def test_agrees_with_plain_monte_carlo(self):
+        """ありふれた事象では普通のモンテカルロ法と推定が一致するテスト"""
+        config = BattleConfig("MetalSlime")
+        plain = estimate(config, "win", battles=20000, seed=1)
+        biased = estimate(config, "win", {"enemy_escape": 0.3}, battles=5000, seed=2)
+        self.assertLess(abs(plain.probability - biased.probability),
+                        4 * math.hypot(plain.stderr, biased.stderr))
+
+    def test_stops_at_target(self):
+        """目標の精度に達したら止まるテスト"""
+        result = estimate(BattleConfig("MetalKingSlime"), "win", {"enemy_escape": 0.2}, target=0.1,
+                          batch_size=500)
+        self.assertLessEqual(result.relative_half_width(), 0.1)
+        self.assertLess(result.battles, 10000)
+
+    def test_invalid_biases(self):
+        """未知の判定や0・1の確率は受け付けないテスト"""
+        config = BattleConfig("BaseSlime")
+        with self.assertRaises(ValueError):
+            estimate(config, "win", {"unknown": 0.5}, battles=1)
+        with self.assertRaises(ValueError):
+            estimate(config, "win", {"player_hit": 1.0}, battles=1)
+
+    def test_weighted_estimate(self):
+        """重み付きの推定値と標準誤差の計算のテスト"""
+        result = WeightedEstimate()
+        for weight, happened in ((2.0, True), (1.0, False), (2.0, True), (1.0, False)):
+            result.add(weight, happened)
+        self.assertEqual(result.probability, 1.0)
+        self.assertAlmostEqual(result.stderr, math.sqrt(4 / 3 / 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,22 @@
 import unittest
 import sys
 import os
+import ast
+import glob
+import json
+import hashlib
+import argparse
 import datetime
+import time
 import traceback
-from typing import Optional, List, Dict, Any, Tuple, Type, Union
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, List, Dict, Any, Tuple, Type, Union, Callable
 from types import TracebackType
-from unittest.runner import TextTestRunner
 from unittest.result import TestResult
+from report_writer import (REPORT_TITLE, HTML_HEAD, HTML_TAIL, StreamingReportWriter, TimingHistory,
+                           count_results, group_by_class, markdown_summary, markdown_class_section,
+                           html_summary, html_class_section)
 from test_slime_battle import *
 
 # OptExcInfoのカスタム型定義
@@ -17,18 +27,19 @@ class DetailedTestResult(TestResult):
     def __init__(self):
         super().__init__()
         self.test_details: List[Dict[str, Any]] = []
-        self.start_time: Optional[datetime.datetime] = None
+        self.start_time: Optional[float] = None
         self.current_test = None
 
     def startTest(self, test):
-        self.start_time = datetime.datetime.now()
+        # 壁時計ではなく単調増加クロックで計測（並列実行時も各テスト単体の時間になる）
+        self.start_time = time.perf_counter()
         self.current_test = test
         super().startTest(test)
 
     def _calculate_elapsed_time(self) -> float:
         if self.start_time is None:
             return 0.0
-        return (datetime.datetime.now() - self.start_time).total_seconds()
+        return time.perf_counter() - self.start_time
 
     def _format_error(self, err: OptExcInfo, test: unittest.TestCase) -> str:
         """エラー情報を文字列に変換"""
@@ -68,140 +79,260 @@ class DetailedTestResult(TestResult):
 
 def generate_markdown_report(result):
     now = datetime.datetime.now()
-    report = f"""# スライムバトルゲーム テスト実行レポート
-
-## 実行概要
-- 実行日時: {now.strftime('%Y-%m-%d %H:%M:%S')}
-- テスト数: {result.testsRun}
-- 成功: {len([t for t in result.test_details if t['result'] == 'OK'])}
-- 失敗: {len([t for t in result.test_details if t['result'] == 'FAIL'])}
-- エラー: {len([t for t in result.test_details if t['result'] == 'ERROR'])}
-
-## テスト詳細
-
-"""
-    
-    # テストクラスごとにグループ化
-    test_classes = {}
-    for detail in result.test_details:
-        class_name = detail['name'].split('.')[1]
-        if class_name not in test_classes:
-            test_classes[class_name] = []
-        test_classes[class_name].append(detail)
-
-    for class_name, tests in test_classes.items():
-        report += f"### {class_name}\n\n"
-        for test in tests:
-            test_name = test['name'].split('.')[-1]
-            status_emoji = "✅" if test['result'] == 'OK' else "❌"
-            report += f"#### {status_emoji} {test_name}\n"
-            report += f"- 説明: {test['doc']}\n"
-            report += f"- 結果: {test['result']}\n"
-            report += f"- 実行時間: {test['time']:.3f}秒\n"
-            if test['result'] != 'OK':
-                report += f"- エラー詳細:\n```\n{test['error']}\n```\n"
-            report += "\n"
-
-    return report
+    parts = [f"# {REPORT_TITLE}\n\n",
+             markdown_summary(now, result.testsRun, count_results(result.test_details)),
+             "## テスト詳細\n\n"]
+    # テストクラスごとにグループ化（文字列連結ではなくリストにまとめて最後に結合する）
+    for class_name, tests in group_by_class(result.test_details).items():
+        parts.append(markdown_class_section(class_name, tests))
+    return "".join(parts)
 
 def generate_html_report(result):
     now = datetime.datetime.now()
-    html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>スライムバトルゲーム テスト実行レポート</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        h1 {{ color: #333; }}
-        .success {{ color: green; }}
-        .failure {{ color: red; }}
-        .test-case {{ margin: 10px 0; padding: 10px; border: 1px solid #ddd; }}
-        .test-details {{ margin-left: 20px; }}
-        pre {{ background-color: #f5f5f5; padding: 10px; }}
-    </style>
-</head>
-<body>
-    <h1>スライムバトルゲーム テスト実行レポート</h1>
-    <h2>実行概要</h2>
-    <ul>
-        <li>実行日時: {now.strftime('%Y-%m-%d %H:%M:%S')}</li>
-        <li>テスト数: {result.testsRun}</li>
-        <li>成功: {len([t for t in result.test_details if t['result'] == 'OK'])}</li>
-        <li>失敗: {len([t for t in result.test_details if t['result'] == 'FAIL'])}</li>
-        <li>エラー: {len([t for t in result.test_details if t['result'] == 'ERROR'])}</li>
-    </ul>
-"""
-
-    # テストクラスごとにグループ化
-    test_classes = {}
-    for detail in result.test_details:
-        class_name = detail['name'].split('.')[1]
-        if class_name not in test_classes:
-            test_classes[class_name] = []
-        test_classes[class_name].append(detail)
-
-    for class_name, tests in test_classes.items():
-        html += f"<h2>{class_name}</h2>"
-        for test in tests:
-            test_name = test['name'].split('.')[-1]
-            status_class = "success" if test['result'] == 'OK' else "failure"
-            html += f"""
-    <div class="test-case">
-        <h3 class="{status_class}">{test_name}</h3>
-        <div class="test-details">
-            <p><strong>説明:</strong> {test['doc']}</p>
-            <p><strong>結果:</strong> {test['result']}</p>
-            <p><strong>実行時間:</strong> {test['time']:.3f}秒</p>
-"""
-            if test['result'] != 'OK':
-                html += f"""
-            <p><strong>エラー詳細:</strong></p>
-            <pre>{test['error']}</pre>
-"""
-            html += """
-        </div>
-    </div>
-"""
-
-    html += """
-</body>
-</html>
-"""
-    return html
-
-def run_tests_with_report():
-    # テストスイートの作成
+    parts = [HTML_HEAD, html_summary(now, result.testsRun, count_results(result.test_details))]
+    for class_name, tests in group_by_class(result.test_details).items():
+        parts.append(html_class_section(class_name, tests))
+    parts.append(HTML_TAIL)
+    return "".join(parts)
+
+
+class AggregatedTestResult:
+    """ワーカープロセスから集めたテスト結果（DetailedTestResultと同じ形で参照できる）"""
+    def __init__(self):
+        self.test_details: List[Dict[str, Any]] = []
+        self.testsRun = 0
+
+    def add(self, details: List[Dict[str, Any]], tests_run: int):
+        self.test_details.extend(details)
+        self.testsRun += tests_run
+
+    def wasSuccessful(self) -> bool:
+        return all(t['result'] == 'OK' for t in self.test_details)
+
+
+def discover_test_modules(directory: Optional[str] = None) -> List[str]:
+    """test_*.py をテストモジュールとして列挙する（このスクリプト自身は除く）"""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    modules = []
+    for path in sorted(glob.glob(os.path.join(directory, "test_*.py"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name != "test_report":
+            modules.append(name)
+    return modules
+
+
+def collect_test_classes(module_names: List[str]) -> List[Tuple[str, str]]:
+    """(モジュール名, テストクラス名) の一覧を定義順に返す"""
     loader = unittest.TestLoader()
-    # test_slime_battle.pyからすべてのテストを読み込む
-    import test_slime_battle
-    suite = loader.loadTestsFromModule(test_slime_battle)
+    classes = []
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        for name, obj in vars(module).items():
+            if (isinstance(obj, type) and issubclass(obj, unittest.TestCase)
+                    and obj.__module__ == module_name
+                    and loader.getTestCaseNames(obj)):
+                classes.append((module_name, name))
+    return classes
+
+
+def run_test_class(module_name: str, class_name: str) -> Tuple[List[Dict[str, Any]], int]:
+    """1つのテストクラスを実行する（ワーカープロセスで呼ばれる）
+
+    setUpClass などのクラス単位の準備処理を壊さないよう、クラス単位で分配する。
+    """
+    try:
+        module = importlib.import_module(module_name)
+        suite = unittest.TestLoader().loadTestsFromTestCase(getattr(module, class_name))
+    except Exception:
+        exc_type, exc_value = sys.exc_info()[:2]
+        return [{
+            'name': f"{module_name}.{class_name}.<load>",
+            'result': 'ERROR',
+            'error': ''.join(traceback.format_exception_only(exc_type, exc_value)),
+            'time': 0.0,
+            'doc': "テストクラスの読み込み"
+        }], 1
 
-    # テストの実行
     result = DetailedTestResult()
-    runner = TextTestRunner(verbosity=2)
     suite.run(result)
+    return result.test_details, result.testsRun
 
-    # レポートの生成
-    markdown_report = generate_markdown_report(result)
-    html_report = generate_html_report(result)
 
-    # レポートの保存
-    reports_dir = "test_reports"
-    if not os.path.exists(reports_dir):
-        os.makedirs(reports_dir)
+# テストが読むデータファイルの拡張子（テスト結果のキャッシュのキーに内容を含める）
+DATA_EXTENSIONS = (".json", ".toml")
+
+
+def local_dependencies(module_name: str, directory: Optional[str] = None) -> List[str]:
+    """モジュールが（間接的にも）importしているリポジトリ内のソースファイルを返す"""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    seen = []
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(directory, name + ".py")
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.append(name)
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                pending.append(node.module.split('.')[0])
+    return sorted(os.path.join(directory, name + ".py") for name in seen)
+
+
+def data_files(directory: Optional[str] = None) -> List[str]:
+    """テストが読みうるリポジトリ直下のデータファイル（golden_traces.json など）"""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    return sorted(path for path in glob.glob(os.path.join(directory, "*"))
+                  if path.endswith(DATA_EXTENSIONS) and os.path.isfile(path))
 
+
+def dependency_hash(module_name: str, directory: Optional[str] = None) -> str:
+    """テストモジュールと、それがimportするソースとデータファイルの内容から求めたハッシュ
+
+    どのテストがどのデータファイルを読むかは import から分からないので、データファイルはすべて含める。
+    """
+    digest = hashlib.sha256()
+    for path in local_dependencies(module_name, directory) + data_files(directory):
+        with open(path, "rb") as f:
+            content = f.read()
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """ソースのハッシュをキーにしたテスト結果キャッシュ
+
+    テストクラス単位で、依存ソースが変わっていなければ前回の結果を再利用する。
+    不安定なテストの失敗が固定されないよう、全テストが成功したクラスだけを保存する。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def lookup(self, module_name: str, class_name: str, key: str) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        entry = self.entries.get(f"{module_name}.{class_name}")
+        if entry is None or entry['key'] != key:
+            return None
+        details = [dict(detail, cached=True) for detail in entry['details']]
+        return details, entry['tests_run']
+
+    def store(self, module_name: str, class_name: str, key: str,
+              details: List[Dict[str, Any]], tests_run: int):
+        cache_id = f"{module_name}.{class_name}"
+        if details and all(t['result'] == 'OK' for t in details):
+            self.entries[cache_id] = {'key': key, 'details': details, 'tests_run': tests_run}
+        else:
+            self.entries.pop(cache_id, None)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def run_tests(module_names: Optional[List[str]] = None, jobs: Optional[int] = None,
+              cache: Optional[ResultCache] = None, force: bool = False,
+              on_result: Optional[Callable[[List[Dict[str, Any]], int], None]] = None) -> AggregatedTestResult:
+    """テストクラスをプロセスプールに分配して実行する
+
+    Args:
+        module_names: 実行するテストモジュール名（省略時は test_*.py を自動検出）
+        jobs: ワーカープロセス数（省略時はCPU数、1なら同一プロセスで直列実行）
+        cache: 結果キャッシュ（省略時はキャッシュを使わない）
+        force: Trueならキャッシュがあっても全テストを再実行する
+        on_result: テストクラスの結果が確定するたびに (結果一覧, 実行数) で呼ばれる
+    """
+    if module_names is None:
+        module_names = discover_test_modules()
+    classes = collect_test_classes(module_names)
+    jobs = jobs or os.cpu_count() or 1
+    keys = {name: dependency_hash(name) for name in module_names} if cache else {}
+
+    # キャッシュを利用できるクラスと、実行が必要なクラスに振り分ける
+    outcomes: List[Optional[Tuple[List[Dict[str, Any]], int]]] = []
+    pending = []
+    for index, (module_name, class_name) in enumerate(classes):
+        cached = None
+        if cache is not None and not force:
+            cached = cache.lookup(module_name, class_name, keys[module_name])
+        outcomes.append(cached)
+        if cached is None:
+            pending.append(index)
+        elif on_result is not None:
+            on_result(*cached)
+
+    if jobs <= 1 or len(pending) <= 1:
+        for index in pending:
+            outcomes[index] = run_test_class(*classes[index])
+            if on_result is not None:
+                on_result(*outcomes[index])
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+            futures = {executor.submit(run_test_class, *classes[index]): index for index in pending}
+            # 終わったクラスから順に受け取り、レポートへ逐次書き出せるようにする
+            for future in as_completed(futures):
+                outcomes[futures[future]] = future.result()
+                if on_result is not None:
+                    on_result(*outcomes[futures[future]])
+
+    if cache is not None:
+        for index in pending:
+            module_name, class_name = classes[index]
+            cache.store(module_name, class_name, keys[module_name], *outcomes[index])
+        cache.save()
+
+    # レポートの並び順を直列実行と揃えるため、定義順に結果をまとめる
+    result = AggregatedTestResult()
+    for outcome in outcomes:
+        result.add(*outcome)
+    return result
+
+
+def run_tests_with_report(jobs: Optional[int] = None, use_cache: bool = True, force: bool = False):
+    reports_dir = "test_reports"
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    with open(f"{reports_dir}/test_report_{timestamp}.md", "w", encoding="utf-8") as f:
-        f.write(markdown_report)
-    
-    with open(f"{reports_dir}/test_report_{timestamp}.html", "w", encoding="utf-8") as f:
-        f.write(html_report)
+
+    # テストの実行（テストクラス単位で並列実行、変更のないクラスはキャッシュを利用）
+    # 結果はクラスが終わるたびにMarkdown・HTML・JUnit XMLへ逐次書き出す
+    cache = ResultCache(os.path.join(reports_dir, "test_cache.json")) if use_cache else None
+    writer = StreamingReportWriter(reports_dir, timestamp)
+    try:
+        result = run_tests(jobs=jobs, cache=cache, force=force, on_result=writer.add_results)
+    finally:
+        # 実行時間の履歴を記録し、推移をレポート末尾に載せる
+        history = TimingHistory(os.path.join(reports_dir, "history.jsonl"))
+        history.record(timestamp, writer.details)
+        writer.close(history.trends())
 
     print(f"\nテストレポートが生成されました:")
-    print(f"- Markdown: {reports_dir}/test_report_{timestamp}.md")
-    print(f"- HTML: {reports_dir}/test_report_{timestamp}.html")
+    print(f"- Markdown: {writer.paths['markdown']}")
+    print(f"- HTML: {writer.paths['html']}")
+    print(f"- JUnit XML: {writer.paths['junit']}")
+    return result
 
 if __name__ == '__main__':
-    run_tests_with_report() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="テストを実行してレポートを生成する")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="並列実行するワーカープロセス数（既定: CPU数、1で直列実行）")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="キャッシュを無視して全テストを再実行する")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="結果キャッシュを読み書きしない")
+    args = parser.parse_args()
+    result = run_tests_with_report(jobs=args.jobs, use_cache=not args.no_cache, force=args.force)
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from report_writer import StreamingReportWriter, TimingHistory, sparkline
+from test_report import (run_tests, collect_test_classes, discover_test_modules,
+                         dependency_hash, local_dependencies, ResultCache)
+
+class TestParallelRunner(unittest.TestCase):
+    def test_discover_excludes_report_script(self):
+        """レポートスクリプト自身はテストモジュールとして扱わないテスト"""
+        modules = discover_test_modules()
+        self.assertIn("test_slime_battle", modules)
+        self.assertNotIn("test_report", modules)
+
+    def test_collect_test_classes(self):
+        """テストクラスが定義順に列挙されるテスト"""
+        classes = collect_test_classes(["test_slime_battle"])
+        self.assertEqual(classes[0], ("test_slime_battle", "TestSlimeBase"))
+        self.assertIn(("test_slime_battle", "TestBattle"), classes)
+
+    def test_parallel_matches_serial(self):
+        """並列実行でも直列実行と同じ結果・順序になるテスト"""
+        serial = run_tests(["test_slime_battle"], jobs=1)
+        parallel = run_tests(["test_slime_battle"], jobs=2)
+        self.assertEqual(serial.testsRun, parallel.testsRun)
+        self.assertEqual([t['name'] for t in serial.test_details],
+                         [t['name'] for t in parallel.test_details])
+        self.assertTrue(all(t['time'] >= 0 for t in parallel.test_details))
+
+class TestResultCaching(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "cache.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_local_dependencies(self):
+        """テストモジュールがimportするソースを検出するテスト"""
+        names = [os.path.basename(path) for path in local_dependencies("test_slime_battle")]
+        for source in ["test_slime_battle.py", "slime.py", "hero.py", "slime_battle.py"]:
+            self.assertIn(source, names)
+
+    def test_data_files_change_hash(self):
+        """テストが読むデータファイルが変わるとハッシュが変わるテスト"""
+        with open(os.path.join(self.tmp.name, "test_golden.py"), "w", encoding="utf-8") as f:
+            f.write("import json\n")
+        data_path = os.path.join(self.tmp.name, "golden.json")
+        with open(data_path, "w", encoding="utf-8") as f:
+            f.write('{"hashes": ["a"]}')
+        before = dependency_hash("test_golden", self.tmp.name)
+        with open(data_path, "w", encoding="utf-8") as f:
+            f.write('{"hashes": ["b"]}')
+        self.assertNotEqual(dependency_hash("test_golden", self.tmp.name), before)
+
+    def test_cached_results_are_reused(self):
+        """依存ソースが変わらなければキャッシュ結果を再利用するテスト"""
+        first = run_tests(["test_slime_battle"], jobs=1, cache=ResultCache(self.cache_path))
+        self.assertFalse(any(t.get('cached') for t in first.test_details))
+
+        second = run_tests(["test_slime_battle"], jobs=1, cache=ResultCache(self.cache_path))
+        self.assertEqual(second.testsRun, first.testsRun)
+        self.assertTrue(all(t.get('cached') for t in second.test_details))
+
+    def test_force_reruns(self):
+        """force指定時はキャッシュがあっても再実行するテスト"""
+        run_tests(["test_slime_battle"], jobs=1, cache=ResultCache(self.cache_path))
+        forced = run_tests(["test_slime_battle"], jobs=1,
+                           cache=ResultCache(self.cache_path), force=True)
+        self.assertFalse(any(t.get('cached') for t in forced.test_details))
+
+    def test_changed_key_invalidates(self):
+        """ハッシュが変わったクラスはキャッシュを使わないテスト"""
+        cache = ResultCache(self.cache_path)
+        details = [{'name': 'm.C.test_a', 'result': 'OK', 'time': 0.1, 'doc': ''}]
+        cache.store("m", "C", "old", details, 1)
+        self.assertIsNotNone(cache.lookup("m", "C", "old"))
+        self.assertIsNone(cache.lookup("m", "C", "new"))
+
+class TestStreamingReport(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.details = [
+            {'name': 'm.TestA.test_ok', 'result': 'OK', 'time': 0.01, 'doc': '成功するテスト'},
+            {'name': 'm.TestA.test_ng', 'result': 'FAIL', 'time': 0.02, 'doc': '<失敗>',
+             'error': 'AssertionError: 1 != 2\n'},
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writer_emits_all_formats(self):
+        """Markdown・HTML・JUnit XMLが逐次書き出されるテスト"""
+        writer = StreamingReportWriter(self.tmp.name, "run")
+        writer.add_results(self.details, 2)
+        with open(writer.paths['markdown'], encoding="utf-8") as f:
+            self.assertIn("test_ng", f.read())  # close前でも書き出し済み
+        writer.close()
+
+        suite = ET.parse(writer.paths['junit']).getroot().find("testsuite")
+        self.assertEqual(suite.get("tests"), "2")
+        self.assertEqual(suite.get("failures"), "1")
+        with open(writer.paths['html'], encoding="utf-8") as f:
+            html = f.read()
+        self.assertIn("&lt;失敗&gt;", html)
+        self.assertTrue(html.rstrip().endswith("</html>"))
+
+    def test_history_trends(self):
+        """実行時間の増加が大きいテストが先頭に来るテスト"""
+        history = TimingHistory(os.path.join(self.tmp.name, "history.jsonl"), max_runs=3)
+        for run in range(4):
+            history.record(str(run), [
+                {'name': 'm.T.test_slow', 'result': 'OK', 'time': 0.1 * (run + 1)},
+                {'name': 'm.T.test_flat', 'result': 'OK', 'time': 0.1},
+                {'name': 'm.T.test_cached', 'result': 'OK', 'time': 9.0, 'cached': True},
+            ])
+        self.assertEqual(len(history.load()), 3)  # 上限で切り詰められる
+        trends = history.trends()
+        self.assertEqual(trends[0]['name'], 'm.T.test_slow')
+        self.assertNotIn('m.T.test_cached', [t['name'] for t in trends])
+        self.assertEqual(sparkline([1.0, 2.0, 3.0]), "▁▄█")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import hero
+from simulator import BattleConfig, simulate
+from balance import DEFAULT_BALANCE
+from sim_cache import SimulationCache, cache_key, cached_simulate
+from sim_service import SimulationService
+
+class TestSimulationCache(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.db")
+        self.config = BattleConfig("KingSlime", level=3, equipment=("UltimateWeapon",))
+        self.tables = DEFAULT_BALANCE.with_overrides({"species": {"KingSlime": {"hp": 40}}}, version=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_key_is_canonical(self):
+        """同じ条件なら同じキー、結果を変えるものが1つでも違えば別のキーになるテスト"""
+        same = BattleConfig("KingSlime", 3, ("UltimateWeapon", "UltimateWeapon"))
+        key = cache_key(self.config, battles=100, seed=0)
+        self.assertEqual(key, cache_key(same, DEFAULT_BALANCE, seed=0, battles=100))
+        for other in (cache_key(self.config, battles=100, seed=1),
+                      cache_key(self.config, self.tables, battles=100, seed=0),
+                      cache_key(BattleConfig("KingSlime", 3), battles=100, seed=0)):
+            self.assertNotEqual(key, other)
+
+    def test_code_tables_change_misses(self):
+        """呪文の属性や習得レベルを変えると、バランス表が同じでも前の結果を引かないテスト"""
+        cache = SimulationCache(self.path)
+        config = BattleConfig("KingSlime", 1, policy="spell")
+        before, _ = cached_simulate(cache, config, 50)
+        self.assertTrue(cached_simulate(cache, config, 50)[1])
+        with mock.patch.dict(hero.SPELL_ELEMENTS, {"メラ": "水"}):
+            changed, cached = cached_simulate(cache, config, 50)
+            self.assertFalse(cached)
+            self.assertNotEqual(changed["mean_turns"], before["mean_turns"])
+        with mock.patch.dict(hero.SPELL_LEARN_LEVELS, {2: ["メラゾーマ"]}):
+            self.assertFalse(cached_simulate(cache, config, 50)[1])
+        self.assertTrue(cached_simulate(cache, config, 50)[1])
+        cache.close()
+
+    def test_lru_eviction(self):
+        """メモリには最近使った capacity 件だけが残るテスト"""
+        cache = SimulationCache(capacity=2)
+        content = DEFAULT_BALANCE.digest
+        for key in ("a", "b"):
+            cache.put(key, content, {"key": key})
+        cache.get("a", content)
+        cache.put("c", content, {"key": "c"})
+        self.assertIsNone(cache.get("b", content))
+        self.assertEqual(cache.get("a", content), {"key": "a"})
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+
+    def test_persists_across_sessions(self):
+        """ファイルに保存した結果を次のセッションで実行せずに返すテスト"""
+        with SimulationCache(self.path) as cache:
+            first, cached = cached_simulate(cache, self.config, 300, seed=2)
+            self.assertFalse(cached)
+        with SimulationCache(self.path, capacity=10) as cache:
+            second, cached = cached_simulate(cache, self.config, 300, seed=2)
+            self.assertTrue(cached)
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+            cached_simulate(cache, self.config, 300, seed=2)
+            self.assertEqual(cache.stats()["memory_hits"], 1)
+        self.assertEqual(second, first)
+        self.assertEqual(second["win"], simulate(self.config, 300, seed=2).win)
+
+    def test_tables_change_keeps_shared_file(self):
+        """バランス表が変わると前の表の結果は使われないが、ファイルを共有する別の表の結果は消えないテスト"""
+        with SimulationCache(self.path) as cache, SimulationCache(self.path) as other:
+            cached_simulate(cache, self.config, 100)
+            result, cached = cached_simulate(other, self.config, 100, balance=self.tables)
+            self.assertFalse(cached)
+            self.assertEqual(cache.stats()["disk_entries"], 2)
+            self.assertTrue(cached_simulate(cache, self.config, 100)[1])
+            self.assertTrue(cached_simulate(other, self.config, 100, balance=self.tables)[1])
+            self.assertEqual(result, simulate(self.config, 100, balance=self.tables).summary())
+            cache.prune(keep_content=self.tables.digest)
+            self.assertEqual(cache.stats()["disk_entries"], 1)
+        with SimulationCache(self.path) as cache:
+            self.assertTrue(cached_simulate(cache, self.config, 100, balance=self.tables)[1])
+
+    def test_prune_limits(self):
+        """ファイルの件数・古さの上限を超えた結果が古いものから消えるテスト"""
+        with SimulationCache(self.path) as cache:
+            for number in range(5):
+                cache.put(f"key{number}", DEFAULT_BALANCE.digest, {"number": number})
+        with SimulationCache(self.path, capacity=0, max_entries=3) as cache:
+            self.assertEqual(cache.stats()["disk_entries"], 3)
+            self.assertIsNone(cache.get("key0", DEFAULT_BALANCE.digest))
+            self.assertEqual(cache.get("key4", DEFAULT_BALANCE.digest), {"number": 4})
+        with SimulationCache(self.path, max_age=0) as cache:
+            self.assertEqual(cache.stats()["disk_entries"], 0)
+
+    def test_service_uses_disk_cache(self):
+        """サービスを作り直してもファイルの結果から答えるテスト"""
+        request = {"species": "MetalSlime", "level": 2, "battles": 200}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with SimulationCache(self.path) as cache:
+                first = SimulationService(executor, cache=cache).query(request)
+            with SimulationCache(self.path) as cache:
+                service = SimulationService(executor, cache=cache)
+                second = service.query(request)
+                self.assertEqual(service.metrics()["cache_hits"], 1)
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["result"], first["result"])
+        self.assertEqual(service.batcher.groups_run, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
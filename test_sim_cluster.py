@@ -0,0 +1,88 @@
+import os
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+import multiprocessing
+from sim_jobs import JobSpec, SimulationJob, run_shard_step
+from sim_cluster import (Coordinator, make_coordinator_server, receive_message, run_worker, send_message,
+                         serve_until_done)
+
+class TestSimulationCluster(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.spec = JobSpec.sweep(["KingSlime", "PoisonSlime"], [1, 5], battles=200, shard_size=50)
+        self.expected = SimulationJob(os.path.join(self.tmpdir, "local.json"), self.spec)
+        self.expected.run()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def start(self, lease_timeout=30.0):
+        job = SimulationJob(os.path.join(self.tmpdir, "cluster.json"), self.spec)
+        coordinator = Coordinator(job, lease_timeout=lease_timeout, retry=0.02)
+        server = make_coordinator_server(coordinator, port=0)
+        return coordinator, server, server.server_address[1]
+
+    def test_workers_on_localhost(self):
+        """複数のワーカープロセスで分担した結果が1台で実行した結果と一致するテスト"""
+        coordinator, server, port = self.start()
+        workers = [multiprocessing.Process(target=run_worker, args=("127.0.0.1", port, f"worker-{i}"))
+                   for i in range(3)]
+        for worker in workers:
+            worker.start()
+        self.assertTrue(serve_until_done(coordinator, server, timeout=60))
+        for worker in workers:
+            worker.join(10)
+        self.assertEqual(coordinator.job.totals(), self.expected.totals())
+        # チェックポイントからも同じ結果を読み出せる
+        self.assertEqual(SimulationJob(coordinator.job.path).totals(), self.expected.totals())
+
+    def test_expired_lease_is_requeued(self):
+        """結果を返さないワーカーのシャードが期限切れで再び貸し出されるテスト"""
+        coordinator, server, port = self.start(lease_timeout=0.2)
+        finished = []
+        serving = threading.Thread(target=lambda: finished.append(serve_until_done(coordinator, server, timeout=60)))
+        serving.start()
+        # シャードを借りたまま応答しなくなったワーカー
+        stalled = socket.create_connection(("127.0.0.1", port))
+        stream = stalled.makefile("rwb")
+        send_message(stream, {"type": "lease", "worker": "stalled"})
+        self.assertEqual(receive_message(stream)["type"], "shard")
+
+        worker = multiprocessing.Process(target=run_worker, args=("127.0.0.1", port, "healthy"))
+        worker.start()
+        try:
+            serving.join(60)
+            self.assertEqual(finished, [True])
+        finally:
+            worker.join(10)
+            stream.close()
+            stalled.close()
+        self.assertGreaterEqual(coordinator.requeued, 1)
+        self.assertEqual(coordinator.job.totals(), self.expected.totals())
+
+    def test_disconnected_worker_is_released(self):
+        """接続が切れたワーカーのシャードはすぐにキューに戻るテスト"""
+        job = SimulationJob(os.path.join(self.tmpdir, "cluster.json"), self.spec)
+        coordinator = Coordinator(job)
+        first = coordinator.lease("a")["shard_id"]
+        coordinator.release("a")
+        self.assertEqual(coordinator.lease("b")["shard_id"], first)
+
+    def test_duplicate_result_is_ignored(self):
+        """同じシャードの2つ目の結果は採用しないテスト"""
+        job = SimulationJob(os.path.join(self.tmpdir, "cluster.json"), self.spec)
+        coordinator = Coordinator(job, lease_timeout=0)
+        message = coordinator.lease("a")
+        result = run_shard_step(*message["args"])
+        self.assertEqual(coordinator.lease("b")["shard_id"], message["shard_id"])  # 期限切れで再貸し出し
+        self.assertEqual(coordinator.complete("a", message["shard_id"], *result)["type"], "ok")
+        self.assertEqual(coordinator.complete("b", message["shard_id"], *result)["type"], "duplicate")
+        self.assertEqual(job.completed[message["shard_id"]].battles, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
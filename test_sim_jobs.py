@@ -0,0 +1,74 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from sim_jobs import JobError, JobSpec, SimulationJob, parse_levels
+
+class TestSimulationJob(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.spec = JobSpec.sweep(["KingSlime", "PoisonSlime"], [1, 5], battles=250, shard_size=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_resume_is_bit_identical(self):
+        """途中で止めて再開しても、止めずに実行した場合と同じ集計になるテスト"""
+        uninterrupted = SimulationJob(self.path("full.json"), self.spec)
+        self.assertTrue(uninterrupted.run(step_battles=40))
+
+        job = SimulationJob(self.path("resumed.json"), self.spec)
+        self.assertFalse(job.run(step_battles=40, max_steps=7))
+        # 新しいプロセスで開き直したつもりで、チェックポイントから再開する
+        resumed = SimulationJob(self.path("resumed.json"))
+        self.assertEqual(resumed.progress()[0], 240)  # シャードごとに 40+40+20 バトルずつ進む
+        self.assertTrue(resumed.run(step_battles=40))
+        self.assertEqual(resumed.totals(), uninterrupted.totals())
+
+    def test_resume_with_executor(self):
+        """ワーカープールで実行・再開しても同じ集計になるテスト"""
+        uninterrupted = SimulationJob(self.path("full.json"), self.spec)
+        uninterrupted.run(step_battles=60)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            job = SimulationJob(self.path("pool.json"), self.spec)
+            self.assertFalse(job.run(executor, step_battles=60, max_steps=5, checkpoint_interval=0))
+            resumed = SimulationJob(self.path("pool.json"))
+            self.assertTrue(resumed.run(executor, step_battles=60, checkpoint_interval=0))
+        self.assertEqual(resumed.totals(), uninterrupted.totals())
+        for config, stats in resumed.totals().items():
+            self.assertEqual(stats.battles, 250)
+
+    def test_checkpoint_contents(self):
+        """チェックポイントに乱数の状態・完了したシャード・途中の集計が入るテスト"""
+        job = SimulationJob(self.path("job.json"), self.spec)
+        job.run(step_battles=30, max_steps=2)
+        with open(self.path("job.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(list(data["in_progress"]), ["0:0"])
+        self.assertEqual(data["in_progress"]["0:0"]["done"], 60)
+        self.assertEqual(data["in_progress"]["0:0"]["stats"]["battles"], 60)
+        self.assertIn("rng", data["in_progress"]["0:0"])
+        self.assertFalse(os.path.exists(self.path("job.json.tmp")))
+
+    def test_spec_mismatch(self):
+        """別の内容のジョブのチェックポイントでは再開しないテスト"""
+        SimulationJob(self.path("job.json"), self.spec).save()
+        other = JobSpec.sweep(["KingSlime"], [1], battles=250, shard_size=100)
+        with self.assertRaises(JobError):
+            SimulationJob(self.path("job.json"), other)
+        with self.assertRaises(JobError):
+            SimulationJob(self.path("missing.json"))
+
+    def test_parse_levels(self):
+        """レベル指定の展開のテスト"""
+        self.assertEqual(parse_levels("1-3,10"), [1, 2, 3, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import threading
+import unittest
+import urllib.request
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from simulator import BattleConfig, simulate
+from sim_service import SimulationService, make_server
+
+QUERY = {"species": "KingSlime", "level": 7, "equipment": "ultimate", "policy": "spell", "battles": 200}
+
+class TestSimulationService(unittest.TestCase):
+    def setUp(self):
+        """各テストケース実行前の準備"""
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.service = SimulationService(self.executor, batch_window=0.05)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_result_matches_simulator(self):
+        """サービスの結果がシミュレーターと一致するテスト"""
+        response = self.service.query(QUERY)
+        expected = simulate(BattleConfig.from_dict(QUERY), 200, seed=0)
+        self.assertEqual(response["result"]["win"], expected.win)
+        self.assertFalse(response["cached"])
+        for field in ("latency_ms", "p50_ms", "p99_ms"):
+            self.assertIn(field, response)
+
+    def test_repeat_query_is_cached(self):
+        """同じ問い合わせにはキャッシュから答えるテスト"""
+        first = self.service.query(QUERY)
+        second = self.service.query(QUERY)
+        self.assertTrue(second["cached"])
+        self.assertEqual(first["result"], second["result"])
+        self.assertEqual(self.service.batcher.groups_run, 1)
+
+    def test_concurrent_queries_coalesce(self):
+        """同時に届いた同じ・互換な問い合わせが1回の実行にまとまるテスト"""
+        queries = [dict(QUERY, battles=battles) for battles in (100, 200, 200, 50)]
+        with ThreadPoolExecutor(max_workers=4) as clients:
+            responses = list(clients.map(self.service.query, queries))
+        self.assertEqual(self.service.batcher.groups_run, 1)
+        self.assertEqual([r["result"]["battles"] for r in responses], [100, 200, 200, 50])
+        config = BattleConfig.from_dict(QUERY)
+        self.assertEqual(responses[0]["result"]["win"], simulate(config, 100, seed=0).win)
+
+    def test_http_endpoint(self):
+        """HTTP経由で問い合わせるテスト"""
+        server = make_server(self.service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            request = urllib.request.Request(url + "/simulate", data=json.dumps(QUERY).encode("utf-8"),
+                                             headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request) as response:
+                data = json.loads(response.read())
+            self.assertEqual(data["result"]["battles"], 200)
+            with urllib.request.urlopen(url + "/metrics") as response:
+                self.assertEqual(json.loads(response.read())["samples"], 1)
+
+            bad = urllib.request.Request(url + "/simulate", data=b'{"species": "Dragon"}')
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(bad)
+            self.assertEqual(raised.exception.code, 400)
+
+            with mock.patch.object(self.service, "query", side_effect=RuntimeError("worker died")):
+                with self.assertRaises(urllib.error.HTTPError) as raised:
+                    urllib.request.urlopen(request)
+            self.assertEqual(raised.exception.code, 500)
+            self.assertIn("worker died", json.loads(raised.exception.read())["error"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import unittest
+from simulator import BattleConfig, SimulationStats, simulate, run_battle, make_sage, spell_policy
+from balance import DEFAULT_BALANCE
+
+class TestSimulator(unittest.TestCase):
+    def test_config_canonical(self):
+        """装備の順序や重複によらず同じ条件になるテスト"""
+        a = BattleConfig("KingSlime", 7, ("UltimateArmor", "UltimateWeapon"), "spell")
+        b = BattleConfig("KingSlime", 7, ("UltimateWeapon", "UltimateArmor", "UltimateArmor"), "spell")
+        self.assertEqual(a, b)
+        self.assertEqual(a.canonical_json(), b.canonical_json())
+        self.assertEqual(BattleConfig.from_dict(a.to_dict()), a)
+        with self.assertRaises(ValueError):
+            BattleConfig("Dragon")
+
+    def test_make_sage(self):
+        """指定レベル・装備の賢者が作られるテスト"""
+        sage = make_sage(5, ("UltimateWeapon",))
+        self.assertEqual(sage.level, 5)
+        self.assertIn("メラゾーマ", sage.spells)
+        self.assertEqual(sage.equipment["武器"].name, "破壊神の杖")
+
+    def test_simulate_is_deterministic(self):
+        """同じシードなら同じ集計になるテスト"""
+        config = BattleConfig("PoisonSlime", 2, policy="random")
+        self.assertEqual(simulate(config, 200, seed=3), simulate(config, 200, seed=3))
+
+    def test_prefix_checkpoints(self):
+        """途中のバトル数の集計が、そのバトル数だけ実行した結果と一致するテスト"""
+        config = BattleConfig("KingSlime", 1)
+        snapshots = simulate(config, 300, seed=5, checkpoints=[100, 300])
+        self.assertEqual(snapshots[100], simulate(config, 100, seed=5))
+        self.assertEqual(snapshots[300], simulate(config, 300, seed=5))
+
+    def test_stats_merge(self):
+        """集計の足し合わせのテスト"""
+        config = BattleConfig("BaseSlime", 1)
+        merged = simulate(config, 50, seed=1).merge(simulate(config, 50, seed=2))
+        self.assertEqual(merged.battles, 100)
+        self.assertEqual(SimulationStats.from_dict(merged.to_dict()), merged)
+        self.assertEqual(merged.win + merged.lose + merged.escape + merged.enemy_escape + merged.timeout, 100)
+
+    def test_spell_policy_heals(self):
+        """HPが減ると回復呪文を選ぶテスト"""
+        config = BattleConfig("KingSlime", 1, policy="spell")
+        outcome, turns, exp, gold = run_battle(config, random.Random(0))
+        self.assertIn(outcome, ("win", "lose"))
+
+        class FakeBattle:
+            player = make_sage(1)
+            balance = DEFAULT_BALANCE
+        FakeBattle.player.hp = 1
+        self.assertEqual(spell_policy(FakeBattle, random.Random(0)), (2, "ホイミ"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 from slime import BaseSlime, MetalSlime, StrayMetal, PoisonSlime, KingSlime, MetalKingSlime
 from hero import Sage, UltimateWeapon, UltimateArmor, UltimateAccessory
@@ -132,6 +133,13 @@ class TestSage(unittest.TestCase):
         result = self.sage.cast_spell("メラ", target)
         self.assertTrue("MPが足りない" in result)
 
+    def test_reequip_keeps_hp(self):
+        """同じ装備を付け直してもHPが減らないテスト"""
+        self.sage.equip(UltimateArmor())
+        self.sage.hp = self.sage.max_hp
+        self.sage.equip(UltimateArmor())
+        self.assertEqual(self.sage.hp, self.sage.max_hp)
+
 class TestSlimeTypes(unittest.TestCase):
     """各スライムタイプのテスト"""
     
@@ -230,6 +238,23 @@ class TestBattle(unittest.TestCase):
         self.battle.current_enemy = BaseSlime()
         self.assertEqual(self.battle.get_escape_chance(), 0.0)
 
+    def test_play_turn_headless(self):
+        """入力なしでバトルを最後まで進められるテスト"""
+        messages = []
+        battle = Battle(self.player, test_mode=True, rng=random.Random(1), output=messages.append)
+        battle.start_battle()
+        battle.current_enemy = KingSlime()
+        while battle.play_turn(1):
+            pass
+        self.assertIn(battle.outcome, ("win", "lose"))
+        self.assertGreaterEqual(battle.current_enemy.hp, 0)
+        self.assertTrue(len(messages) > 0)
+
+    def test_enemy_hp_within_max(self):
+        """敵のHPが最大HPを超えないテスト"""
+        for enemy in self.battle.enemies:
+            self.assertLessEqual(enemy.hp, enemy.max_hp)
+
 class TestSlimeArt(unittest.TestCase):
     def setUp(self):
         """各テストケース実行前の準備"""
@@ -0,0 +1,58 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+try:
+    from PySide6.QtWidgets import QApplication
+except ImportError:
+    QApplication = None
+
+if QApplication is not None:
+    from slime import KingSlime, MetalSlime
+    from hero import Sage
+    from slime_battle_qt import BattleWorker, SpriteAtlas, battle_state, state_delta
+
+
+@unittest.skipIf(QApplication is None, "PySide6 がインストールされていません")
+class TestSlimeBattleQt(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_sprite_atlas_caches_pixmaps(self):
+        """同じ種類・色のスプライトは1回だけラスタライズされるテスト"""
+        atlas = SpriteAtlas()
+        first = atlas.pixmap_for(KingSlime())
+        second = atlas.pixmap_for(KingSlime())
+        self.assertIs(first, second)
+        self.assertFalse(first.isNull())
+        atlas.pixmap_for(MetalSlime())
+        self.assertEqual(len(atlas), 2)
+
+    def test_state_delta_only_changed_fields(self):
+        """状態の差分には変わった項目だけが入るテスト"""
+        previous = {"player_hp": 100, "enemy_hp": 50}
+        current = {"player_hp": 100, "enemy_hp": 38}
+        self.assertEqual(state_delta(previous, current), {"enemy_hp": 38})
+        self.assertEqual(state_delta({}, current), current)
+
+    def test_worker_emits_deltas(self):
+        """ワーカーが1ターンごとに状態の差分とメッセージを送るテスト"""
+        worker = BattleWorker(Sage("テスト賢者"))
+        deltas, messages = [], []
+        worker.state_changed.connect(deltas.append)
+        worker.message.connect(messages.append)
+        random.seed(0)
+        worker.start_encounter()
+        self.assertIn("player_hp", deltas[0])
+        self.assertTrue(all("\x1b[" not in message for message in messages))
+        worker.play_turn(1, "")
+        self.assertNotIn("player_name", deltas[-1])
+        self.assertEqual(deltas[-1]["turn"], 1)
+        self.assertEqual(battle_state(worker.battle)["turn"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import random
+import asyncio
+import unittest
+from simulator import make_sage
+from slime import PoisonSlime
+from slime_battle import Battle
+from spectator import (KEYFRAME, MESSAGE, STATE, BattleFeed, SpectatorHub, encode_packet, read_packet,
+                       run_featured_battle, start_spectator_server, watch)
+
+class TestSpectatorHub(unittest.IsolatedAsyncioTestCase):
+    def test_packet_encoded_once(self):
+        """全観戦者に同じパケットのオブジェクトを配るテスト"""
+        hub = SpectatorHub()
+        subscribers = [hub.subscribe() for _ in range(1000)]
+        packet = encode_packet(MESSAGE, "メタルキングスライムがあらわれた！")
+        hub.publish(packet)
+        self.assertTrue(all(subscriber.pending[0] is packet for subscriber in subscribers))
+
+    def test_slow_viewer_skips_to_keyframe(self):
+        """キューが溢れた観戦者はたまった分を捨てて最新のキーフレームから見直すテスト"""
+        hub = SpectatorHub(queue_size=4)
+        slow = hub.subscribe()
+        keyframe = encode_packet(KEYFRAME, b"k")
+        for number in range(10):
+            hub.publish(encode_packet(STATE, bytes([number])), keyframe)
+        self.assertLessEqual(len(slow.pending), 4)
+        self.assertIs(slow.pending[0], keyframe)
+        self.assertGreater(slow.skipped, 0)
+        self.assertIn(slow, hub.subscribers)
+
+    def test_slow_viewer_dropped(self):
+        """drop の方針やスキップの上限を超えた観戦者は切断するテスト"""
+        for hub in (SpectatorHub(queue_size=4, policy="drop"), SpectatorHub(queue_size=4, max_skips=1)):
+            slow = hub.subscribe()
+            for number in range(20):
+                hub.publish(encode_packet(MESSAGE, str(number)))
+            self.assertTrue(slow.closed)
+            self.assertNotIn(slow, hub.subscribers)
+            self.assertEqual(hub.dropped, 1)
+
+    async def test_battle_not_stalled_by_viewers(self):
+        """読まない観戦者がいてもバトルは最後まで進み、読む観戦者は全部受け取るテスト"""
+        hub = SpectatorHub(queue_size=20)
+        stalled = hub.subscribe()
+        received = []
+        reader_sub = hub.subscribe()
+
+        async def consume():
+            while True:
+                packets = await reader_sub.next_packets()
+                if not packets:
+                    return
+                received.extend(packets)
+
+        consumer = asyncio.create_task(consume())
+        outcome = await run_featured_battle(hub, "KingSlime", level=5, seed=1, turn_delay=0)
+        await asyncio.sleep(0)
+        hub.close()
+        await consumer
+        self.assertIn(outcome, ("win", "lose", "escape", "enemy_escape"))
+        self.assertGreater(hub.published, 20)
+        self.assertGreater(stalled.skipped, 0)
+        self.assertEqual(len(received), hub.published)
+
+    async def test_spectators_over_tcp(self):
+        """TCPで接続した観戦者全員がバトルの最後の状態を組み立てられるテスト"""
+        hub = SpectatorHub()
+        server = await start_spectator_server(hub, port=0)
+        port = server.sockets[0].getsockname()[1]
+        feed = BattleFeed(hub)
+        async with server:
+            viewers = [asyncio.create_task(watch("127.0.0.1", port, show=lambda text: None)) for _ in range(20)]
+            while len(hub.subscribers) < len(viewers):
+                await asyncio.sleep(0.01)
+            await run_featured_battle(hub, "MetalKingSlime", level=10, seed=3, turn_delay=0.001, feed=feed)
+            hub.close()
+            states = await asyncio.wait_for(asyncio.gather(*viewers), 10)
+        for state in states:
+            self.assertEqual(state.version, feed.state.version)
+            self.assertEqual(state.fields, feed.state.snapshot())
+
+    async def test_feed_from_battle_thread(self):
+        """別スレッドで動くバトルの出来事もイベントループ経由で配られるテスト"""
+        hub = SpectatorHub()
+        subscriber = hub.subscribe()
+        feed = BattleFeed(hub, loop=asyncio.get_running_loop())
+
+        def play():
+            rng = random.Random(2)
+            battle = Battle(make_sage(3), test_mode=True, rng=rng, output=feed, enemies=[PoisonSlime()])
+            battle.start_battle()
+            feed.update(battle)
+            while battle.play_turn(1):
+                feed.update(battle)
+            feed.update(battle)
+
+        await asyncio.to_thread(play)
+        await asyncio.sleep(0)
+        packets = await subscriber.next_packets()
+        self.assertEqual(len(packets), hub.published)
+        self.assertIn(KEYFRAME, [packet[0] for packet in packets])
+
+    async def test_read_packet(self):
+        """パケットを読み戻せるテスト"""
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_packet(MESSAGE, "こんにちは") + encode_packet(STATE, b"\x01"))
+        reader.feed_eof()
+        self.assertEqual(await read_packet(reader), (MESSAGE, "こんにちは".encode("utf-8")))
+        self.assertEqual(await read_packet(reader), (STATE, b"\x01"))
+        self.assertIsNone(await read_packet(reader))
+
+
+if __name__ == '__main__':
+    unittest.main()